@@ -0,0 +1,292 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import basename, dirname, exists, getmtime, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import fnmatch
+import glob
+import io
+import os
+import re
+import threading
+import zipfile
+from the_kick_is_bad import utils
+
+
+# Output directories whose season folders go into the archive
+archive_directories = ["models", "rankings", "predictions"]
+
+# Output files are text, caches such as the model inverses are left out
+archive_patterns = ["*.csv", "*.txt"]
+
+# Open archives by year with the archive mtime they were opened at
+season_archives = {}
+season_archives_lock = threading.Lock()
+
+
+def get_package_path():
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return dirname(absolute_path)
+
+def get_archive_filename(year):
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/{year}.zip"
+
+def is_season_archived(year):
+
+    return exists(get_archive_filename(year))
+
+def find_archive_years():
+
+    absolute_path = utils.get_abs_path(__file__)
+    years = []
+    for filename in glob.glob(f"{absolute_path}/*.zip"):
+        match = re.match(r"(\d{4})\.zip$", basename(filename))
+        if match:
+            years.append(int(match.group(1)))
+
+    return sorted(years)
+
+def read_season_archive(year):
+
+    filename = get_archive_filename(year)
+
+    with season_archives_lock:
+        if not exists(filename):
+            season_archives.pop(year, None)
+            return None
+
+        # Keep the archive open between reads, reopening it only if it was rewritten
+        mtime = getmtime(filename)
+        if year not in season_archives or season_archives[year][0] != mtime:
+            if year in season_archives:
+                season_archives[year][1].close()
+            season_archives[year] = (mtime, zipfile.ZipFile(filename))
+
+        return season_archives[year][1]
+
+def close_season_archive(year):
+
+    with season_archives_lock:
+        if year in season_archives:
+            season_archives.pop(year)[1].close()
+
+def get_source_year(source):
+
+    return int(source.split("/")[1])
+
+def open_output_file(source):
+
+    # A loose file wins over the archived copy, so a season can still be patched after archiving
+    filename = f"{get_package_path()}/{source}"
+    if exists(filename):
+        return open(filename)
+
+    archive = read_season_archive(get_source_year(source))
+    if archive is not None:
+        try:
+            return io.TextIOWrapper(archive.open(source), encoding="utf-8")
+        except KeyError:
+            pass
+
+    raise FileNotFoundError(f"No such file or archive entry: '{filename}'")
+
+def get_output_file_signature(source):
+
+    # Modification time and size of whatever holds the source, cheap to compare before hashing it
+    filename = f"{get_package_path()}/{source}"
+    if exists(filename):
+        status = os.stat(filename)
+        return [status.st_mtime_ns, status.st_size]
+
+    archive = read_season_archive(get_source_year(source))
+    if archive is not None and source in archive.NameToInfo:
+        return [os.stat(get_archive_filename(get_source_year(source))).st_mtime_ns, archive.NameToInfo[source].file_size]
+
+    raise FileNotFoundError(f"No such file or archive entry: '{filename}'")
+
+def get_output_file_mtime(source):
+
+    # The mtime find_output_files gives the source, so it can be compared with what the history database loaded
+    filename = f"{get_package_path()}/{source}"
+    if exists(filename):
+        return getmtime(filename)
+
+    archive = read_season_archive(get_source_year(source))
+    if archive is not None and source in archive.NameToInfo:
+        return getmtime(get_archive_filename(get_source_year(source)))
+
+    raise FileNotFoundError(f"No such file or archive entry: '{filename}'")
+
+def output_file_exists(source):
+
+    if exists(f"{get_package_path()}/{source}"):
+        return True
+
+    archive = read_season_archive(get_source_year(source))
+    if archive is None:
+        return False
+
+    return source in archive.NameToInfo
+
+def get_output_sources(kind, year, week):
+
+    # The file that marks a week as ranked, predicted or evaluated
+    if kind == "rankings":
+        return [f"rankings/{year}/team_rankings-{year}-{week:02}.csv"]
+    if kind == "predictions":
+        return [f"predictions/{year}/predictions-{year}-{week:02}.csv"]
+
+    # Early seasons wrote their results as text files
+    return [f"predictions/{year}/results-{year}-{week:02}.csv", f"predictions/{year}/results-{year}-{week:02}.txt"]
+
+def has_output(kind, year, week):
+
+    return any(output_file_exists(source) for source in get_output_sources(kind, year, week))
+
+def find_output_files(directory, pattern):
+
+    package_path = get_package_path()
+
+    # Map each source, relative to the package, to the mtime of whatever holds it
+    # Archived files share the archive's mtime, so rewriting an archive reloads only its season
+    output_files = {}
+    for year in find_archive_years():
+        archive = read_season_archive(year)
+        if archive is None:
+            continue
+        mtime = getmtime(get_archive_filename(year))
+        for source in archive.namelist():
+            if source.startswith(f"{directory}/") and fnmatch.fnmatch(basename(source), pattern):
+                output_files[source] = mtime
+
+    for filename in glob.glob(f"{package_path}/{directory}/*/{pattern}"):
+        source = f"{directory}/{basename(dirname(filename))}/{basename(filename)}"
+        output_files[source] = getmtime(filename)
+
+    return output_files
+
+def find_season_files(year):
+
+    package_path = get_package_path()
+    sources = []
+    for directory in archive_directories:
+        for pattern in archive_patterns:
+            for filename in glob.glob(f"{package_path}/{directory}/{year}/{pattern}"):
+                sources.append(f"{directory}/{year}/{basename(filename)}")
+
+    return sorted(sources)
+
+def is_season_closed(year):
+
+    # A season is closed once a later season has been ranked
+    package_path = get_package_path()
+    for directory in glob.glob(f"{package_path}/rankings/*"):
+        if re.match(r"\d{4}$", basename(directory)) and int(basename(directory)) > year:
+            return True
+
+    return any(archive_year > year for archive_year in find_archive_years())
+
+def archive_season(year, remove_files=False):
+
+    if not is_season_closed(year):
+        raise ValueError(f"Season {year} is still open, only closed seasons are archived")
+
+    package_path = get_package_path()
+    filename = get_archive_filename(year)
+
+    # Loose files are added over any archived copy, so archiving again folds in later patches
+    contents = {}
+    archive = read_season_archive(year)
+    if archive is not None:
+        for source in archive.namelist():
+            contents[source] = archive.read(source)
+    for source in find_season_files(year):
+        with open(f"{package_path}/{source}", "rb") as file:
+            contents[source] = file.read()
+
+    if not contents:
+        raise FileNotFoundError(f"No output files for season {year}")
+
+    # Write next to the archive and swap it in, readers never see a partial archive
+    temporary_filename = f"{filename}.tmp"
+    with zipfile.ZipFile(temporary_filename, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as new_archive:
+        for source in sorted(contents):
+            info = zipfile.ZipInfo(source, date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            new_archive.writestr(info, contents[source])
+
+    # Check every entry reads back the same before anything is removed
+    with zipfile.ZipFile(temporary_filename) as new_archive:
+        for source in contents:
+            if new_archive.read(source) != contents[source]:
+                raise ValueError(f"Archive entry {source} does not match its file")
+
+    close_season_archive(year)
+    os.replace(temporary_filename, filename)
+
+    if remove_files:
+        for source in find_season_files(year):
+            os.remove(f"{package_path}/{source}")
+        for directory in archive_directories:
+            season_path = f"{package_path}/{directory}/{year}"
+            if exists(season_path) and not os.listdir(season_path):
+                os.rmdir(season_path)
+
+    return len(contents)
+
+def extract_season(year):
+
+    # Write every archived file back out, for editing a season by hand
+    archive = read_season_archive(year)
+    if archive is None:
+        raise FileNotFoundError(f"No archive for season {year}")
+
+    package_path = get_package_path()
+    for source in archive.namelist():
+        filename = f"{package_path}/{source}"
+        if not exists(filename):
+            os.makedirs(dirname(filename), exist_ok=True)
+            with open(filename, "wb") as file:
+                file.write(archive.read(source))
+
+    return len(archive.namelist())
+
+
+if __name__ == "__main__":
+    command = sys.argv[1]
+    years = [int(year) for year in sys.argv[2:]]
+    for year in years:
+        if command == "archive":
+            num_files = archive_season(year)
+            print(f"Archived {num_files} files for {year}")
+        elif command == "move":
+            num_files = archive_season(year, remove_files=True)
+            print(f"Archived {num_files} files for {year} and removed the loose copies")
+        elif command == "extract":
+            num_files = extract_season(year)
+            print(f"Extracted {num_files} files for {year}")
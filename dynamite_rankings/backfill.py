@@ -0,0 +1,88 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(join(root, "TheKickIsBAD"))
+
+# Standard imports
+import the_kick_is_bad
+
+# DynamiteRankings imports
+from archives.season_archive import has_output, is_season_archived
+from checkpoints.checkpoint import complete_partition, is_partition_completed, load_checkpoint, remove_checkpoint
+from evaluate import evaluate, has_final_games, write_results
+from predict import predict, write_predictions
+from rank import rank, write_rankings
+
+
+def backfill(start_year, end_year, restart=False):
+
+    # Each week is one partition, an interrupted backfill picks up at the first week not completed
+    parameters = {"start year": start_year, "end year": end_year}
+    checkpoint = load_checkpoint("backfill", parameters)
+    if restart:
+        remove_checkpoint(checkpoint)
+        checkpoint = load_checkpoint("backfill", parameters)
+
+    for year in range(start_year, end_year + 1):
+
+        # Rewriting an archived season would leave loose files shadowing the archive
+        if is_season_archived(year):
+            print(f"Skipping archived season {year}, extract it first to backfill it")
+            continue
+
+        num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+
+        for week in range(0, num_weeks + 2):
+
+            if is_partition_completed(checkpoint, [year, week]):
+                continue
+
+            backfill_week(year, week, num_weeks)
+
+            # Everything the week produced is already written, so the checkpoint keeps no state
+            complete_partition(checkpoint, [year, week])
+
+    remove_checkpoint(checkpoint)
+
+def backfill_week(year, week, num_weeks):
+
+    print(f"Backfilling year {year}, week {week:02}...")
+
+    # Results use the predictions made before the games, so evaluate before ranking this week
+    if week > 0 and has_output("predictions", year, week) and has_final_games(year, week):
+        evaluate(year, week, [write_results])
+
+    rank(year, week, [write_rankings], write_caches=True)
+
+    # The new rankings predict the week after
+    if week <= num_weeks:
+        try:
+            the_kick_is_bad.read_scores(year, week + 1)
+        except FileNotFoundError:
+            return
+        predict(year, week + 1, [write_predictions])
+
+
+if __name__ == "__main__":
+    start_year = int(sys.argv[1])
+    end_year = int(sys.argv[2])
+    restart = len(sys.argv) > 3 and sys.argv[3] == "restart"
+    backfill(start_year, end_year, restart)
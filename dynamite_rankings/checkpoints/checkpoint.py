@@ -0,0 +1,96 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import hashlib
+import json
+import os
+from the_kick_is_bad import utils
+
+
+# Checkpoints written with a different version are ignored and the job starts over
+checkpoint_version = 1
+
+
+def get_checkpoint_filename(job, parameters):
+
+    # Jobs with different parameters keep separate checkpoints
+    parameters_string = json.dumps(parameters, sort_keys=True)
+    parameters_hash = hashlib.sha256(parameters_string.encode()).hexdigest()[:12]
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/{job}-{parameters_hash}.json"
+
+def load_checkpoint(job, parameters):
+
+    # Round trip the parameters so they compare equal to the saved ones
+    parameters = json.loads(json.dumps(parameters))
+
+    filename = get_checkpoint_filename(job, parameters)
+    if exists(filename):
+        with open(filename) as file:
+            checkpoint = json.load(file)
+        if checkpoint["version"] == checkpoint_version and checkpoint["job"] == job and checkpoint["parameters"] == parameters:
+            return checkpoint
+
+    checkpoint = {
+        "version": checkpoint_version,
+        "job": job,
+        "parameters": parameters,
+        "completed": [],
+        "state": None
+    }
+
+    return checkpoint
+
+def is_partition_completed(checkpoint, partition):
+
+    return list(partition) in checkpoint["completed"]
+
+def complete_partition(checkpoint, partition, state=None):
+
+    # Record the partition and the accumulators that include it in one write
+    checkpoint["completed"].append(list(partition))
+    checkpoint["state"] = state
+    save_checkpoint(checkpoint)
+
+def save_checkpoint(checkpoint):
+
+    filename = get_checkpoint_filename(checkpoint["job"], checkpoint["parameters"])
+    os.makedirs(dirname(filename), exist_ok=True)
+
+    # Write beside the checkpoint and rename over it, so a crash never leaves a partial file
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "w") as file:
+        json.dump(checkpoint, file, separators=(",", ":"))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_filename, filename)
+
+def remove_checkpoint(checkpoint):
+
+    filename = get_checkpoint_filename(checkpoint["job"], checkpoint["parameters"])
+    if exists(filename):
+        os.remove(filename)
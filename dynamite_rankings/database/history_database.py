@@ -0,0 +1,399 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import basename, dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import fnmatch
+import json
+import re
+import sqlite3
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from archives.season_archive import find_output_files, get_output_file_mtime, open_output_file, output_file_exists
+
+
+# Columns of each table after the year and week, with the structure keys used by the read functions
+tables = {
+    "models": {
+        "directory": "models",
+        "pattern": "model-*.csv",
+        "key": ["team"],
+        "columns": [
+            ("team", "TEXT", "team"),
+            ("strength", "REAL", "strength"),
+            ("standard_deviation", "REAL", "standard deviation"),
+            ("points_margin", "REAL", "points margin"),
+            ("average_opponent_strength", "REAL", "average opponent strength"),
+            ("rushing_yards_margin", "REAL", "rushing yards margin"),
+            ("home_field_correction", "REAL", "home field correction"),
+            ("games_played", "INTEGER", "games played")
+        ]
+    },
+    "team_rankings": {
+        "directory": "rankings",
+        "pattern": "team_rankings-*.csv",
+        "key": ["team"],
+        "columns": [
+            ("team", "TEXT", "team"),
+            ("rank", "INTEGER", "rank"),
+            ("previous_rank", "INTEGER", "previous rank"),
+            ("delta_rank", "INTEGER", "delta rank"),
+            ("team_score", "REAL", "team score"),
+            ("strength", "REAL", "strength"),
+            ("standard_deviation", "REAL", "standard deviation")
+        ]
+    },
+    "conference_rankings": {
+        "directory": "rankings",
+        "pattern": "conference_rankings-*.csv",
+        "key": ["conference"],
+        "columns": [
+            ("conference", "TEXT", "conference"),
+            ("score", "REAL", "score"),
+            ("rank", "INTEGER", "rank")
+        ]
+    },
+    "division_rankings": {
+        "directory": "rankings",
+        "pattern": "division_rankings-*.csv",
+        "key": ["division"],
+        "columns": [
+            ("division", "TEXT", "division"),
+            ("score", "REAL", "score"),
+            ("rank", "INTEGER", "rank")
+        ]
+    },
+    "predictions": {
+        "directory": "predictions",
+        "pattern": "predictions-*.csv",
+        "key": ["away_team", "home_team"],
+        "columns": [
+            ("away_team", "TEXT", "away team"),
+            ("home_team", "TEXT", "home team"),
+            ("predicted_winner", "TEXT", "predicted winner"),
+            ("predicted_margin_of_victory", "REAL", "predicted margin of victory"),
+            ("game_interest", "REAL", "game interest"),
+            ("win_probability", "REAL", "win probability")
+        ]
+    },
+    "results": {
+        "directory": "predictions",
+        "pattern": "results-*.*",
+        "key": ["away_team", "home_team"],
+        "columns": [
+            ("away_team", "TEXT", "away team"),
+            ("home_team", "TEXT", "home team"),
+            ("predicted_winner", "TEXT", "predicted winner"),
+            ("result", "TEXT", "result"),
+            ("predicted_margin_of_victory", "REAL", "predicted margin of victory"),
+            ("actual_margin_of_victory", "REAL", "actual margin of victory")
+        ]
+    }
+}
+
+# Extra columns to index for each table
+table_indexes = {
+    "models": ["team"],
+    "team_rankings": ["team"],
+    "conference_rankings": ["conference"],
+    "division_rankings": ["division"],
+    "predictions": ["away_team", "home_team"],
+    "results": ["away_team", "home_team"]
+}
+
+
+def get_database_filename():
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/history.sqlite"
+
+def connect_database():
+
+    connection = sqlite3.connect(get_database_filename())
+    create_tables(connection)
+
+    return connection
+
+def create_tables(connection):
+
+    for table in tables:
+        columns = ", ".join(f"{name} {column_type}" for name, column_type, _ in tables[table]["columns"])
+        key = ", ".join(["year", "week"] + tables[table]["key"])
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (year INTEGER, week INTEGER, {columns}, PRIMARY KEY ({key}))")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_year_week ON {table} (year, week)")
+        for column in table_indexes[table]:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+
+    # Source files already loaded, so updates only read what changed
+    # The number of rows read from each lets readers spot weeks whose rows collapsed onto the same key
+    connection.execute("CREATE TABLE IF NOT EXISTS sources (filename TEXT PRIMARY KEY, mtime REAL, rows INTEGER)")
+
+    # Databases made before the row counts were recorded load every file again
+    source_columns = [row[1] for row in connection.execute("PRAGMA table_info(sources)")]
+    if "rows" not in source_columns:
+        connection.execute("ALTER TABLE sources ADD COLUMN rows INTEGER")
+        connection.execute("DELETE FROM sources")
+
+    # Databases made before a column was added get the column, and that table's files are loaded again
+    for table in tables:
+        existing_columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        missing_columns = [(name, column_type) for name, column_type, _ in tables[table]["columns"] if name not in existing_columns]
+        if not missing_columns:
+            continue
+        for name, column_type in missing_columns:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+        for (source,) in connection.execute("SELECT filename FROM sources").fetchall():
+            if is_table_source(table, source):
+                connection.execute("DELETE FROM sources WHERE filename = ?", (source,))
+
+    connection.commit()
+
+def update_database():
+
+    connection = connect_database()
+    loaded_mtimes = dict(connection.execute("SELECT filename, mtime FROM sources"))
+
+    num_files = 0
+    num_rows = 0
+    num_removed = 0
+
+    # Load every changed file in a single transaction
+    with connection:
+        for table in tables:
+            # Loose files and the entries of season archives alike
+            output_files = find_output_files(tables[table]["directory"], tables[table]["pattern"])
+
+            # Files loaded before but gone now take their week with them
+            output_weeks = {parse_year_week(source) for source in output_files}
+            for source in sorted(loaded_mtimes):
+                if source in output_files or not is_table_source(table, source):
+                    continue
+                year, week = parse_year_week(source)
+                connection.execute("DELETE FROM sources WHERE filename = ?", (source,))
+                if (year, week) in output_weeks:
+                    # Another file still holds the week, so it is loaded again in place of both
+                    for other_source in output_files:
+                        if parse_year_week(other_source) == (year, week):
+                            loaded_mtimes.pop(other_source, None)
+                else:
+                    connection.execute(f"DELETE FROM {table} WHERE year = ? AND week = ?", (year, week))
+                num_removed += 1
+
+            for source in sorted(output_files):
+                mtime = output_files[source]
+                if loaded_mtimes.get(source) == mtime:
+                    continue
+
+                year, week = parse_year_week(source)
+                rows = read_table_rows(table, year, week, source)
+
+                # Replace the whole week so rows dropped from the file are dropped here too
+                connection.execute(f"DELETE FROM {table} WHERE year = ? AND week = ?", (year, week))
+                placeholders = ", ".join(["?"] * (len(tables[table]["columns"]) + 2))
+                connection.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+                connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (source, mtime, len(rows)))
+
+                num_files += 1
+                num_rows += len(rows)
+
+    connection.close()
+
+    return num_files, num_rows, num_removed
+
+def is_table_source(table, source):
+
+    return source.startswith(tables[table]["directory"] + "/") and fnmatch.fnmatch(basename(source), tables[table]["pattern"])
+
+def parse_year_week(filename):
+
+    match = re.search(r"-(\d{4})-(\d{2})\.\w+$", basename(filename))
+
+    return int(match.group(1)), int(match.group(2))
+
+def read_table_rows(table, year, week, source):
+
+    rows = []
+    with open_output_file(source) as file:
+
+        header = file.readline().strip().split(",")
+
+        line = file.readline().strip()
+        rank = 1
+        while line:
+            data = line.split(",")
+
+            if table == "conference_rankings" or table == "division_rankings":
+                # Conference and division files are already sorted by score
+                rows.append((year, week, data[0], float(data[1]), rank))
+                rank += 1
+            elif table == "results" and header[0] == "Outcome":
+                # Early seasons used Outcome,AwayTeam,HomeTeam,PredictedWinner,Winner,PredictedMoV,MoV
+                rows.append((year, week, data[1], data[2], data[3], data[0], float(data[5]), float(data[6])))
+            else:
+                row = [year, week]
+                for value, (_, column_type, _) in zip(data, tables[table]["columns"]):
+                    if column_type == "INTEGER":
+                        row.append(int(float(value)))
+                    elif column_type == "REAL":
+                        row.append(float(value))
+                    else:
+                        row.append(value)
+
+                # Files written before a column was added leave it empty
+                row += [None] * (len(tables[table]["columns"]) + 2 - len(row))
+                rows.append(tuple(row))
+
+            line = file.readline().strip()
+
+    return rows
+
+def query_table(table, year=None, week=None, team=None, conference=None, division=None):
+
+    # Build the filter from whichever arguments were given
+    conditions = []
+    parameters = []
+    if year is not None:
+        conditions.append("year = ?")
+        parameters.append(year)
+    if week is not None:
+        conditions.append("week = ?")
+        parameters.append(week)
+    if team is not None:
+        if table in ["predictions", "results"]:
+            conditions.append("(away_team = ? OR home_team = ?)")
+            parameters += [team, team]
+        else:
+            conditions.append("team = ?")
+            parameters.append(team)
+    if conference is not None:
+        conditions.append("conference = ?")
+        parameters.append(conference)
+    if division is not None:
+        conditions.append("division = ?")
+        parameters.append(division)
+
+    connection = connect_database()
+    records = fetch_records(connection, table, conditions, parameters)
+    connection.close()
+
+    return records
+
+def fetch_records(connection, table, conditions, parameters):
+
+    # Rows of a week come back in the order they were loaded, which is the order of the file
+    query = f"SELECT * FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY year, week, rowid"
+    cursor = connection.execute(query, parameters)
+
+    # Pack rows with the same keys the read functions use
+    keys = ["year", "week"] + [key for _, _, key in tables[table]["columns"]]
+
+    return [dict(zip(keys, row)) for row in cursor]
+
+def query_weeks(table, week_sources):
+
+    # Rows of each (year, week) whose source, given with the mtime of whatever holds it, the database holds the current version of
+    # Weeks left out are for the caller to read from the file, and reading through here never creates the database
+    filename = get_database_filename()
+    if not week_sources or not exists(filename):
+        return {}
+
+    connection = sqlite3.connect(filename)
+    try:
+        # Databases from before a column was added are migrated by the next update
+        existing_columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        if existing_columns != ["year", "week"] + [name for name, _, _ in tables[table]["columns"]]:
+            return {}
+
+        week_records = {}
+        for year, week in week_sources:
+            source, mtime = week_sources[(year, week)]
+            loaded = connection.execute("SELECT mtime, rows FROM sources WHERE filename = ?", (source,)).fetchone()
+            if loaded is None or loaded[0] != mtime:
+                continue
+
+            # Rows sharing a key, like two games against FCS, are stored once, so those weeks are left to the file
+            records = fetch_records(connection, table, ["year = ?", "week = ?"], [year, week])
+            if len(records) != loaded[1]:
+                continue
+            week_records[(year, week)] = records
+
+        return week_records
+    except sqlite3.OperationalError:
+        # Databases made before the sources recorded their rows have nothing to compare
+        return {}
+    finally:
+        connection.close()
+
+def query_week(table, year, week, source):
+
+    # Rows of one week, or None when they have to be read from the file
+    if not exists(get_database_filename()) or not output_file_exists(source):
+        return None
+
+    return query_weeks(table, {(year, week): (source, get_output_file_mtime(source))}).get((year, week))
+
+def query_model(year=None, week=None, team=None):
+
+    return query_table("models", year, week, team)
+
+def query_team_rankings(year=None, week=None, team=None):
+
+    return query_table("team_rankings", year, week, team)
+
+def query_conference_rankings(year=None, week=None, conference=None):
+
+    return query_table("conference_rankings", year, week, conference=conference)
+
+def query_division_rankings(year=None, week=None, division=None):
+
+    return query_table("division_rankings", year, week, division=division)
+
+def query_predictions(year=None, week=None, team=None):
+
+    return query_table("predictions", year, week, team)
+
+def query_results(year=None, week=None, team=None):
+
+    return query_table("results", year, week, team)
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "update":
+        num_files, num_rows, num_removed = update_database()
+        print(f"Loaded {num_rows} rows from {num_files} new or changed files, removed {num_removed} missing files")
+    else:
+        table = sys.argv[1]
+        filters = {}
+        for argument in sys.argv[2:]:
+            name, value = argument.split("=")
+            if name in ["year", "week"]:
+                value = int(value)
+            filters[name] = value
+        records = query_table(table, **filters)
+        records_string = json.dumps(records, indent=2)
+        print(records_string)
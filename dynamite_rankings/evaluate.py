@@ -29,12 +29,33 @@ from the_kick_is_bad import utils
 from predictions.read_predictions import read_predictions
 
 
-def evaluate(year, week):
+def evaluate(year, week, sinks=None):
 
     predictions = read_predictions(year, week)
 
     scores = the_kick_is_bad.read_scores(year, week)
 
+    results = evaluate_predictions(predictions, scores)
+
+    # Printing and saving are left to whichever sinks the caller attaches
+    if sinks is not None:
+        for sink in sinks:
+            sink(year, week, results)
+
+    return results
+
+def has_final_games(year, week):
+
+    # Only weeks with finished games have results
+    scores = the_kick_is_bad.read_scores(year, week)
+    for game in scores["games"]:
+        if game["game"]["gameState"] == "final":
+            return True
+
+    return False
+
+def evaluate_predictions(predictions, scores):
+
     # Loop through predictions to check results
     results = []
     for prediction in predictions:
@@ -61,6 +82,14 @@ def evaluate(year, week):
                 else:
                     actual_winner = "TIE"
                 actual_margin_of_victory = abs(away_score - home_score)
+
+                # Determine if prediction was correct
+                # A wrong prediction records the actual margin as negative
+                if predicted_winner == actual_winner:
+                    result_string = "RIGHT"
+                else:
+                    result_string = "WRONG"
+                    actual_margin_of_victory *= -1
                 
                 # Save the results data
                 results.append({
@@ -68,39 +97,28 @@ def evaluate(year, week):
                     "home team": home_team,
                     "predicted winner": predicted_winner,
                     "actual winner": actual_winner,
+                    "result": result_string,
                     "predicted margin of victory": predicted_margin_of_victory,
                     "actual margin of victory": actual_margin_of_victory
                 })
                 break
 
-    # Print results
+    return results
+
+def print_results(year, week, results):
+
     num_results = len(results)
     num_correct = 0
-    results_file_string = "AwayTeam,HomeTeam,PredictedWinner,Result,PredictedMoV,ActualMoV\n"
     for result in results:
-
-        # Determine if prediction was correct
-        if result["predicted winner"] == result["actual winner"]:
-            result_string = "RIGHT"
+        if result["result"] == "RIGHT":
             num_correct += 1
-        else:
-            result_string = "WRONG"
-            result["actual margin of victory"] *= -1
-
-        # Print to file string in csv format
-        results_file_string += "{0},{1},{2},{3},{4:.1f},{5}\n".format(result["away team"],
-                                                                      result["home team"],
-                                                                      result["predicted winner"],
-                                                                      result_string,
-                                                                      result["predicted margin of victory"],
-                                                                      result["actual margin of victory"])
 
         # Print to console strin in pretty format
         if result["predicted winner"] == result["home team"]:
             predicted_loser = result["away team"]
         else:
             predicted_loser = result["home team"]
-        results_console_string = "{0}: Predicted {1} over {2} by {3:.1f} (actual: {4})".format(result_string,
+        results_console_string = "{0}: Predicted {1} over {2} by {3:.1f} (actual: {4})".format(result["result"],
                                                                                                result["predicted winner"],
                                                                                                predicted_loser,
                                                                                                result["predicted margin of victory"],
@@ -111,6 +129,20 @@ def evaluate(year, week):
     accuracy = num_correct / num_results * 100
     print(f"({num_correct}/{num_results}) {accuracy:.1f}%")
 
+def write_results(year, week, results):
+
+    # Print results
+    results_file_string = "AwayTeam,HomeTeam,PredictedWinner,Result,PredictedMoV,ActualMoV\n"
+    for result in results:
+
+        # Print to file string in csv format
+        results_file_string += "{0},{1},{2},{3},{4:.1f},{5}\n".format(result["away team"],
+                                                                      result["home team"],
+                                                                      result["predicted winner"],
+                                                                      result["result"],
+                                                                      result["predicted margin of victory"],
+                                                                      result["actual margin of victory"])
+
     # Create the results file with absolute path
     absolute_path = utils.get_abs_path(__file__)
     filename = f"{absolute_path}/predictions/{year}/results-{year}-{week:02}.csv"
@@ -122,4 +154,4 @@ if __name__ == "__main__":
     week = sys.argv[2]
     if week != "bowl":
         week = int(week)
-    evaluate(year, week)
+    evaluate(year, week, sinks=[print_results, write_results])
@@ -0,0 +1,224 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import basename, dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(join(root, "TheKickIsBAD"))
+
+# Standard imports
+import glob
+import gzip
+import json
+import os
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from archives.season_archive import find_output_files
+from database.history_database import parse_year_week, query_table, tables, update_database
+
+
+# Version of the shard layout, a change rewrites every shard
+export_version = 1
+
+# Tables that go into each week's shard
+week_tables = ["team_rankings", "conference_rankings", "division_rankings", "predictions", "results"]
+
+
+def export(full=False):
+
+    absolute_path = utils.get_abs_path(__file__)
+    export_path = f"{absolute_path}/export"
+
+    # The history database is the source of every shard and loads only changed files itself
+    update_database()
+
+    state = read_export_state(export_path)
+    if full or state["version"] != export_version:
+        state = {"version": export_version, "source mtimes": {}}
+
+    sources = find_export_sources()
+    changed_sources = [source for source in sources if state["source mtimes"].get(source) != sources[source]]
+    removed_sources = [source for source in state["source mtimes"] if source not in sources]
+
+    # Each changed file touches its week, and the team or conference histories it adds to
+    changed_weeks = set()
+    changed_tables = set()
+    for source in changed_sources + removed_sources:
+        table, year, week = parse_export_source(source)
+        changed_weeks.add((year, week))
+        changed_tables.add((table, year, week))
+
+    changed_teams = set()
+    changed_conferences = set()
+    for table, year, week in changed_tables:
+        if table == "team_rankings":
+            changed_teams.update(record["team"] for record in query_table(table, year, week))
+        elif table == "conference_rankings":
+            changed_conferences.update(record["conference"] for record in query_table(table, year, week))
+
+    # Removing a week may drop the last row of a history, so every history is rewritten
+    if removed_sources:
+        changed_teams.update(get_all_keys("team_rankings", "team"))
+        changed_conferences.update(get_all_keys("conference_rankings", "conference"))
+
+    num_shards = 0
+    for year, week in sorted(changed_weeks):
+        num_shards += write_week_shard(export_path, year, week)
+    for team in sorted(changed_teams):
+        num_shards += write_history_shard(export_path, "teams", "team_rankings", "team", team)
+    for conference in sorted(changed_conferences):
+        num_shards += write_history_shard(export_path, "conferences", "conference_rankings", "conference", conference)
+
+    # The manifest only needs rewriting when something else was
+    if num_shards > 0 or not exists(f"{export_path}/latest.json.gz"):
+        write_manifest(export_path, sources)
+        num_shards += 1
+
+    state["source mtimes"] = sources
+    write_export_state(export_path, state)
+
+    return num_shards
+
+def find_export_sources():
+
+    # The same files the history database loads, keyed by table so one file maps to one week
+    sources = {}
+    for table in week_tables:
+        output_files = find_output_files(tables[table]["directory"], tables[table]["pattern"])
+        for source in output_files:
+            sources[f"{table}/{basename(source)}"] = output_files[source]
+
+    return sources
+
+def parse_export_source(source):
+
+    table, filename = source.split("/")
+    year, week = parse_year_week(filename)
+
+    return table, year, week
+
+def get_all_keys(table, key):
+
+    return {record[key] for record in query_table(table)}
+
+def read_export_state(export_path):
+
+    filename = f"{export_path}/export_state.json"
+    if not exists(filename):
+        return {"version": None, "source mtimes": {}}
+
+    with open(filename) as file:
+        return json.load(file)
+
+def write_export_state(export_path, state):
+
+    write_file_atomically(f"{export_path}/export_state.json", json.dumps(state).encode())
+
+def write_week_shard(export_path, year, week):
+
+    shard = {"year": year, "week": week}
+    is_empty = True
+    for table in week_tables:
+        records = strip_year_week(query_table(table, year, week))
+        shard[table.replace("_", " ")] = records
+        if records:
+            is_empty = False
+
+    filename = f"{export_path}/weeks/{year}/{week:02}.json.gz"
+
+    # A week whose files were all removed loses its shard
+    if is_empty:
+        if exists(filename):
+            os.remove(filename)
+        return 0
+
+    write_shard(filename, shard)
+
+    return 1
+
+def write_history_shard(export_path, directory, table, key, value):
+
+    records = query_table(table, **{key: value})
+    filename = f"{export_path}/{directory}/{value}.json.gz"
+
+    if not records:
+        if exists(filename):
+            os.remove(filename)
+        return 0
+
+    # Drop the key repeated on every row, it is already the name of the shard
+    for record in records:
+        del record[key]
+    write_shard(filename, {key: value, "history": records})
+
+    return 1
+
+def strip_year_week(records):
+
+    for record in records:
+        del record["year"]
+        del record["week"]
+
+    return records
+
+def write_manifest(export_path, sources):
+
+    # Weeks available for each season, and the most recent one with rankings
+    weeks = {}
+    for filename in glob.glob(f"{export_path}/weeks/*/*.json.gz"):
+        year = int(basename(dirname(filename)))
+        week = int(basename(filename).split(".")[0])
+        weeks.setdefault(year, []).append(week)
+
+    # The latest week is the last one ranked, later weeks may only have predictions
+    latest = None
+    ranked_weeks = [parse_export_source(source)[1:] for source in sources if source.startswith("team_rankings/")]
+    if ranked_weeks:
+        year, week = max(ranked_weeks)
+        latest = {"year": year, "week": week, "shard": f"weeks/{year}/{week:02}.json.gz"}
+
+    manifest = {
+        "version": export_version,
+        "latest": latest,
+        "weeks": {str(year): sorted(weeks[year]) for year in sorted(weeks)},
+        "teams": sorted(basename(filename).split(".")[0] for filename in glob.glob(f"{export_path}/teams/*.json.gz")),
+        "conferences": sorted(basename(filename).split(".")[0] for filename in glob.glob(f"{export_path}/conferences/*.json.gz"))
+    }
+    write_shard(f"{export_path}/latest.json.gz", manifest)
+
+def write_shard(filename, data):
+
+    # Compact JSON, gzipped with a fixed timestamp so unchanged data gives identical bytes
+    data_string = json.dumps(data, separators=(",", ":"))
+    write_file_atomically(filename, gzip.compress(data_string.encode(), mtime=0))
+
+def write_file_atomically(filename, data):
+
+    # Readers see either the old file or the new one, never a partial write
+    os.makedirs(dirname(filename), exist_ok=True)
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "wb") as file:
+        file.write(data)
+    os.replace(temporary_filename, filename)
+
+
+if __name__ == "__main__":
+    full = len(sys.argv) > 1 and sys.argv[1] == "full"
+    num_shards = export(full)
+    print(f"Wrote {num_shards} shards")
@@ -0,0 +1,164 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from checkpoints.checkpoint import complete_partition, is_partition_completed, load_checkpoint, remove_checkpoint
+from models.calculate_model import calculate_model_arrays, model_configuration
+from models.calculate_priors import calculate_priors
+from models.evaluate_model import add_evaluation_counts, create_evaluation_counts, evaluate_season, summarize_evaluation_counts
+from models.schedule_index import create_schedule_index, update_schedule_index
+from stats.read_stats import read_stats
+
+
+def backtest_model(configuration, start_year=2013, end_year=2020, max_num_weeks=16, max_workers=None, restart=False):
+
+    # Options missing from the configuration keep the production values
+    full_configuration = dict(model_configuration)
+    full_configuration.update(configuration)
+
+    # A checkpoint belongs to one configuration and range of seasons
+    parameters = {
+        "configuration": full_configuration,
+        "start year": start_year,
+        "end year": end_year,
+        "max number of weeks": max_num_weeks,
+        "priors": "backtested"
+    }
+    checkpoint = load_checkpoint("backtest_model", parameters)
+    if restart:
+        remove_checkpoint(checkpoint)
+        checkpoint = load_checkpoint("backtest_model", parameters)
+
+    # The checkpointed counts already include every completed season
+    if checkpoint["state"] is None:
+        counts = create_evaluation_counts(start_year, end_year, max_num_weeks)
+    else:
+        counts = checkpoint["state"]["counts"]
+
+    # Every season runs in its own process, each calculating its own previous season bowl model for the priors
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for year in range(start_year, end_year + 1):
+            if not is_partition_completed(checkpoint, [year]):
+                futures[executor.submit(backtest_season, year, full_configuration)] = year
+
+        # Record each season as soon as it finishes, so an interrupted run keeps it
+        for future in as_completed(futures):
+            add_evaluation_counts(counts, future.result())
+            complete_partition(checkpoint, [futures[future]], {"counts": counts})
+
+    results = summarize_evaluation_counts(counts)
+
+    remove_checkpoint(checkpoint)
+
+    return results
+
+def backtest_season(year, configuration):
+
+    # The priors come from the previous season backtested with the same configuration
+    prior_model = calculate_bowl_model(year - 1, configuration)
+    strengths = calculate_season_strengths(year, configuration, prior_model)
+
+    return evaluate_season(year, strengths)
+
+def calculate_bowl_model(year, configuration):
+
+    teams, _ = the_kick_is_bad.read_teams(year)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    bowl_week = num_weeks + 1
+
+    # The bowl week is past the prior cutoff, so its model needs only the season's own games
+    if bowl_week < configuration["prior cutoff week"]:
+        raise ValueError(f"Bowl week {bowl_week} of {year} is before the prior cutoff week {configuration['prior cutoff week']}")
+
+    stats = read_stats(year, "bowl")
+    schedule_index = update_schedule_index(create_schedule_index(teams), bowl_week, stats, teams)
+    model_arrays = calculate_model_arrays(bowl_week, teams, None, schedule_index, configuration)
+
+    bowl_model = {}
+    i = 0
+    for team in teams:
+        bowl_model[team] = {
+            "home field correction": float(model_arrays["home field corrections"][i]),
+            "average opponent strength": float(model_arrays["average opponent strengths"][i])
+        }
+        i += 1
+
+    return bowl_model
+
+def calculate_season_strengths(year, configuration, prior_model=None):
+
+    teams, _ = the_kick_is_bad.read_teams(year)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+
+    # Priors are calculated from the given previous season bowl model, never read from or saved to the priors file
+    # Without one they come from the production bowl model
+    priors = calculate_priors(year, teams, write=False, prev_model=prior_model)
+
+    # The schedule index is kept in memory and grows one week at a time
+    schedule_index = create_schedule_index(teams)
+
+    # Recalculate the strengths used to predict each following week
+    strengths = []
+    for week in range(0, num_weeks):
+
+        print(f"Backtesting year {year}, week {week:02}...")
+
+        if week == 0:
+            stats = None
+            schedule = None
+        else:
+            stats = read_stats(year, week)
+            schedule_index = update_schedule_index(schedule_index, week, stats, teams)
+            schedule = schedule_index
+
+        model_arrays = calculate_model_arrays(week, teams, priors, schedule, configuration)
+
+        week_strengths = {}
+        i = 0
+        for team in teams:
+            week_strengths[team] = model_arrays["strengths"][i]
+            i += 1
+        strengths.append(week_strengths)
+
+    return strengths
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1]) as file:
+        configuration = json.load(file)
+    restart = "restart" in sys.argv[2:]
+    arguments = [argument for argument in sys.argv[2:] if argument != "restart"]
+    results = backtest_model(configuration, restart=restart)
+    if arguments:
+        utils.write_json(results, arguments[0])
+    else:
+        results_string = json.dumps(results, indent=2)
+        print(results_string)
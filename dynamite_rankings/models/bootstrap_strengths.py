@@ -0,0 +1,298 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import the_kick_is_bad
+import tracemalloc
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.calculate_model import calculate_games_played, model_configuration
+from models.compact_arrays import get_dtypes
+from models.read_priors import read_priors
+from models.schedule_index import get_team_totals, load_schedule_index
+from models.shared_arrays import attach_arrays, release_arrays, share_arrays
+from stats.read_stats import read_stats
+
+
+# Memory allowed for one chunk of stacked replicate systems, in bytes
+memory_budget = 2**30
+
+# Replicates drawn from one random stream, chunks are made of whole blocks
+# Resampling depends only on the seed and the block, never on how the blocks are chunked
+replicate_block_size = 64
+
+# Systems solved in one call, NumPy solves float32 systems in float64 so compact mode casts only this many at a time
+solve_batch_size = 32
+
+# Replicates in the two small chunks measured to size the real ones
+# Whole solve batches, so the fixed cost of one batch's cast is not counted per replicate
+probe_sizes = [solve_batch_size, 3 * solve_batch_size]
+
+confidence_level = 95
+
+
+def bootstrap_strengths(year, week, stats, teams, num_replicates=1000, seed=0, max_workers=None, compact=False):
+
+    season_arrays = get_season_arrays(year, week, stats, teams)
+
+    replicate_strengths = bootstrap_replicate_strengths(season_arrays, num_replicates, seed, max_workers, compact)
+
+    # Percentile intervals per team
+    tail = (100 - confidence_level) / 2
+    lower, median, upper = np.percentile(replicate_strengths, [tail, 50, 100 - tail], axis=0)
+
+    intervals = {}
+    i = 0
+    for team in teams:
+        intervals[team] = {
+            "lower": lower[i],
+            "median": median[i],
+            "upper": upper[i]
+        }
+        i += 1
+
+    # Print intervals
+    intervals_file_string = "Team,Lower,Median,Upper\n"
+    for team in intervals:
+
+        # Print to file string in csv format
+        intervals_file_string += "{0},{1},{2},{3}\n".format(team,
+                                                           intervals[team]["lower"],
+                                                           intervals[team]["median"],
+                                                           intervals[team]["upper"])
+
+    # Create the intervals file next to the model with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/bootstrap-{year}-{week:02}.csv"
+    utils.write_string(intervals_file_string, filename)
+
+    return intervals
+
+def bootstrap_replicate_strengths(season_arrays, num_replicates, seed=0, max_workers=None, compact=False):
+
+    num_teams = len(season_arrays["games played"])
+
+    # Compact mode solves the replicates in float32, halving the memory per replicate
+    float_dtype = get_dtypes(compact)["float"]
+
+    # Independent random streams per block keep results reproducible for any pool size, chunk size or dtype
+    block_sizes = [replicate_block_size] * (num_replicates // replicate_block_size)
+    if num_replicates % replicate_block_size:
+        block_sizes.append(num_replicates % replicate_block_size)
+    blocks = list(zip(np.random.SeedSequence(seed).spawn(len(block_sizes)), block_sizes))
+
+    # Size the chunks from the measured peak of small ones rather than counting the temporaries by hand
+    replicate_bytes, fixed_bytes = measure_replicate_bytes(season_arrays, float_dtype)
+    chunk_size = max(1, min(num_replicates, (memory_budget - fixed_bytes) // replicate_bytes))
+    blocks_per_chunk = max(1, chunk_size // replicate_block_size)
+    chunks = [blocks[b:b + blocks_per_chunk] for b in range(0, len(blocks), blocks_per_chunk)]
+
+    if len(chunks) > 1:
+
+        # Workers read the season arrays from shared memory instead of each getting a pickled copy
+        handle = share_arrays(season_arrays)
+        tasks = [(handle, chunk_blocks, float_dtype) for chunk_blocks in chunks]
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                replicate_strengths = list(executor.map(bootstrap_chunk, tasks))
+        finally:
+            release_arrays(handle)
+    else:
+        replicate_strengths = [bootstrap_replicates(season_arrays, chunk_blocks, float_dtype) for chunk_blocks in chunks]
+    replicate_strengths = np.concatenate(replicate_strengths)
+
+    return replicate_strengths
+
+def measure_replicate_bytes(season_arrays, float_dtype):
+
+    # NumPy reports its array memory to tracemalloc, so the peak covers every temporary
+    # The difference between two chunk sizes is the cost of one replicate, the rest does not grow with the chunk
+    # One untraced run first keeps allocations made only on the first solve out of the measurement
+    bootstrap_replicates(season_arrays, [(np.random.SeedSequence(0), probe_sizes[0])], float_dtype)
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    peaks = []
+    try:
+        for size in probe_sizes:
+            tracemalloc.reset_peak()
+            start_bytes, _ = tracemalloc.get_traced_memory()
+            bootstrap_replicates(season_arrays, [(np.random.SeedSequence(0), size)], float_dtype)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            peaks.append(peak_bytes - start_bytes)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    replicate_bytes = max(1, (peaks[1] - peaks[0]) // (probe_sizes[1] - probe_sizes[0]))
+    fixed_bytes = max(0, peaks[0] - probe_sizes[0] * replicate_bytes)
+
+    return replicate_bytes, fixed_bytes
+
+def get_season_arrays(year, week, stats, teams):
+
+    num_teams = len(teams)
+
+    if week < model_configuration["prior cutoff week"]:
+        priors = read_priors(year, teams)
+    else:
+        priors = {
+            "points margin": np.zeros(num_teams),
+            "rushing yards margin": np.zeros(num_teams),
+            "home field correction": np.zeros(num_teams),
+            "average opponent strength": np.zeros(num_teams)
+        }
+
+    if week > 0:
+        schedule = load_schedule_index(year, week, stats, teams)
+        team = schedule["team"]
+        opponent = schedule["opponent"]
+        points_margin = schedule["points gained"] - schedule["points allowed"]
+        rushing_yards_margin = schedule["rushing yards gained"] - schedule["rushing yards allowed"]
+        home_field_correction = np.where(schedule["home"] == 1, -1.0, 1.0)
+        team_totals = get_team_totals(schedule)
+    else:
+        team = np.zeros(0, dtype=int)
+        opponent = np.zeros(0, dtype=int)
+        points_margin = np.zeros(0)
+        rushing_yards_margin = np.zeros(0)
+        home_field_correction = np.zeros(0)
+        team_totals = None
+
+    # Early season weeks use only the previous season rushing yards margin
+    if week < model_configuration["prior cutoff week"]:
+        rushing_yards_margin = np.zeros(len(team))
+
+    season_arrays = {
+        "team": team,
+        "opponent": opponent,
+        "points margin": points_margin,
+        "rushing yards margin": rushing_yards_margin,
+        "home field correction": home_field_correction,
+        "games played": calculate_games_played(week, team_totals, teams),
+        "prior points margin": priors["points margin"],
+        "prior rushing yards margin": priors["rushing yards margin"],
+        "prior home field correction": priors["home field correction"],
+        "prior average opponent strength": priors["average opponent strength"]
+    }
+
+    return season_arrays
+
+def get_resampling_weights(team, num_teams, num_replicates, rng):
+
+    num_games = len(team)
+
+    # Edges are grouped by team, so each team owns one contiguous slice
+    team_games = np.bincount(team, minlength=num_teams)
+    team_starts = np.concatenate([[0], np.cumsum(team_games)[:-1]])
+
+    # Draw each team's games with replacement from its own schedule
+    offsets = np.floor(rng.random((num_replicates, num_games)) * team_games[team]).astype(int)
+    draws = team_starts[team] + offsets
+
+    replicates = np.repeat(np.arange(num_replicates), num_games)
+    weights = np.bincount(replicates * num_games + draws.ravel(), minlength=num_replicates * num_games)
+
+    return weights.reshape(num_replicates, num_games)
+
+def bootstrap_chunk(task):
+
+    handle, blocks, float_dtype = task
+
+    return bootstrap_replicates(attach_arrays(handle), blocks, float_dtype)
+
+def bootstrap_replicates(season_arrays, blocks, float_dtype=np.float64):
+
+    team = season_arrays["team"]
+    opponent = season_arrays["opponent"]
+    games_played = np.maximum(1, season_arrays["games played"])
+    num_teams = len(games_played)
+    num_games = len(team)
+
+    # Each block of replicates draws from its own stream
+    weights = np.concatenate([get_resampling_weights(team, num_teams, size, np.random.default_rng(block_seed)) for block_seed, size in blocks])
+    num_replicates = len(weights)
+
+    # Per team sums for every replicate as one weighted matrix product each
+    incidence = np.zeros((num_games, num_teams))
+    incidence[np.arange(num_games), team] = 1
+    points_margin = (weights * season_arrays["points margin"]) @ incidence + season_arrays["prior points margin"]
+    rushing_yards_margin = (weights * season_arrays["rushing yards margin"]) @ incidence + season_arrays["prior rushing yards margin"]
+    home_field_corrections = (weights * season_arrays["home field correction"]) @ incidence + season_arrays["prior home field correction"]
+
+    rush_yard_coefficient = model_configuration["rush yard coefficient"]
+    home_field_coefficient = model_configuration["home field coefficient"]
+    B = (points_margin + rush_yard_coefficient * rushing_yards_margin + home_field_coefficient * home_field_corrections) / games_played
+    B += season_arrays["prior average opponent strength"] / games_played
+    B = B.astype(float_dtype)
+
+    # Stack A = I - games_played_normalization for every replicate
+    # Like the model, an opponent counts once however many times it was drawn
+    # The per game temporaries are freed before the N x N arrays are made, so only A and its mask share the peak
+    replicates = np.repeat(np.arange(num_replicates), num_games)
+    flat_indexes = (replicates * num_teams + np.tile(team, num_replicates)) * num_teams + np.tile(opponent, num_replicates)
+    flat_indexes = flat_indexes[weights.ravel() > 0]
+    del replicates, weights
+    is_opponent = np.zeros(num_replicates * num_teams * num_teams, dtype=bool)
+    is_opponent[flat_indexes] = True
+    del flat_indexes
+    inverse_games_played = (1 / games_played).astype(float_dtype)
+    A = is_opponent.reshape(num_replicates, num_teams, num_teams) * -inverse_games_played[:, np.newaxis]
+    del is_opponent
+    A += np.eye(num_teams, dtype=float_dtype)
+
+    strengths = np.empty((num_replicates, num_teams), dtype=float_dtype)
+    for start in range(0, num_replicates, solve_batch_size):
+        end = start + solve_batch_size
+        strengths[start:end] = np.linalg.solve(A[start:end], B[start:end, :, np.newaxis])[:, :, 0]
+
+    return strengths
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    if len(sys.argv) > 3:
+        num_replicates = int(sys.argv[3])
+    else:
+        num_replicates = 1000
+    compact = len(sys.argv) > 4 and sys.argv[4] == "compact"
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    if week == 0:
+        stats = None
+    else:
+        stats = read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    intervals = bootstrap_strengths(year, week, stats, teams, num_replicates, compact=compact)
+    for team in intervals:
+        print("{0}: {1:.1f} [{2:.1f}, {3:.1f}]".format(team,
+                                                      intervals[team]["median"],
+                                                      intervals[team]["lower"],
+                                                      intervals[team]["upper"]))
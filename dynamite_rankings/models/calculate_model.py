@@ -23,34 +23,51 @@ sys.path.append(root)
 sys.path.append(join(dirname(root), "TheKickIsBAD"))
 
 # Standard imports
+from concurrent.futures import Future
 import numpy as np
-import the_kick_is_bad
 from the_kick_is_bad import utils
 
 # DynamiteRankings imports
 from models.read_model import read_model
+from models.read_priors import read_priors
+from models.schedule_index import get_games_played_normalization, get_team_totals, load_schedule_index
+from models.solve_components import solve_by_components
 
 
-def calculate_model(year, week, stats, teams):
+# Model coefficients and options, variants of the model override these
+model_configuration = {
+    "rush yard coefficient": 0.0837058862488956,
+    "home field coefficient": 4,
+    # Weeks before this count the previous season as one extra game
+    "prior cutoff week": 9,
+    "use rushing yards margin": True,
+    # Either "components" to solve each connected group of teams on its own or "dense" for one full solve
+    "solver": "components"
+}
 
-    if week < 9:
-        prev_stats = the_kick_is_bad.read_stats(year - 1, "bowl")
-        prev_model = read_model(year - 1, "bowl")
-    else:
-        prev_stats = None
-        prev_model = None
 
-    games_played = calculate_games_played(week, stats, teams)
-    points_margin = calculate_points_margin(week, stats, prev_stats, games_played, teams)
-    rushing_yards_margin = calculate_rushing_yards_margin(week, stats, prev_stats, games_played, teams)
-    home_field_corrections = calculate_home_field_corrections(week, stats, prev_stats, prev_model, games_played, teams)
+def calculate_model(year, week, stats, teams, inputs=None, configuration=model_configuration):
 
-    games_played_normalization = calculate_games_played_normalization(week, stats, games_played, teams)
+    # Inputs read here are never saved, writing the caches is left to the caller
+    if week < configuration["prior cutoff week"]:
+        priors = get_input(inputs, "priors", read_priors, year, teams, False)
+    else:
+        priors = None
 
-    strengths = calculate_strengths(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, games_played_normalization, prev_model, teams)
-    average_opponent_strengths = np.matmul(games_played_normalization, strengths)
+    if week > 0:
+        schedule = get_input(inputs, "schedule", load_schedule_index, year, week, stats, teams, False)
+    else:
+        schedule = None
+
+    model_arrays = calculate_model_arrays(week, teams, priors, schedule, configuration)
+    strengths = model_arrays["strengths"]
+    points_margin = model_arrays["points margin"]
+    average_opponent_strengths = model_arrays["average opponent strengths"]
+    rushing_yards_margin = model_arrays["rushing yards margin"]
+    home_field_corrections = model_arrays["home field corrections"]
+    games_played = model_arrays["games played"]
 
-    standard_deviations = calculate_standard_deviations(year, week, prev_model, teams)
+    standard_deviations = calculate_standard_deviations(year, week, teams, inputs)
 
     model = {}
     i = 0
@@ -66,6 +83,10 @@ def calculate_model(year, week, stats, teams):
         }
         i += 1
 
+    return model, strengths, standard_deviations
+
+def write_model(year, week, model):
+
     # Print predictions
     model_file_string = "Team,Strength,StandardDeviation,PointsMargin,AverageOpponentStrength,RushingYardsMargin,HomeFieldCorrection,GamesPlayed\n"
     for team in model:
@@ -85,207 +106,161 @@ def calculate_model(year, week, stats, teams):
     filename = f"{absolute_path}/{year}/model-{year}-{week:02}.csv"
     utils.write_string(model_file_string, filename)
 
-    return model, strengths, standard_deviations
+def get_input(inputs, name, read_function, *args):
+
+    # Use an input given by the caller, waiting for it if it is still being read
+    if inputs is not None and name in inputs:
+        if isinstance(inputs[name], Future):
+            return inputs[name].result()
+        return inputs[name]
+
+    return read_function(*args)
+
+def calculate_model_arrays(week, teams, priors, schedule, configuration=model_configuration):
+
+    # Season features come from the running totals kept with the schedule index
+    if week > 0:
+        team_totals = get_team_totals(schedule)
+    else:
+        team_totals = None
+
+    games_played = calculate_games_played(week, team_totals, teams, configuration)
+    points_margin = calculate_points_margin(week, team_totals, priors, games_played, teams, configuration)
+    rushing_yards_margin = calculate_rushing_yards_margin(week, team_totals, priors, games_played, teams, configuration)
+    home_field_corrections = calculate_home_field_corrections(week, team_totals, priors, games_played, teams, configuration)
+
+    games_played_normalization = calculate_games_played_normalization(week, schedule, games_played, teams)
+
+    strengths = calculate_strengths(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, games_played_normalization, priors, teams, configuration)
+    average_opponent_strengths = np.matmul(games_played_normalization, strengths)
+
+    model_arrays = {
+        "strengths": strengths,
+        "points margin": points_margin,
+        "average opponent strengths": average_opponent_strengths,
+        "rushing yards margin": rushing_yards_margin,
+        "home field corrections": home_field_corrections,
+        "games played": games_played,
+        "games played normalization": games_played_normalization
+    }
 
-def calculate_games_played(week, stats, teams):
+    return model_arrays
+
+def calculate_games_played(week, team_totals, teams, configuration=model_configuration):
 
     num_teams = len(teams)
-    games_played = np.zeros(num_teams)
 
-    i = 0
-    for team in teams:
-        if week == 0:
-            games_played[i] = 1
-        elif week < 9:
-            games_played[i] = stats[team]["games played"]["season"] + 1
-        else:
-            games_played[i] = stats[team]["games played"]["season"]
-        i += 1
+    if week == 0:
+        games_played = np.ones(num_teams)
+    elif week < configuration["prior cutoff week"]:
+        games_played = team_totals["games played"] + 1
+    else:
+        games_played = np.array(team_totals["games played"], dtype=float)
 
     return games_played
 
-def calculate_points_margin(week, stats, prev_stats, games_played, teams):
+def calculate_points_margin(week, team_totals, priors, games_played, teams, configuration=model_configuration):
 
     num_teams = len(teams)
     points_margin = np.zeros(num_teams)
 
-    i = 0
-    for team in teams:
-        if week == 0:
-            if team in prev_stats:
-                prev_points_margin = sum(prev_stats[team]["points"]["total"]["gained"]) - sum(prev_stats[team]["points"]["total"]["allowed"])
-                prev_games_played = prev_stats[team]["games played"]["season"]
-                prev_points_margin_per_game = prev_points_margin / max(1, prev_games_played)
-                points_margin[i] = prev_points_margin_per_game
-            else:
-                prev_points_margin = sum(prev_stats["FCS"]["points"]["total"]["gained"]) - sum(prev_stats["FCS"]["points"]["total"]["allowed"])
-                prev_games_played = prev_stats["FCS"]["games played"]["season"]
-                prev_points_margin_per_game = prev_points_margin / max(1, prev_games_played)
-                points_margin[i] = prev_points_margin_per_game
-        elif week < 9:
-            points_margin[i] = sum(stats[team]["points"]["total"]["gained"]) - sum(stats[team]["points"]["total"]["allowed"])
-            if team in prev_stats:
-                prev_points_margin = sum(prev_stats[team]["points"]["total"]["gained"]) - sum(prev_stats[team]["points"]["total"]["allowed"])
-                prev_games_played = prev_stats[team]["games played"]["season"]
-                prev_points_margin_per_game = prev_points_margin / max(1, prev_games_played)
-                points_margin[i] += prev_points_margin_per_game
-            else:
-                prev_points_margin = sum(prev_stats["FCS"]["points"]["total"]["gained"]) - sum(prev_stats["FCS"]["points"]["total"]["allowed"])
-                prev_games_played = prev_stats["FCS"]["games played"]["season"]
-                prev_points_margin_per_game = prev_points_margin / max(1, prev_games_played)
-                points_margin[i] += prev_points_margin_per_game
-        else:
-            points_margin[i] = sum(stats[team]["points"]["total"]["gained"]) - sum(stats[team]["points"]["total"]["allowed"])
-
-        points_margin[i] /= max(1, games_played[i])
+    if week > 0:
+        points_margin += team_totals["points margin"]
 
-        i += 1
+    # Early season weeks count the previous season as one extra game
+    if week < configuration["prior cutoff week"]:
+        points_margin += priors["points margin"]
+
+    points_margin /= np.maximum(1, games_played)
 
     return points_margin
 
-def calculate_rushing_yards_margin(week, stats, prev_stats, games_played, teams):
+def calculate_rushing_yards_margin(week, team_totals, priors, games_played, teams, configuration=model_configuration):
 
     num_teams = len(teams)
     rushing_yards_margin = np.zeros(num_teams)
 
-    i = 0
-    for team in teams:
-        if week == 0:
-            if team in prev_stats:
-                prev_rushing_yards_margin = sum(prev_stats[team]["rushing"]["yards"]["gained"]) - sum(prev_stats[team]["rushing"]["yards"]["allowed"])
-                prev_games_played = prev_stats[team]["games played"]["season"]
-                prev_rushing_yards_margin_per_game = prev_rushing_yards_margin / max(1, prev_games_played)
-                rushing_yards_margin[i] = prev_rushing_yards_margin_per_game
-            else:
-                prev_rushing_yards_margin = sum(prev_stats["FCS"]["rushing"]["yards"]["gained"]) - sum(prev_stats["FCS"]["rushing"]["yards"]["allowed"])
-                prev_games_played = prev_stats["FCS"]["games played"]["season"]
-                prev_rushing_yards_margin_per_game = prev_rushing_yards_margin / max(1, prev_games_played)
-                rushing_yards_margin[i] = prev_rushing_yards_margin_per_game
-        elif week < 9:
-            rushing_yards_margin[i] = sum(stats[team]["rushing"]["yards"]["gained"]) - sum(stats[team]["rushing"]["yards"]["allowed"])
-            if team in prev_stats:
-                prev_rushing_yards_margin = sum(prev_stats[team]["rushing"]["yards"]["gained"]) - sum(prev_stats[team]["rushing"]["yards"]["allowed"])
-                prev_games_played = prev_stats[team]["games played"]["season"]
-                prev_rushing_yards_margin_per_game = prev_rushing_yards_margin / max(1, prev_games_played)
-                rushing_yards_margin[i] = prev_rushing_yards_margin_per_game
-            else:
-                prev_rushing_yards_margin = sum(prev_stats["FCS"]["rushing"]["yards"]["gained"]) - sum(prev_stats["FCS"]["rushing"]["yards"]["allowed"])
-                prev_games_played = prev_stats["FCS"]["games played"]["season"]
-                prev_rushing_yards_margin_per_game = prev_rushing_yards_margin / max(1, prev_games_played)
-                rushing_yards_margin[i] = prev_rushing_yards_margin_per_game
-        else:
-            rushing_yards_margin[i] = sum(stats[team]["rushing"]["yards"]["gained"]) - sum(stats[team]["rushing"]["yards"]["allowed"])
-
-        rushing_yards_margin[i] /= max(1, games_played[i])
+    # Early season weeks use only the previous season rushing yards margin
+    if week < configuration["prior cutoff week"]:
+        rushing_yards_margin += priors["rushing yards margin"]
+    else:
+        rushing_yards_margin += team_totals["rushing yards margin"]
 
-        i += 1
+    rushing_yards_margin /= np.maximum(1, games_played)
 
     return rushing_yards_margin
 
-def calculate_home_field_corrections(week, stats, prev_stats, prev_model, games_played, teams):
+def calculate_home_field_corrections(week, team_totals, priors, games_played, teams, configuration=model_configuration):
 
     num_teams = len(teams)
     home_field_corrections = np.zeros(num_teams)
 
-    i = 0
-    for team in teams:
-        if week == 0:
-            if team in prev_model:
-                prev_home_field_correction = prev_model[team]["home field correction"]
-                prev_games_played = prev_stats[team]["games played"]["season"]
-                prev_home_field_correction_per_game = prev_home_field_correction / max(1, prev_games_played)
-                home_field_corrections[i] += prev_home_field_correction_per_game
-            else:
-                prev_home_field_correction = prev_model["FCS"]["home field correction"]
-                prev_games_played = prev_stats["FCS"]["games played"]["season"]
-                prev_home_field_correction_per_game = prev_home_field_correction / max(1, prev_games_played)
-                home_field_corrections[i] += prev_home_field_correction_per_game
-        elif week < 9:
-            for is_home in stats[team]["schedule"]["home"]:
-                if is_home:
-                    home_field_corrections[i] -= 1
-                else:
-                    home_field_corrections[i] += 1
-            if team in prev_model:
-                prev_home_field_correction = prev_model[team]["home field correction"]
-                prev_games_played = prev_stats[team]["games played"]["season"]
-                prev_home_field_correction_per_game = prev_home_field_correction / max(1, prev_games_played)
-                home_field_corrections[i] += prev_home_field_correction_per_game
-            else:
-                prev_home_field_correction = prev_model["FCS"]["home field correction"]
-                prev_games_played = prev_stats["FCS"]["games played"]["season"]
-                prev_home_field_correction_per_game = prev_home_field_correction / max(1, prev_games_played)
-                home_field_corrections[i] += prev_home_field_correction_per_game
-        else:
-            for is_home in stats[team]["schedule"]["home"]:
-                if is_home:
-                    home_field_corrections[i] -= 1
-                else:
-                    home_field_corrections[i] += 1
-
-        home_field_corrections[i] /= max(1, games_played[i])
+    # Home games count -1 and away games +1
+    if week > 0:
+        home_field_corrections += team_totals["home field correction"]
 
-        i += 1
+    # Early season weeks count the previous season as one extra game
+    if week < configuration["prior cutoff week"]:
+        home_field_corrections += priors["home field correction"]
+
+    home_field_corrections /= np.maximum(1, games_played)
 
     return home_field_corrections
 
-def calculate_games_played_normalization(week, stats, games_played, teams):
+def calculate_games_played_normalization(week, schedule, games_played, teams):
 
     num_teams = len(teams)
-    games_played_normalization = np.zeros((num_teams, num_teams))
-
-    team_to_index = {}
-    i = 0
-    for team in teams:
-        team_to_index[team] = i
-        i += 1
 
     if week > 0:
-        i = 0
-        for team in teams:
-            for opponent in stats[team]["schedule"]["opponents"]:
-                j = team_to_index[opponent]
-                games_played_normalization[i][j] = 1 / max(1, games_played[i])
-            i += 1
+        games_played_normalization = get_games_played_normalization(schedule, games_played, num_teams)
+    else:
+        games_played_normalization = np.zeros((num_teams, num_teams))
 
     return games_played_normalization
 
-def calculate_strengths(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, games_played_normalization, prev_model, teams):
+def calculate_strengths(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, games_played_normalization, priors, teams, configuration=model_configuration):
 
     num_teams = len(teams)
 
-    rush_yard_coefficient = 0.0837058862488956
-    home_field_coefficient = 4
-
     I = np.eye(num_teams)
-    B = points_margin + rush_yard_coefficient * rushing_yards_margin + home_field_coefficient * home_field_corrections
-
-    if week < 9:
-        i = 0
-        for team in teams:
-            if team in prev_model:
-                B[i] += prev_model[team]["average opponent strength"] / max(1, games_played[i])
-            else:
-                B[i] += prev_model["FCS"]["average opponent strength"] / max(1, games_played[i])
-            i += 1
+    B = calculate_right_hand_side(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, priors, configuration)
 
     A = I - games_played_normalization
-    strengths = np.linalg.solve(A, B)
+    if configuration["solver"] == "dense":
+        strengths = np.linalg.solve(A, B)
+    else:
+        strengths = solve_by_components(A, B)
 
     return strengths
 
-def calculate_standard_deviations(year, week, prev_model, teams):
+def calculate_right_hand_side(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, priors, configuration=model_configuration):
+
+    rush_yard_coefficient = configuration["rush yard coefficient"]
+    home_field_coefficient = configuration["home field coefficient"]
+    if not configuration["use rushing yards margin"]:
+        rush_yard_coefficient = 0
+
+    B = points_margin + rush_yard_coefficient * rushing_yards_margin + home_field_coefficient * home_field_corrections
+
+    if week < configuration["prior cutoff week"]:
+        B += priors["average opponent strength"] / np.maximum(1, games_played)
+
+    return B
+
+def calculate_standard_deviations(year, week, teams, inputs=None):
 
     num_teams = len(teams)
 
     if week > 0:
         strengths = np.zeros((num_teams, week))
-        i = 0
-        for team in teams:
-            for w in range(1, week):
-                prev_model = read_model(year, w)
+
+        # Read each earlier model once rather than once per team
+        for w in range(1, week):
+            prev_model = get_input(inputs, f"model {w}", read_model, year, w)
+            i = 0
+            for team in teams:
                 strengths[i][w - 1] = prev_model[team]["strength"]
-            i += 1
+                i += 1
         standard_deviations = np.std(strengths, axis=1)
     else:
         standard_deviations = np.zeros(num_teams)
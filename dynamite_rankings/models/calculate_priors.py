@@ -0,0 +1,160 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import hashlib
+import numpy as np
+import os
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from archives.season_archive import get_output_file_signature, open_output_file
+from models.read_model import read_model
+from stats.read_stats import get_source_filename, get_source_hash, read_stats
+
+
+def calculate_priors(year, teams, write=True, prev_model=None):
+
+    # The previous season's bowl model can be passed in, such as one recalculated with another configuration
+    prev_stats = read_stats(year - 1, "bowl")
+    if prev_model is None:
+        prev_model = read_model(year - 1, "bowl")
+
+    num_teams = len(teams)
+    points_margin = np.zeros(num_teams)
+    rushing_yards_margin = np.zeros(num_teams)
+    home_field_correction = np.zeros(num_teams)
+    average_opponent_strength = np.zeros(num_teams)
+
+    i = 0
+    for team in teams:
+
+        # Teams new to the FBS use the FCS stats from the previous season
+        if team in prev_stats:
+            stats_team = team
+        else:
+            stats_team = "FCS"
+        if team in prev_model:
+            model_team = team
+        else:
+            model_team = "FCS"
+
+        prev_games_played = max(1, prev_stats[stats_team]["games played"]["season"])
+        prev_points_margin = sum(prev_stats[stats_team]["points"]["total"]["gained"]) - sum(prev_stats[stats_team]["points"]["total"]["allowed"])
+        prev_rushing_yards_margin = sum(prev_stats[stats_team]["rushing"]["yards"]["gained"]) - sum(prev_stats[stats_team]["rushing"]["yards"]["allowed"])
+
+        # Prior margins are stored per game
+        points_margin[i] = prev_points_margin / prev_games_played
+        rushing_yards_margin[i] = prev_rushing_yards_margin / prev_games_played
+
+        # The home field correction is looked up by the model team
+        prev_games_played = max(1, prev_stats[model_team]["games played"]["season"])
+        home_field_correction[i] = prev_model[model_team]["home field correction"] / prev_games_played
+
+        # Average opponent strength is normalized by the current season games played in the model
+        average_opponent_strength[i] = prev_model[model_team]["average opponent strength"]
+
+        i += 1
+
+    priors = {
+        "teams": list(teams),
+        "points margin": points_margin,
+        "rushing yards margin": rushing_yards_margin,
+        "home field correction": home_field_correction,
+        "average opponent strength": average_opponent_strength
+    }
+
+    # Save the priors to file so every early week of the season can reuse them
+    if write:
+        absolute_path = utils.get_abs_path(__file__)
+        filename = f"{absolute_path}/{year}/priors-{year}.npz"
+        write_priors(priors, filename, get_priors_source_signatures(year), get_priors_source_hashes(year))
+
+    return priors
+
+def get_priors_sources(year):
+
+    # The priors are stale once the previous season's bowl model or stats change
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year - 1)
+    bowl_week, _ = utils.check_week("bowl", num_weeks)
+
+    model_source = f"models/{year - 1}/model-{year - 1}-{bowl_week:02}.csv"
+    stats_filename = get_source_filename(year - 1, bowl_week)
+
+    return model_source, stats_filename
+
+def get_priors_source_signatures(year):
+
+    model_source, stats_filename = get_priors_sources(year)
+
+    # Only the modification times and sizes, so checking an unchanged season reads neither file
+    signatures = get_output_file_signature(model_source)
+    if exists(stats_filename):
+        status = os.stat(stats_filename)
+        signatures += [status.st_mtime_ns, status.st_size]
+    else:
+        signatures += [0, 0]
+
+    return signatures
+
+def get_priors_source_hashes(year):
+
+    model_source, stats_filename = get_priors_sources(year)
+
+    with open_output_file(model_source) as file:
+        model_hash = hashlib.sha256(file.read().encode()).hexdigest()
+
+    if exists(stats_filename):
+        stats_hash = get_source_hash(stats_filename)
+    else:
+        stats_hash = ""
+
+    return [model_hash, stats_hash]
+
+def write_priors(priors, filename, source_signatures, source_hashes):
+
+    os.makedirs(dirname(filename), exist_ok=True)
+    np.savez(filename,
+             teams=np.array(priors["teams"]),
+             source_signatures=np.array(source_signatures, dtype=np.int64),
+             source_hashes=np.array(source_hashes),
+             points_margin=priors["points margin"],
+             rushing_yards_margin=priors["rushing yards margin"],
+             home_field_correction=priors["home field correction"],
+             average_opponent_strength=priors["average opponent strength"])
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    teams, _ = the_kick_is_bad.read_teams(year)
+    priors = calculate_priors(year, teams)
+    i = 0
+    for team in priors["teams"]:
+        print("{0}: Points Margin: {1:.1f}, Rushing Yards Margin: {2:.1f}, Home Field Correction: {3:.2f}, Average Opponent Strength: {4:.1f}".format(team,
+                                                                                                                                                     priors["points margin"][i],
+                                                                                                                                                     priors["rushing yards margin"][i],
+                                                                                                                                                     priors["home field correction"][i],
+                                                                                                                                                     priors["average opponent strength"][i]))
+        i += 1
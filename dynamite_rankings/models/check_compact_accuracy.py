@@ -0,0 +1,78 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import json
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.bootstrap_strengths import bootstrap_replicate_strengths, get_season_arrays
+from models.compact_arrays import compare_arrays, strength_tolerance
+from stats.read_stats import read_stats
+
+
+def check_compact_accuracy(year, week, stats, teams, num_replicates=100, seed=0):
+
+    season_arrays = get_season_arrays(year, week, stats, teams)
+
+    # Resampling is drawn per block of replicates whatever the chunking, so only the precision differs
+    full_strengths = bootstrap_replicate_strengths(season_arrays, num_replicates, seed, compact=False)
+    compact_strengths = bootstrap_replicate_strengths(season_arrays, num_replicates, seed, compact=True)
+
+    max_difference = compare_arrays(full_strengths, compact_strengths)
+
+    accuracy = {
+        "year": year,
+        "week": week,
+        "replicates": num_replicates,
+        "max strength difference": max_difference,
+        "strength tolerance": strength_tolerance,
+        "within tolerance": max_difference <= strength_tolerance,
+        "full bytes": int(full_strengths.nbytes),
+        "compact bytes": int(compact_strengths.nbytes)
+    }
+
+    return accuracy
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    if len(sys.argv) > 3:
+        num_replicates = int(sys.argv[3])
+    else:
+        num_replicates = 100
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    if week == 0:
+        stats = None
+    else:
+        stats = read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    accuracy = check_compact_accuracy(year, week, stats, teams, num_replicates)
+    accuracy_string = json.dumps(accuracy, indent=2)
+    print(accuracy_string)
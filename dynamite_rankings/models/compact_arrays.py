@@ -0,0 +1,75 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+
+
+# Compact mode stores real values as float32 and counts as int16
+# float32 keeps 24 bits of mantissa, so a value under 128 points is stored within 2**-17 (about 8e-6) points
+# Solving the model in float32 adds the rounding of the solve, which grows with the condition number of A
+# On full seasons the compact strengths come out within about 1e-5 points of the float64 path
+# models/check_compact_accuracy.py measures this for any year and week
+# int16 holds -32768 to 32767, enough for years, weeks, ranks and games played
+compact_dtypes = {
+    "float": np.float32,
+    "int": np.int16
+}
+full_dtypes = {
+    "float": np.float64,
+    "int": np.int64
+}
+
+# Largest difference from the float64 path allowed for a compact strength, in points
+strength_tolerance = 0.001
+
+
+def get_dtypes(compact):
+
+    if compact:
+        return compact_dtypes
+
+    return full_dtypes
+
+def to_compact(array):
+
+    array = np.asarray(array)
+
+    if np.issubdtype(array.dtype, np.integer) or array.dtype == bool:
+        # Refuse to silently wrap counts that do not fit
+        limits = np.iinfo(compact_dtypes["int"])
+        if array.size and (array.min() < limits.min or array.max() > limits.max):
+            raise ValueError(f"Values from {array.min()} to {array.max()} do not fit in {limits.dtype}")
+        return array.astype(compact_dtypes["int"])
+
+    return array.astype(compact_dtypes["float"])
+
+def compare_arrays(full_array, compact_array):
+
+    # Compare in float64 so the difference itself is not rounded
+    difference = np.abs(np.asarray(full_array, dtype=np.float64) - np.asarray(compact_array, dtype=np.float64))
+    if difference.size == 0:
+        return 0.0
+
+    return float(np.max(difference))
@@ -0,0 +1,178 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.calculate_model import calculate_games_played, calculate_games_played_normalization, calculate_home_field_corrections, calculate_points_margin, calculate_right_hand_side, calculate_rushing_yards_margin, get_input, model_configuration
+from models.read_priors import read_priors
+from models.schedule_index import get_team_totals, load_schedule_index
+from models.solve_components import solve_by_components
+from stats.read_stats import read_stats
+
+
+# Variants of the model blended into the consensus, each overrides some of the production options
+ensemble_variants = {
+    "production": {},
+    "no rushing yards": {"use rushing yards margin": False},
+    "low home field": {"home field coefficient": 3},
+    "high home field": {"home field coefficient": 5},
+    "low rush yard": {"rush yard coefficient": 0.06},
+    "high rush yard": {"rush yard coefficient": 0.1},
+    "early prior cutoff": {"prior cutoff week": 6},
+    "late prior cutoff": {"prior cutoff week": 12}
+}
+
+
+def calculate_ensemble(year, week, stats, teams, inputs=None, variants=ensemble_variants):
+
+    num_teams = len(teams)
+
+    configurations = {}
+    for name in variants:
+        configuration = dict(model_configuration)
+        configuration.update(variants[name])
+        configurations[name] = configuration
+
+    # Variants on the same side of their prior cutoff share the games played, and so the whole matrix A
+    groups = {}
+    for name in configurations:
+        uses_priors = week < configurations[name]["prior cutoff week"]
+        groups.setdefault(uses_priors, []).append(name)
+
+    # Inputs are read once for every variant
+    if True in groups:
+        priors = get_input(inputs, "priors", read_priors, year, teams)
+    else:
+        priors = None
+    if week > 0:
+        schedule = get_input(inputs, "schedule", load_schedule_index, year, week, stats, teams, False)
+        team_totals = get_team_totals(schedule)
+    else:
+        schedule = None
+        team_totals = None
+
+    strengths = {}
+    for uses_priors in groups:
+        names = groups[uses_priors]
+
+        # The features only depend on whether the priors are used, so any variant in the group stands for all
+        group_configuration = configurations[names[0]]
+        games_played = calculate_games_played(week, team_totals, teams, group_configuration)
+        points_margin = calculate_points_margin(week, team_totals, priors, games_played, teams, group_configuration)
+        rushing_yards_margin = calculate_rushing_yards_margin(week, team_totals, priors, games_played, teams, group_configuration)
+        home_field_corrections = calculate_home_field_corrections(week, team_totals, priors, games_played, teams, group_configuration)
+        games_played_normalization = calculate_games_played_normalization(week, schedule, games_played, teams)
+
+        # One column of B per variant, all solved against the same A
+        B = np.zeros((num_teams, len(names)))
+        i = 0
+        for name in names:
+            B[:, i] = calculate_right_hand_side(week, points_margin, rushing_yards_margin, home_field_corrections, games_played, priors, configurations[name])
+            i += 1
+
+        A = np.eye(num_teams) - games_played_normalization
+        group_strengths = solve_by_components(A, B)
+
+        i = 0
+        for name in names:
+            strengths[name] = group_strengths[:, i]
+            i += 1
+
+    # The consensus weighs every variant equally
+    blended_strengths = np.mean([strengths[name] for name in variants], axis=0)
+
+    ensemble = {}
+    i = 0
+    for team in teams:
+        ensemble[team] = {"blended strength": blended_strengths[i]}
+        for name in variants:
+            ensemble[team][name] = strengths[name][i]
+        i += 1
+
+    # Rank the teams by the consensus
+    sorted_teams = sorted(ensemble, key=lambda team: ensemble[team]["blended strength"], reverse=True)
+    rank = 1
+    for team in sorted_teams:
+        ensemble[team]["rank"] = rank
+        rank += 1
+
+    return ensemble
+
+def get_variant_column(name):
+
+    return "".join(word.capitalize() for word in name.split(" "))
+
+def print_ensemble(year, week, ensemble, variants=ensemble_variants):
+
+    sorted_teams = sorted(ensemble, key=lambda team: ensemble[team]["rank"])
+    for team in sorted_teams:
+        variant_strengths = [ensemble[team][name] for name in variants]
+        print("{0}: {1}, Blended Strength: {2:.1f}, Variant Range: {3:.1f} to {4:.1f}".format(ensemble[team]["rank"],
+                                                                                           team,
+                                                                                           ensemble[team]["blended strength"],
+                                                                                           min(variant_strengths),
+                                                                                           max(variant_strengths)))
+
+def write_ensemble(year, week, ensemble, variants=ensemble_variants):
+
+    # Print ensemble
+    ensemble_file_string = "Team,Rank,BlendedStrength"
+    for name in variants:
+        ensemble_file_string += f",{get_variant_column(name)}"
+    ensemble_file_string += "\n"
+
+    sorted_teams = sorted(ensemble, key=lambda team: ensemble[team]["rank"])
+    for team in sorted_teams:
+
+        # Print to file string in csv format
+        ensemble_file_string += "{0},{1},{2}".format(team, ensemble[team]["rank"], ensemble[team]["blended strength"])
+        for name in variants:
+            ensemble_file_string += ",{0}".format(ensemble[team][name])
+        ensemble_file_string += "\n"
+
+    # Create the ensemble file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/ensemble-{year}-{week:02}.csv"
+    utils.write_string(ensemble_file_string, filename)
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    if week == 0:
+        stats = None
+    else:
+        stats = read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    ensemble = calculate_ensemble(year, week, stats, teams)
+    print_ensemble(year, week, ensemble)
+    write_ensemble(year, week, ensemble)
@@ -27,207 +27,209 @@ import the_kick_is_bad
 from the_kick_is_bad import utils
 
 # DynamiteRankings imports
+from checkpoints.checkpoint import complete_partition, is_partition_completed, load_checkpoint, remove_checkpoint
 from rankings.read_rankings import read_rankings
 
 
-def evaluate_model():
-
-    results = {}
+def evaluate_model(restart=False):
 
     start_year = 2013
     end_year = 2020
     max_num_weeks = 16
-    
-    all_num_games = 0
-    all_num_correct = 0
-    conf_num_games = 0
-    conf_num_correct = 0
-    nonconf_num_games = 0
-    nonconf_num_correct = 0
-    champ_num_games = 0
-    champ_num_correct = 0
-    fcs_num_games = 0
-    fcs_num_correct = 0
-    bowl_num_games = 0
-    bowl_num_correct = 0
-    yearly_num_games = []
-    for _ in range(0, end_year - start_year + 1):
-        yearly_num_games.append(0)
-    yearly_num_correct = []
-    for _ in range(0, end_year - start_year + 1):
-        yearly_num_correct.append(0)
-    weekly_num_games = []
-    for _ in range(0, max_num_weeks):
-        weekly_num_games.append(0)
-    weekly_num_correct = []
-    for _ in range(0, max_num_weeks):
-        weekly_num_correct.append(0)
 
-    for year in range(start_year, end_year + 1):
+    # Seasons finished before an interruption are not evaluated again
+    parameters = {"start year": start_year, "end year": end_year, "max number of weeks": max_num_weeks}
+    checkpoint = load_checkpoint("evaluate_model", parameters)
+    if restart:
+        remove_checkpoint(checkpoint)
+        checkpoint = load_checkpoint("evaluate_model", parameters)
 
-        year_idx = year - start_year
+    # The checkpointed counts already include every completed season
+    if checkpoint["state"] is None:
+        counts = create_evaluation_counts(start_year, end_year, max_num_weeks)
+    else:
+        counts = checkpoint["state"]
 
-        teams, _ = the_kick_is_bad.read_teams(year)
+    for year in range(start_year, end_year + 1):
+
+        if is_partition_completed(checkpoint, [year]):
+            continue
 
         num_weeks = the_kick_is_bad.read_number_of_weeks(year)
 
-        for week in range(1, num_weeks + 1):
-
-            week_idx = week - 1
-
-            print(f"Processing evaluation data from year {year}, week {week:02}...")
-
-            rankings = read_rankings(year, week - 1)
-
-            scores = the_kick_is_bad.read_scores(year, week)
-
-            # Loop through scores to make predictions
-            for game in scores["games"]:
-
-                # Get the team names
-                away_team = game["game"]["away"]["names"]["standard"]
-                home_team = game["game"]["home"]["names"]["standard"]
-
-                # Check if this is a valid game
-                if game["game"]["gameState"] != "final":
-                    continue
-
-                # Get the actual results
-                away_score = int(game["game"]["away"]["score"])
-                home_score = int(game["game"]["home"]["score"])
-                if away_score > home_score:
-                    home_won = 0
-                elif away_score < home_score:
-                    home_won = 1
-                else:
-                    continue
-
-                # Determine home field advantage
-                # Assume all bowl games are neutral site
-                home_field_advantage = 4
-
-                # Get away team strength
-                away_team_strength = rankings[away_team]["strength"]
-
-                # Get home team strength and add home field advantage
-                home_team_strength = rankings[home_team]["strength"] + home_field_advantage
-
-                # Pick the winner based on team strength
-                if home_team_strength >= away_team_strength:
-                    prediction = 1
-                else:
-                    prediction = 0
-
-                # Determine if the result was right
-                if home_won == prediction:
-                    is_correct = 1
-                else:
-                    is_correct = 0
-
-                # Increment relevant result counters
-                all_num_games += 1
-                all_num_correct += is_correct
-                # Conference/non-conference
-                away_team_conference = teams[away_team]["conference"]
-                home_team_conference = teams[home_team]["conference"]
-                if away_team_conference == home_team_conference:
-                    conf_num_games += 1
-                    conf_num_correct += is_correct
-                elif away_team != "FCS" and home_team != "FCS":
-                    nonconf_num_games += 1
-                    nonconf_num_correct += is_correct
-                # Championship
-                if (week == num_weeks - 1) and (away_team_conference == home_team_conference):
-                    champ_num_games += 1
-                    champ_num_correct += is_correct
-                # FCS
-                if away_team == "FCS" or home_team == "FCS":
-                    fcs_num_games += 1
-                    fcs_num_correct += is_correct
-                # Yearly
-                yearly_num_games[year_idx] += 1
-                yearly_num_correct[year_idx] += is_correct
-                # Weekly
-                weekly_num_games[week_idx] += 1
-                weekly_num_correct[week_idx] += is_correct
-
-        # Add bowl week
-        week_idx = num_weeks
-        
-        print(f"Processing evaluation data from year {year}, week 'bowl'...")
-
-        scores = the_kick_is_bad.read_scores(year, "bowl")
+        # Predictions for each week use the rankings from the week before
+        strengths = []
+        for week in range(0, num_weeks):
+            rankings = read_rankings(year, week)
+            week_strengths = {}
+            for team in rankings:
+                week_strengths[team] = rankings[team]["strength"]
+            strengths.append(week_strengths)
+
+        season_counts = evaluate_season(year, strengths)
+        add_evaluation_counts(counts, season_counts)
+        complete_partition(checkpoint, [year], counts)
+
+    results = summarize_evaluation_counts(counts)
+
+    # Save the evaluation results to file
+    absolute_path = utils.get_abs_path(__file__)
+    results_filename = f"{absolute_path}/model_evalation.json"
+    utils.write_json(results, results_filename)
+
+    remove_checkpoint(checkpoint)
+
+def create_evaluation_counts(start_year, end_year, max_num_weeks):
+
+    # Each count is [number of games, number correct]
+    counts = {
+        "all": [0, 0],
+        "conference": [0, 0],
+        "non_conference": [0, 0],
+        "championship": [0, 0],
+        "fcs": [0, 0],
+        "bowl": [0, 0]
+    }
+    for year in range(start_year, end_year + 1):
+        counts[f"year {year}"] = [0, 0]
+    for week in range(1, max_num_weeks + 1):
+        counts[f"week {week}"] = [0, 0]
+
+    return counts
+
+def add_evaluation_counts(counts, other_counts):
+
+    for key in other_counts:
+        if key not in counts:
+            counts[key] = [0, 0]
+        counts[key][0] += other_counts[key][0]
+        counts[key][1] += other_counts[key][1]
+
+def increment_evaluation_count(counts, key, is_correct):
+
+    if key not in counts:
+        counts[key] = [0, 0]
+    counts[key][0] += 1
+    counts[key][1] += is_correct
+
+def summarize_evaluation_counts(counts):
+
+    # Calculate final results
+    results = {}
+    for key in counts:
+        num_games, num_correct = counts[key]
+        results[key] = (num_correct / num_games) * 100
+
+    return results
 
+def evaluate_season(year, strengths):
+
+    counts = {}
+
+    teams, _ = the_kick_is_bad.read_teams(year)
+
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+
+    for week in range(1, num_weeks + 1):
+
+        print(f"Processing evaluation data from year {year}, week {week:02}...")
+
+        scores = the_kick_is_bad.read_scores(year, week)
+
+        # Loop through scores to make predictions
         for game in scores["games"]:
 
-            # Get the team names
+            # Regular season games give the home team the home field advantage
+            is_correct = evaluate_game(game, strengths[week - 1], 4)
+            if is_correct is None:
+                continue
+
             away_team = game["game"]["away"]["names"]["standard"]
             home_team = game["game"]["home"]["names"]["standard"]
 
-            # Check if this is a valid game
-            if game["game"]["gameState"] != "final":
-                continue
+            # Increment relevant result counters
+            increment_evaluation_count(counts, "all", is_correct)
+            # Conference/non-conference
+            away_team_conference = teams[away_team]["conference"]
+            home_team_conference = teams[home_team]["conference"]
+            if away_team_conference == home_team_conference:
+                increment_evaluation_count(counts, "conference", is_correct)
+            elif away_team != "FCS" and home_team != "FCS":
+                increment_evaluation_count(counts, "non_conference", is_correct)
+            # Championship
+            if (week == num_weeks - 1) and (away_team_conference == home_team_conference):
+                increment_evaluation_count(counts, "championship", is_correct)
+            # FCS
+            if away_team == "FCS" or home_team == "FCS":
+                increment_evaluation_count(counts, "fcs", is_correct)
+            # Yearly
+            increment_evaluation_count(counts, f"year {year}", is_correct)
+            # Weekly
+            increment_evaluation_count(counts, f"week {week}", is_correct)
 
-            # Get the actual results
-            away_score = int(game["game"]["away"]["score"])
-            home_score = int(game["game"]["home"]["score"])
-            if away_score > home_score:
-                home_won = 0
-            elif away_score < home_score:
-                home_won = 1
-            else:
-                continue
+    # Add bowl week
+    print(f"Processing evaluation data from year {year}, week 'bowl'...")
 
-            # Determine home field advantage
-            # Assume all bowl games are neutral site
-            home_field_advantage = 0
+    scores = the_kick_is_bad.read_scores(year, "bowl")
 
-            # Get away team strength
-            away_team_strength = rankings[away_team]["strength"]
+    for game in scores["games"]:
 
-            # Get home team strength and add home field advantage
-            home_team_strength = rankings[home_team]["strength"] + home_field_advantage
+        # Assume all bowl games are neutral site
+        # Bowl predictions use the same rankings as the last regular season week
+        is_correct = evaluate_game(game, strengths[num_weeks - 1], 0)
+        if is_correct is None:
+            continue
 
-            # Pick the winner based on team strength
-            if home_team_strength >= away_team_strength:
-                prediction = 1
-            else:
-                prediction = 0
+        # Increment relevant result counters
+        increment_evaluation_count(counts, "all", is_correct)
+        # Bowl
+        increment_evaluation_count(counts, "bowl", is_correct)
+        # Yearly
+        increment_evaluation_count(counts, f"year {year}", is_correct)
 
-            # Determine if the result was right
-            if home_won == prediction:
-                is_correct = 1
-            else:
-                is_correct = 0
+    return counts
 
-            # Increment relevant result counters
-            all_num_games += 1
-            all_num_correct += is_correct
-            # Bowl
-            bowl_num_games += 1
-            bowl_num_correct += is_correct
-            # Yearly
-            yearly_num_games[year_idx] += 1
-            yearly_num_correct[year_idx] += is_correct
-                
+def evaluate_game(game, strengths, home_field_advantage):
 
-    # Calculate final results
-    results["all"] = (all_num_correct / all_num_games) * 100
-    results["conference"] = (conf_num_correct / conf_num_games) * 100
-    results["non_conference"] = (nonconf_num_correct / nonconf_num_games) * 100
-    results["championship"] = (champ_num_correct / champ_num_games) * 100
-    results["fcs"] = (fcs_num_correct / fcs_num_games) * 100
-    results["bowl"] = (bowl_num_correct / bowl_num_games) * 100
-    for year_idx in range(0, end_year - start_year + 1):
-        results[f"year {start_year + year_idx}"] = (yearly_num_correct[year_idx] / yearly_num_games[year_idx]) * 100
-    for week_idx in range(0, max_num_weeks):
-        results[f"week {1 + week_idx}"] = (weekly_num_correct[week_idx] / weekly_num_games[week_idx]) * 100
+    # Check if this is a valid game
+    if game["game"]["gameState"] != "final":
+        return None
 
-    # Save the evaluation results to file
-    absolute_path = utils.get_abs_path(__file__)
-    results_filename = f"{absolute_path}/model_evalation.json"
-    utils.write_json(results, results_filename)
+    # Get the team names
+    away_team = game["game"]["away"]["names"]["standard"]
+    home_team = game["game"]["home"]["names"]["standard"]
+
+    # Get the actual results
+    away_score = int(game["game"]["away"]["score"])
+    home_score = int(game["game"]["home"]["score"])
+    if away_score > home_score:
+        home_won = 0
+    elif away_score < home_score:
+        home_won = 1
+    else:
+        return None
+
+    # Get away team strength
+    away_team_strength = strengths[away_team]
+
+    # Get home team strength and add home field advantage
+    home_team_strength = strengths[home_team] + home_field_advantage
+
+    # Pick the winner based on team strength
+    if home_team_strength >= away_team_strength:
+        prediction = 1
+    else:
+        prediction = 0
+
+    # Determine if the result was right
+    if home_won == prediction:
+        is_correct = 1
+    else:
+        is_correct = 0
+
+    return is_correct
 
 
 if __name__ == "__main__":
-    evaluate_model()
+    restart = len(sys.argv) > 1 and sys.argv[1] == "restart"
+    evaluate_model(restart)
@@ -0,0 +1,192 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import hashlib
+import numpy as np
+import os
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.bootstrap_strengths import get_season_arrays
+from models.calculate_model import model_configuration
+from models.solve_components import solve_by_components
+from stats.read_stats import read_stats
+
+
+def calculate_game_impacts(year, week, stats, teams):
+
+    season_arrays = get_season_arrays(year, week, stats, teams)
+    num_teams = len(teams)
+
+    team = season_arrays["team"]
+    opponent = season_arrays["opponent"]
+    games_played = np.maximum(1, season_arrays["games played"])
+
+    inverse = load_schedule_inverse(year, week, season_arrays, teams)
+
+    # Each game's share of B, from the point of view of each team that played it
+    rush_yard_coefficient = model_configuration["rush yard coefficient"]
+    home_field_coefficient = model_configuration["home field coefficient"]
+    if not model_configuration["use rushing yards margin"]:
+        rush_yard_coefficient = 0
+    edge_values = season_arrays["points margin"] + rush_yard_coefficient * season_arrays["rushing yards margin"] + home_field_coefficient * season_arrays["home field correction"]
+    edge_values = edge_values / games_played[team]
+
+    # The previous season is one more term of B for each team
+    prior_values = season_arrays["prior points margin"] + rush_yard_coefficient * season_arrays["prior rushing yards margin"] + home_field_coefficient * season_arrays["prior home field correction"]
+    prior_values = (prior_values + season_arrays["prior average opponent strength"]) / games_played
+
+    # Strengths are linear in B, so a game moves team k by inverse[k, team] times its share of B
+    # Both sides of a game are added together into one column per game
+    game_ids, game_teams, game_opponents = get_game_ids(team, opponent)
+    edge_impacts = inverse[:, team] * edge_values
+    impacts = np.zeros((num_teams, len(game_teams)))
+    np.add.at(impacts, (slice(None), game_ids), edge_impacts)
+
+    game_impacts = {
+        "teams": list(teams),
+        "team": game_teams,
+        "opponent": game_opponents,
+        "impacts": impacts,
+        "prior impacts": inverse * prior_values
+    }
+
+    return game_impacts
+
+def get_game_ids(team, opponent):
+
+    # A game is stored once for each team, the nth meeting of two teams in one slice pairs with the nth in the other
+    meetings = {}
+    game_keys = []
+    for e in range(len(team)):
+        pair = (team[e], opponent[e])
+        meetings[pair] = meetings.get(pair, 0) + 1
+        game_keys.append((min(pair), max(pair), meetings[pair]))
+
+    key_to_id = {}
+    game_ids = np.zeros(len(team), dtype=int)
+    game_teams = []
+    game_opponents = []
+    for e in range(len(team)):
+        if game_keys[e] not in key_to_id:
+            key_to_id[game_keys[e]] = len(game_teams)
+            game_teams.append(team[e])
+            game_opponents.append(opponent[e])
+        game_ids[e] = key_to_id[game_keys[e]]
+
+    return game_ids, np.array(game_teams, dtype=int), np.array(game_opponents, dtype=int)
+
+def get_team_game_impacts(game_impacts, team):
+
+    teams_list = game_impacts["teams"]
+    k = teams_list.index(team)
+
+    # Order the games by how much they moved the team, either way
+    team_impacts = game_impacts["impacts"][k]
+    order = np.argsort(-np.abs(team_impacts), kind="stable")
+
+    impacts = []
+    for g in order:
+        impacts.append({
+            "team": teams_list[game_impacts["team"][g]],
+            "opponent": teams_list[game_impacts["opponent"][g]],
+            "impact": team_impacts[g]
+        })
+
+    return impacts
+
+def get_inverse_filename(year, week):
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/{year}/inverse-{year}-{week:02}.npz"
+
+def get_schedule_hash(season_arrays):
+
+    # The inverse depends only on who played whom and the games played
+    schedule_hash = hashlib.sha256()
+    for key in ["team", "opponent", "games played"]:
+        schedule_hash.update(np.ascontiguousarray(season_arrays[key], dtype=np.float64).tobytes())
+
+    return schedule_hash.hexdigest()
+
+def load_schedule_inverse(year, week, season_arrays, teams):
+
+    filename = get_inverse_filename(year, week)
+    schedule_hash = get_schedule_hash(season_arrays)
+
+    # Reuse the saved inverse while the schedule it was built from is unchanged
+    if exists(filename):
+        with np.load(filename) as inverse_data:
+            if inverse_data["teams"].tolist() == list(teams) and str(inverse_data["schedule_hash"]) == schedule_hash:
+                return inverse_data["inverse"]
+
+    inverse = calculate_schedule_inverse(season_arrays)
+
+    os.makedirs(dirname(filename), exist_ok=True)
+    np.savez(filename, teams=np.array(list(teams)), schedule_hash=np.array(schedule_hash), inverse=inverse)
+
+    return inverse
+
+def calculate_schedule_inverse(season_arrays):
+
+    team = season_arrays["team"]
+    opponent = season_arrays["opponent"]
+    games_played = np.maximum(1, season_arrays["games played"])
+    num_teams = len(games_played)
+
+    games_played_normalization = np.zeros((num_teams, num_teams))
+    games_played_normalization[team, opponent] = 1 / games_played[team]
+    A = np.eye(num_teams) - games_played_normalization
+
+    # One blockwise solve with every column of the identity as right hand side
+    return solve_by_components(A, np.eye(num_teams))
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    team = sys.argv[3]
+    if len(sys.argv) > 4:
+        num_games = int(sys.argv[4])
+    else:
+        num_games = 10
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    if week == 0:
+        stats = None
+    else:
+        stats = read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    game_impacts = calculate_game_impacts(year, week, stats, teams)
+    k = list(teams).index(team)
+    print("{0}: Strength: {1:.1f}, Previous Season: {2:+.1f}".format(team,
+                                                                      np.sum(game_impacts["impacts"][k]) + np.sum(game_impacts["prior impacts"][k]),
+                                                                      np.sum(game_impacts["prior impacts"][k])))
+    for impact in get_team_game_impacts(game_impacts, team)[:num_games]:
+        print("{0} vs {1}: {2:+.2f}".format(impact["team"], impact["opponent"], impact["impact"]))
@@ -27,6 +27,10 @@ import sys
 import the_kick_is_bad
 from the_kick_is_bad import utils
 
+# DynamiteRankings imports
+from archives.season_archive import open_output_file
+from database.history_database import query_week
+
 
 def read_model(year, week):
 
@@ -34,10 +38,25 @@ def read_model(year, week):
     num_weeks = the_kick_is_bad.read_number_of_weeks(year)
     week, _ = utils.check_week(week, num_weeks)
 
-    # Open model file with absolute path
-    absolute_path = utils.get_abs_path(__file__)
-    filename = f"{absolute_path}/{year}/model-{year}-{week:02}.csv"
-    with open(filename) as file:
+    # Read from the history database when it holds the current model file
+    source = f"models/{year}/model-{year}-{week:02}.csv"
+    records = query_week("models", year, week, source)
+    if records is not None:
+        model = {}
+        for record in records:
+            model[record["team"]] = {
+                "strength": record["strength"],
+                "standard deviation": record["standard deviation"],
+                "points margin": record["points margin"],
+                "average opponent strength": record["average opponent strength"],
+                "rushing yards margin": record["rushing yards margin"],
+                "home field correction": record["home field correction"],
+                "games played": record["games played"]
+            }
+        return model
+
+    # Open model file, from the season archive if the season has been archived
+    with open_output_file(source) as file:
 
         model = {}
 
@@ -67,7 +86,7 @@ def read_model(year, week):
                 "average opponent strength": float(average_opponent_strength),
                 "rushing yards margin": float(rushing_yards_margin),
                 "home field correction": float(home_field_correction),
-                "games played": int(games_played)
+                "games played": int(float(games_played))
             }
 
             model_line = file.readline().strip()
@@ -0,0 +1,88 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import json
+import numpy as np
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.calculate_priors import calculate_priors, get_priors_source_hashes, get_priors_source_signatures, write_priors
+
+
+def read_priors(year, teams, write=True):
+
+    # Open priors file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/priors-{year}.npz"
+
+    # Calculate the priors once per season if they do not exist yet
+    if not exists(filename):
+        return calculate_priors(year, teams, write)
+
+    with np.load(filename) as priors_data:
+
+        # Recalculate if the teams file changed since the priors were saved
+        priors_teams = priors_data["teams"].tolist()
+        if priors_teams != list(teams):
+            return calculate_priors(year, teams, write)
+
+        # Recalculate if the sources were never recorded
+        if "source_signatures" not in priors_data or "source_hashes" not in priors_data:
+            return calculate_priors(year, teams, write)
+
+        # Pack priors structure
+        priors = {
+            "teams": priors_teams,
+            "points margin": priors_data["points_margin"],
+            "rushing yards margin": priors_data["rushing_yards_margin"],
+            "home field correction": priors_data["home_field_correction"],
+            "average opponent strength": priors_data["average_opponent_strength"]
+        }
+        saved_signatures = priors_data["source_signatures"].tolist()
+        saved_hashes = priors_data["source_hashes"].tolist()
+
+    # Unchanged modification times and sizes mean unchanged sources, only a mismatch reads and hashes them
+    source_signatures = get_priors_source_signatures(year)
+    if source_signatures == saved_signatures:
+        return priors
+
+    # Recalculate if the previous season's bowl model or stats changed
+    if get_priors_source_hashes(year) != saved_hashes:
+        return calculate_priors(year, teams, write)
+
+    # Touched but unchanged, so record the new signatures to skip the hashing next time
+    if write:
+        write_priors(priors, filename, source_signatures, saved_hashes)
+
+    return priors
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    teams, _ = the_kick_is_bad.read_teams(year)
+    priors = read_priors(year, teams)
+    priors_string = json.dumps({key: np.asarray(value).tolist() for key, value in priors.items()}, indent=2)
+    print(priors_string)
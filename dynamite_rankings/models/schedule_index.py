@@ -0,0 +1,335 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import os
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from stats.read_stats import get_source_filename, get_source_hash
+
+
+# Each game is stored twice, once from the point of view of each team
+# Each edge is tagged with the week the index appended it at, not the week the game was played
+# Games from weeks the index skipped over land on the later week, and asking for one of the skipped
+# weeks finds no stats hash or too few games for it and rebuilds from there
+edge_fields = {
+    "team": "team",
+    "opponent": "opponent",
+    "indexed week": "indexed_week",
+    "home": "home",
+    "neutral": "neutral",
+    "points gained": "points_gained",
+    "points allowed": "points_allowed",
+    "rushing yards gained": "rushing_yards_gained",
+    "rushing yards allowed": "rushing_yards_allowed"
+}
+
+# Running per team sums kept with the edges, row w holds the totals through week w
+# A new week is the previous row plus that week's games, so the season so far is never summed again
+total_fields = {
+    "games played": "games_played_totals",
+    "points margin": "points_margin_totals",
+    "rushing yards margin": "rushing_yards_margin_totals",
+    "home field correction": "home_field_correction_totals"
+}
+
+
+def load_schedule_index(year, week, stats, teams, write=True):
+
+    schedule_index = read_schedule_index(year, teams)
+    stats_hash = get_stats_hash(year, week)
+
+    # Only rebuild the index if the stats file changed or has games it has not seen yet
+    if not is_schedule_index_current(schedule_index, week, stats, teams, stats_hash):
+        schedule_index = update_schedule_index(schedule_index, week, stats, teams, stats_hash)
+        if write:
+            write_schedule_index(schedule_index, year)
+
+    return get_schedule_through_week(schedule_index, week)
+
+def create_schedule_index(teams):
+
+    schedule_index = {"teams": list(teams)}
+    for field in edge_fields:
+        if field in ["points gained", "points allowed", "rushing yards gained", "rushing yards allowed"]:
+            schedule_index[field] = np.zeros(0)
+        else:
+            schedule_index[field] = np.zeros(0, dtype=int)
+    for field in total_fields:
+        schedule_index[field + " totals"] = np.zeros((1, len(teams)))
+    schedule_index["stats hashes"] = np.array([""])
+
+    return schedule_index
+
+def get_stats_hash(year, week):
+
+    # Without a source file only the games played counts are checked
+    stats_filename = get_source_filename(year, week)
+    if not exists(stats_filename):
+        return ""
+
+    return get_source_hash(stats_filename)
+
+def read_schedule_index(year, teams):
+
+    # Open schedule index file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/schedule-{year}.npz"
+    if not exists(filename):
+        return create_schedule_index(teams)
+
+    with np.load(filename) as schedule_data:
+
+        # Start over if the teams file changed since the index was saved
+        if schedule_data["teams"].tolist() != list(teams):
+            return create_schedule_index(teams)
+
+        # Indexes saved before the totals and stats hashes were kept are rebuilt from the stats
+        for field in edge_fields:
+            if edge_fields[field] not in schedule_data:
+                return create_schedule_index(teams)
+        for field in total_fields:
+            if total_fields[field] not in schedule_data:
+                return create_schedule_index(teams)
+        if "stats_hashes" not in schedule_data:
+            return create_schedule_index(teams)
+
+        schedule_index = {"teams": list(teams)}
+        for field in edge_fields:
+            schedule_index[field] = schedule_data[edge_fields[field]]
+        for field in total_fields:
+            schedule_index[field + " totals"] = schedule_data[total_fields[field]]
+        schedule_index["stats hashes"] = schedule_data["stats_hashes"]
+
+        return schedule_index
+
+def write_schedule_index(schedule_index, year):
+
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/schedule-{year}.npz"
+    os.makedirs(dirname(filename), exist_ok=True)
+
+    schedule_data = {"teams": np.array(schedule_index["teams"])}
+    for field in edge_fields:
+        schedule_data[edge_fields[field]] = schedule_index[field]
+    for field in total_fields:
+        schedule_data[total_fields[field]] = schedule_index[field + " totals"]
+    schedule_data["stats_hashes"] = schedule_index["stats hashes"]
+    np.savez(filename, **schedule_data)
+
+def get_schedule_through_week(schedule_index, week):
+
+    mask = schedule_index["indexed week"] <= week
+
+    schedule = {"teams": schedule_index["teams"]}
+    for field in edge_fields:
+        schedule[field] = schedule_index[field][mask]
+    for field in total_fields:
+        schedule[field + " totals"] = get_totals_through_week(schedule_index[field + " totals"], week)
+    schedule["stats hashes"] = get_stats_hashes_through_week(schedule_index["stats hashes"], week)
+
+    return schedule
+
+def get_totals_through_week(totals, week):
+
+    num_rows = totals.shape[0]
+    if week + 1 <= num_rows:
+        return totals[:week + 1]
+
+    # Weeks the index never saw added no games, so they repeat the last totals
+    padding = np.repeat(totals[-1:], week + 1 - num_rows, axis=0)
+
+    return np.concatenate([totals, padding])
+
+def get_stats_hashes_through_week(stats_hashes, week):
+
+    # Weeks the index never saw have no stats file to match
+    num_rows = len(stats_hashes)
+    if week + 1 <= num_rows:
+        return stats_hashes[:week + 1]
+
+    return np.concatenate([stats_hashes, np.full(week + 1 - num_rows, "", dtype=stats_hashes.dtype)])
+
+def get_team_totals(schedule):
+
+    # Totals through the last week of the schedule
+    team_totals = {}
+    for field in total_fields:
+        team_totals[field] = schedule[field + " totals"][-1]
+
+    return team_totals
+
+def get_games_played_counts(schedule_index, num_teams):
+
+    return np.bincount(schedule_index["team"], minlength=num_teams)
+
+def is_schedule_index_current(schedule_index, week, stats, teams, stats_hash=""):
+
+    schedule = get_schedule_through_week(schedule_index, week)
+
+    # A corrected score leaves the games played alone, so the stats file itself is compared
+    if schedule["stats hashes"][week] != stats_hash:
+        return False
+
+    counts = get_team_totals(schedule)["games played"]
+
+    i = 0
+    for team in teams:
+        if counts[i] != len(stats[team]["schedule"]["opponents"]):
+            return False
+        i += 1
+
+    return True
+
+def update_schedule_index(schedule_index, week, stats, teams, stats_hash=""):
+
+    # Drop this week and later so the week can be appended from the current stats
+    schedule_index = get_schedule_through_week(schedule_index, week - 1)
+
+    # Start over if the stats changed a game the index already holds
+    if not are_edges_current(schedule_index, stats, teams):
+        schedule_index = get_schedule_through_week(create_schedule_index(teams), week - 1)
+
+    counts = get_games_played_counts(schedule_index, len(teams))
+    num_teams = len(teams)
+
+    team_to_index = {}
+    i = 0
+    for team in teams:
+        team_to_index[team] = i
+        i += 1
+
+    # Append only the games past what the index already holds for each team
+    new_edges = {}
+    for field in edge_fields:
+        new_edges[field] = []
+    i = 0
+    for team in teams:
+        schedule = stats[team]["schedule"]
+        num_games = len(schedule["opponents"])
+        neutral = schedule.get("neutral", [False] * num_games)
+        for g in range(counts[i], num_games):
+            new_edges["team"].append(i)
+            new_edges["opponent"].append(team_to_index[schedule["opponents"][g]])
+            new_edges["indexed week"].append(week)
+            new_edges["home"].append(int(bool(schedule["home"][g])))
+            new_edges["neutral"].append(int(bool(neutral[g])))
+            new_edges["points gained"].append(stats[team]["points"]["total"]["gained"][g])
+            new_edges["points allowed"].append(stats[team]["points"]["total"]["allowed"][g])
+            new_edges["rushing yards gained"].append(stats[team]["rushing"]["yards"]["gained"][g])
+            new_edges["rushing yards allowed"].append(stats[team]["rushing"]["yards"]["allowed"][g])
+        i += 1
+
+    for field in edge_fields:
+        new_values = np.array(new_edges[field], dtype=schedule_index[field].dtype)
+        schedule_index[field] = np.concatenate([schedule_index[field], new_values])
+
+    # Add only this week's games to last week's totals
+    new_teams = np.array(new_edges["team"], dtype=int)
+    home_field_corrections = np.where(np.array(new_edges["home"], dtype=int) == 1, -1.0, 1.0)
+    week_totals = {
+        "games played": np.bincount(new_teams, minlength=num_teams),
+        "points margin": np.bincount(new_teams, weights=np.subtract(new_edges["points gained"], new_edges["points allowed"], dtype=float), minlength=num_teams),
+        "rushing yards margin": np.bincount(new_teams, weights=np.subtract(new_edges["rushing yards gained"], new_edges["rushing yards allowed"], dtype=float), minlength=num_teams),
+        "home field correction": np.bincount(new_teams, weights=home_field_corrections, minlength=num_teams)
+    }
+    for field in total_fields:
+        totals = schedule_index[field + " totals"]
+        schedule_index[field + " totals"] = np.concatenate([totals, totals[-1:] + week_totals[field]])
+    schedule_index["stats hashes"] = np.append(schedule_index["stats hashes"], stats_hash)
+
+    # Keep the edges grouped by team so per team slices stay contiguous
+    order = np.argsort(schedule_index["team"], kind="stable")
+    for field in edge_fields:
+        schedule_index[field] = schedule_index[field][order]
+
+    return schedule_index
+
+def are_edges_current(schedule_index, stats, teams):
+
+    # Edges are grouped by team in the order the games were played
+    counts = get_games_played_counts(schedule_index, len(teams))
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    teams_list = list(teams)
+
+    i = 0
+    for team in teams:
+        if counts[i] == 0:
+            i += 1
+            continue
+        num_games = len(stats[team]["schedule"]["opponents"])
+        if counts[i] > num_games:
+            return False
+        edges = slice(starts[i], starts[i + 1])
+        opponents = [teams_list[o] for o in schedule_index["opponent"][edges]]
+        if opponents != list(stats[team]["schedule"]["opponents"][:counts[i]]):
+            return False
+        if not np.array_equal(schedule_index["points gained"][edges], stats[team]["points"]["total"]["gained"][:counts[i]]):
+            return False
+        if not np.array_equal(schedule_index["points allowed"][edges], stats[team]["points"]["total"]["allowed"][:counts[i]]):
+            return False
+        if not np.array_equal(schedule_index["rushing yards gained"][edges], stats[team]["rushing"]["yards"]["gained"][:counts[i]]):
+            return False
+        if not np.array_equal(schedule_index["rushing yards allowed"][edges], stats[team]["rushing"]["yards"]["allowed"][:counts[i]]):
+            return False
+        i += 1
+
+    return True
+
+def get_games_played_normalization(schedule, games_played, num_teams):
+
+    games_played_normalization = np.zeros((num_teams, num_teams))
+
+    team = schedule["team"]
+    opponent = schedule["opponent"]
+    games_played_normalization[team, opponent] = 1 / np.maximum(1, games_played[team])
+
+    return games_played_normalization
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    stats = the_kick_is_bad.read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    schedule = load_schedule_index(year, week, stats, teams)
+    teams_list = schedule["teams"]
+    for e in range(len(schedule["team"])):
+        if schedule["home"][e]:
+            location = "vs"
+        else:
+            location = "@"
+        print("Indexed week {0}: {1} {2} {3}, {4:.0f}-{5:.0f}".format(schedule["indexed week"][e],
+                                                                     teams_list[schedule["team"][e]],
+                                                                     location,
+                                                                     teams_list[schedule["opponent"][e]],
+                                                                     schedule["points gained"][e],
+                                                                     schedule["points allowed"][e]))
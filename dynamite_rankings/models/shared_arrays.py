@@ -0,0 +1,135 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import os
+import tempfile
+
+# Shared memory is missing on some platforms, memory mapped files work everywhere
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+# Byte alignment of each array inside the shared block
+alignment = 64
+
+# Blocks created by this process, kept open until they are released
+owned_blocks = {}
+
+# Blocks attached by this process, kept open for the life of the process
+attached_blocks = {}
+
+
+def share_arrays(arrays, use_memory_map=False):
+
+    # Lay the arrays out one after another in a single block
+    fields = {}
+    size = 0
+    for key in arrays:
+        array = np.asarray(arrays[key])
+        fields[key] = (array.dtype.str, array.shape, size)
+        size += -(-array.nbytes // alignment) * alignment
+    size = max(size, alignment)
+
+    block = None
+    if shared_memory is not None and not use_memory_map:
+        try:
+            block = shared_memory.SharedMemory(create=True, size=size)
+            handle = {"shared memory": block.name, "fields": fields}
+            buffer = block.buf
+        except OSError:
+            block = None
+
+    # Fall back to a memory mapped temporary file
+    if block is None:
+        file_descriptor, filename = tempfile.mkstemp(prefix="dynamite_rankings-", suffix=".bin")
+        os.close(file_descriptor)
+        block = np.memmap(filename, dtype=np.uint8, mode="w+", shape=(size,))
+        handle = {"memory map": filename, "fields": fields}
+        buffer = block
+
+    for key in arrays:
+        dtype, shape, offset = fields[key]
+        view = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        view[...] = arrays[key]
+        del view
+
+    if "memory map" in handle:
+        block.flush()
+
+    owned_blocks[get_block_name(handle)] = block
+
+    # The handle is small, so it is cheap to pass to every worker
+    return handle
+
+def attach_arrays(handle):
+
+    name = get_block_name(handle)
+
+    # Attach once per process, later tasks reuse the same mapping
+    if name not in attached_blocks:
+        if "shared memory" in handle:
+            attached_blocks[name] = shared_memory.SharedMemory(name=handle["shared memory"])
+        else:
+            attached_blocks[name] = np.memmap(handle["memory map"], dtype=np.uint8, mode="r")
+
+    block = attached_blocks[name]
+    if "shared memory" in handle:
+        buffer = block.buf
+    else:
+        buffer = block
+
+    # Read only views into the block, nothing is copied
+    arrays = {}
+    for key in handle["fields"]:
+        dtype, shape, offset = handle["fields"][key]
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        arrays[key].flags.writeable = False
+
+    return arrays
+
+def release_arrays(handle):
+
+    name = get_block_name(handle)
+
+    block = owned_blocks.pop(name, None)
+    if block is None:
+        return
+
+    if "shared memory" in handle:
+        block.close()
+        block.unlink()
+    else:
+        del block
+        os.remove(handle["memory map"])
+
+def get_block_name(handle):
+
+    if "shared memory" in handle:
+        return handle["shared memory"]
+
+    return handle["memory map"]
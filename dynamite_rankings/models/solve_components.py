@@ -0,0 +1,94 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+# Blocks at least this large are solved in a separate process when there are several of them
+parallel_block_size = 400
+
+
+def find_connected_components(matrix):
+
+    num_teams = matrix.shape[0]
+
+    # Teams are connected if either one has the other on its schedule
+    adjacency = (matrix != 0) | (matrix.T != 0)
+    np.fill_diagonal(adjacency, False)
+    neighbors = [np.flatnonzero(row) for row in adjacency]
+
+    # Breadth first search from every team that has not been labeled yet
+    labels = np.full(num_teams, -1)
+    num_components = 0
+    for start in range(num_teams):
+        if labels[start] >= 0:
+            continue
+        labels[start] = num_components
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for i in frontier:
+                for j in neighbors[i]:
+                    if labels[j] < 0:
+                        labels[j] = num_components
+                        next_frontier.append(j)
+            frontier = next_frontier
+        num_components += 1
+
+    # Return the team indexes in each component
+    order = np.argsort(labels, kind="stable")
+    splits = np.flatnonzero(np.diff(labels[order])) + 1
+    components = np.split(order, splits)
+
+    return components
+
+def solve_by_components(A, B, max_workers=None):
+
+    components = find_connected_components(A)
+
+    # The whole system is one block, so there is nothing to decompose
+    if len(components) == 1:
+        return np.linalg.solve(A, B)
+
+    strengths = np.zeros(B.shape)
+
+    # Small blocks are cheap, so only farm out the large ones
+    large_components = []
+    for component in components:
+        if len(component) >= parallel_block_size:
+            large_components.append(component)
+        else:
+            strengths[component] = np.linalg.solve(A[np.ix_(component, component)], B[component])
+
+    if len(large_components) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            blocks = [(A[np.ix_(component, component)], B[component]) for component in large_components]
+            block_strengths = executor.map(solve_block, blocks)
+            for component, block_strength in zip(large_components, block_strengths):
+                strengths[component] = block_strength
+    else:
+        for component in large_components:
+            strengths[component] = np.linalg.solve(A[np.ix_(component, component)], B[component])
+
+    return strengths
+
+def solve_block(block):
+
+    A, B = block
+
+    return np.linalg.solve(A, B)
@@ -23,15 +23,17 @@ sys.path.append(join(root, "TheKickIsBAD"))
 
 # Standard imports
 import json
+import numpy as np
 import the_kick_is_bad
 from the_kick_is_bad import utils
 from urllib.request import urlopen
 
 # DynamiteRankings imports
+from predictions.calibrate_win_probability import calculate_win_probability, read_win_probability_calibration
 from rankings.read_rankings import read_rankings
 
 
-def predict(year, week):
+def predict(year, week, sinks=None):
 
     scores = the_kick_is_bad.read_scores(year, week)
 
@@ -41,6 +43,19 @@ def predict(year, week):
     num_weeks = the_kick_is_bad.read_number_of_weeks(year)
     week, _ = utils.check_week(week, num_weeks)
 
+    calibration = read_win_probability_calibration()
+
+    predictions = predict_games(week, num_weeks, scores, rankings, calibration)
+
+    # Printing and saving are left to whichever sinks the caller attaches
+    if sinks is not None:
+        for sink in sinks:
+            sink(year, week, predictions)
+
+    return predictions
+
+def predict_games(week, num_weeks, scores, rankings, calibration=None):
+
     # Loop through scores to make predictions
     predictions = []
     for game in scores["games"]:
@@ -70,6 +85,10 @@ def predict(year, week):
             predicted_winner = away_team
             predicted_margin_of_victory = away_team_strength - home_team_strength
 
+        # Chance the predicted winner wins, from the calibration fitted over past results
+        margin_standard_deviation = np.sqrt(rankings[away_team]["standard deviation"]**2 + rankings[home_team]["standard deviation"]**2)
+        win_probability = float(calculate_win_probability(predicted_margin_of_victory, margin_standard_deviation, calibration))
+
         # Calculate the game interest score
         game_interest = rankings[away_team]["team score"] + rankings[home_team]["team score"] - predicted_margin_of_victory
 
@@ -79,39 +98,169 @@ def predict(year, week):
             "home team": home_team,
             "predicted winner": predicted_winner,
             "predicted margin of victory": predicted_margin_of_victory,
+            "win probability": win_probability,
             "game interest": game_interest
         })
     
     # Sort predictions by game interest
     predictions = sorted(predictions, key=lambda p: p["game interest"], reverse=True)
 
-    # Print predictions
-    predictions_file_string = "AwayTeam,HomeTeam,PredictedWinner,PredictedMoV,GameInterest\n"
+    return predictions
+
+def print_predictions(year, week, predictions):
+
     for prediction in predictions:
 
         # Print to console in pretty format
-        print("{0} @ {1}: Predicted Winner: {2}, Predicted MoV: {3:.1f}, Game Interest: {4:.1f}".format(prediction["away team"],
-                                                                                                        prediction["home team"],
-                                                                                                        prediction["predicted winner"],
-                                                                                                        prediction["predicted margin of victory"],
-                                                                                                        prediction["game interest"]))
+        print("{0} @ {1}: Predicted Winner: {2}, Predicted MoV: {3:.1f}, Win Probability: {4:.1%}, Game Interest: {5:.1f}".format(prediction["away team"],
+                                                                                                                                  prediction["home team"],
+                                                                                                                                  prediction["predicted winner"],
+                                                                                                                                  prediction["predicted margin of victory"],
+                                                                                                                                  prediction["win probability"],
+                                                                                                                                  prediction["game interest"]))
+
+def write_predictions(year, week, predictions):
+
+    # Print predictions
+    predictions_file_string = "AwayTeam,HomeTeam,PredictedWinner,PredictedMoV,GameInterest,WinProbability\n"
+    for prediction in predictions:
 
         # Print to file string in csv format
-        predictions_file_string += "{0},{1},{2},{3:.1f},{4:.1f}\n".format(prediction["away team"],
-                                                                          prediction["home team"],
-                                                                          prediction["predicted winner"],
-                                                                          prediction["predicted margin of victory"],
-                                                                          prediction["game interest"])
+        predictions_file_string += "{0},{1},{2},{3:.1f},{4:.1f},{5:.3f}\n".format(prediction["away team"],
+                                                                                 prediction["home team"],
+                                                                                 prediction["predicted winner"],
+                                                                                 prediction["predicted margin of victory"],
+                                                                                 prediction["game interest"],
+                                                                                 prediction["win probability"])
         
     # Create the predictions file with absolute path
     absolute_path = utils.get_abs_path(__file__)
     filename = f"{absolute_path}/predictions/{year}/predictions-{year}-{week:02}.csv"
     utils.write_string(predictions_file_string, filename)
 
+def predict_season(year, week, sinks=None):
+
+    # Check if the week is 'bowl' week
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    week, _ = utils.check_week(week, num_weeks)
+
+    # Every remaining week is predicted from the same rankings
+    rankings = read_rankings(year, week - 1)
+
+    # Collect the published schedule for this week through the bowl week
+    schedule = {}
+    for w in range(week, num_weeks + 2):
+
+        # Skip weeks whose schedule has not been published yet
+        try:
+            schedule[w] = the_kick_is_bad.read_scores(year, w)
+        except FileNotFoundError:
+            continue
+
+    calibration = read_win_probability_calibration()
+
+    season_projection = project_season(num_weeks, schedule, rankings, calibration)
+
+    # Printing and saving are left to whichever sinks the caller attaches
+    if sinks is not None:
+        for sink in sinks:
+            sink(year, week, season_projection)
+
+    return season_projection
+
+def project_season(num_weeks, schedule, rankings, calibration=None):
+
+    teams_list = []
+    for team in rankings:
+        teams_list.append(team)
+    team_to_index = {}
+    i = 0
+    for team in teams_list:
+        team_to_index[team] = i
+        i += 1
+
+    strengths = np.array([rankings[team]["strength"] for team in teams_list])
+    team_scores = np.array([rankings[team]["team score"] for team in teams_list])
+    standard_deviations = np.array([rankings[team]["standard deviation"] for team in teams_list])
+
+    game_weeks = []
+    away_teams = []
+    home_teams = []
+    for w in schedule:
+        for game in schedule[w]["games"]:
+
+            # Games already played have nothing left to project
+            if game["game"]["gameState"] == "final":
+                continue
+
+            game_weeks.append(w)
+            away_teams.append(team_to_index[game["game"]["away"]["names"]["standard"]])
+            home_teams.append(team_to_index[game["game"]["home"]["names"]["standard"]])
+
+    game_weeks = np.array(game_weeks, dtype=int)
+    away_teams = np.array(away_teams, dtype=int)
+    home_teams = np.array(home_teams, dtype=int)
+
+    # Assume all bowl games are neutral site
+    home_field_advantages = np.where(game_weeks <= num_weeks, 4, 0)
+
+    # Predict every game at once
+    away_team_strengths = strengths[away_teams]
+    home_team_strengths = strengths[home_teams] + home_field_advantages
+    home_team_wins = home_team_strengths >= away_team_strengths
+    predicted_winners = np.where(home_team_wins, home_teams, away_teams)
+    predicted_margins_of_victory = np.abs(home_team_strengths - away_team_strengths)
+    margin_standard_deviations = np.sqrt(standard_deviations[away_teams]**2 + standard_deviations[home_teams]**2)
+    win_probabilities = calculate_win_probability(predicted_margins_of_victory, margin_standard_deviations, calibration)
+    game_interests = team_scores[away_teams] + team_scores[home_teams] - predicted_margins_of_victory
+
+    # Sort predictions by week, then by game interest
+    order = np.lexsort((-game_interests, game_weeks))
+
+    teams_array = np.array(teams_list)
+    season_projection = {
+        "week": game_weeks[order],
+        "away team": teams_array[away_teams[order]],
+        "home team": teams_array[home_teams[order]],
+        "predicted winner": teams_array[predicted_winners[order]],
+        "predicted margin of victory": predicted_margins_of_victory[order],
+        "win probability": win_probabilities[order],
+        "game interest": game_interests[order]
+    }
+
+    return season_projection
+
+def print_season_projection(year, week, season_projection):
+
+    print(f"Projected {len(season_projection['week'])} games from week {week} through the bowl games")
+
+def write_season_projection(year, week, season_projection):
+
+    # Print season projection
+    season_projection_file_string = "Week,AwayTeam,HomeTeam,PredictedWinner,PredictedMoV,GameInterest,WinProbability\n"
+    for i in range(len(season_projection["week"])):
+
+        # Print to file string in csv format
+        season_projection_file_string += "{0},{1},{2},{3},{4:.1f},{5:.1f},{6:.3f}\n".format(season_projection["week"][i],
+                                                                                          season_projection["away team"][i],
+                                                                                          season_projection["home team"][i],
+                                                                                          season_projection["predicted winner"][i],
+                                                                                          season_projection["predicted margin of victory"][i],
+                                                                                          season_projection["game interest"][i],
+                                                                                          season_projection["win probability"][i])
+
+    # Create the season projection file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/predictions/{year}/season_projection-{year}-{week:02}.csv"
+    utils.write_string(season_projection_file_string, filename)
+
 
 if __name__ == "__main__":
     year = int(sys.argv[1])
     week = sys.argv[2]
     if week != "bowl":
         week = int(week)
-    predict(year, week)
+    if len(sys.argv) > 3 and sys.argv[3] == "season":
+        predict_season(year, week, sinks=[print_season_projection, write_season_projection])
+    else:
+        predict(year, week, sinks=[print_predictions, write_predictions])
@@ -0,0 +1,353 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import basename, dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import json
+import numpy as np
+import re
+import time
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from archives.season_archive import find_output_files, open_output_file, output_file_exists
+from database.history_database import query_weeks
+
+
+calibration_fields = ["year", "week", "margin", "standard deviation", "won"]
+
+# Without a fitted calibration the margin alone is used, with the coefficient of the committed fit
+default_calibration = {
+    "use standard deviation": False,
+    "margin coefficient": 0.05639805435881658,
+    "margin standard deviation coefficient": 0.0
+}
+
+# Newton steps stop once no coefficient moves by more than this
+convergence_tolerance = 1e-10
+max_iterations = 50
+
+# Loaded calibration, kept for the life of the process
+win_probability_calibration = None
+
+
+def get_calibration_history_filename():
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/calibration_history.npz"
+
+def get_calibration_filename():
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/win_probability_calibration.json"
+
+def parse_year_week(filename):
+
+    match = re.search(r"-(\d{4})-(\d{2})\.\w+$", basename(filename))
+
+    return int(match.group(1)), int(match.group(2))
+
+def find_results_files():
+
+    # Map each (year, week) to its results source and the mtime of whatever holds it
+    output_files = find_output_files("predictions", "results-*.*")
+    results_files = {}
+    for source in output_files:
+        results_files[parse_year_week(source)] = (source, output_files[source])
+
+    return results_files
+
+def get_rankings_source(year, week):
+
+    # Predictions for a week are made from the rankings of the week before
+    return f"rankings/{year}/team_rankings-{year}-{week - 1:02}.csv"
+
+def read_standard_deviations(year, week, records=None):
+
+    standard_deviations = {}
+
+    # From the history database when it holds the current rankings file
+    if records is not None:
+        for record in records:
+            standard_deviations[record["team"]] = record["standard deviation"]
+        return standard_deviations
+
+    source = get_rankings_source(year, week)
+    if not output_file_exists(source):
+        return standard_deviations
+
+    with open_output_file(source) as file:
+        _ = file.readline()
+        for line in file:
+            ranking = line.strip().split(",")
+            if len(ranking) < 7:
+                continue
+            standard_deviations[ranking[0]] = float(ranking[6])
+
+    return standard_deviations
+
+def get_calibration_row(year, week, away_team, home_team, outcome, margin, standard_deviations):
+
+    # Uncertainty of the margin, from both teams' strengths
+    if away_team in standard_deviations and home_team in standard_deviations:
+        standard_deviation = np.sqrt(standard_deviations[away_team]**2 + standard_deviations[home_team]**2)
+    else:
+        standard_deviation = np.nan
+
+    # Every game is seen from the predicted winner's side, so the margin is never negative
+    return [year, week, margin, standard_deviation, outcome == "RIGHT"]
+
+def read_calibration_rows(year, week, source, results_records=None, rankings_records=None):
+
+    standard_deviations = read_standard_deviations(year, week, rankings_records)
+
+    # From the history database when it holds the current results file
+    # Early seasons signed the predicted margin by whether the pick was right, so it is taken unsigned
+    if results_records is not None:
+        rows = []
+        for record in results_records:
+            rows.append(get_calibration_row(year, week, record["away team"], record["home team"], record["result"],
+                                            abs(record["predicted margin of victory"]), standard_deviations))
+        return rows
+
+    rows = []
+    with open_output_file(source) as file:
+
+        header = file.readline().strip().split(",")
+
+        for line in file:
+            result = line.strip().split(",")
+            if len(result) < 6:
+                continue
+
+            # Early seasons used Outcome,AwayTeam,HomeTeam,PredictedWinner,Winner,PredictedMoV,MoV
+            # with the predicted margin signed by whether the pick was right
+            if header[0] == "Outcome":
+                away_team, home_team, outcome, margin = result[1], result[2], result[0], abs(float(result[5]))
+            else:
+                away_team, home_team, outcome, margin = result[0], result[1], result[3], float(result[4])
+
+            rows.append(get_calibration_row(year, week, away_team, home_team, outcome, margin, standard_deviations))
+
+    return rows
+
+def create_calibration_history():
+
+    history = {
+        "year": np.zeros(0, dtype=int),
+        "week": np.zeros(0, dtype=int),
+        "margin": np.zeros(0),
+        "standard deviation": np.zeros(0),
+        "won": np.zeros(0, dtype=bool),
+        "source mtimes": {}
+    }
+
+    return history
+
+def read_calibration_history():
+
+    filename = get_calibration_history_filename()
+    if not exists(filename):
+        return create_calibration_history()
+
+    with np.load(filename) as history_data:
+        history = {"source mtimes": {}}
+        for field in calibration_fields:
+            history[field] = history_data[field.replace(" ", "_")]
+        for source_key, mtime in zip(history_data["source_keys"].tolist(), history_data["source_mtimes"].tolist()):
+            history["source mtimes"][tuple(source_key)] = mtime
+
+    return history
+
+def write_calibration_history(history):
+
+    source_keys = list(history["source mtimes"].keys())
+    history_data = {
+        "source_keys": np.array(source_keys, dtype=int).reshape(-1, 2),
+        "source_mtimes": np.array([history["source mtimes"][key] for key in source_keys])
+    }
+    for field in calibration_fields:
+        history_data[field.replace(" ", "_")] = history[field]
+    np.savez(get_calibration_history_filename(), **history_data)
+
+def update_calibration_history():
+
+    history = read_calibration_history()
+    results_files = find_results_files()
+
+    # Find the weeks whose results are new or changed since the last update
+    changed_weeks = []
+    source_mtimes = {}
+    for key in results_files:
+        source_mtimes[key] = results_files[key][1]
+        if history["source mtimes"].get(key) != source_mtimes[key]:
+            changed_weeks.append(key)
+    removed_weeks = [key for key in history["source mtimes"] if key not in results_files]
+
+    if changed_weeks or removed_weeks:
+
+        keep = np.ones(len(history["year"]), dtype=bool)
+        for year, week in changed_weeks + removed_weeks:
+            keep &= ~((history["year"] == year) & (history["week"] == week))
+        columns = {}
+        for field in calibration_fields:
+            columns[field] = history[field][keep].tolist()
+
+        # Read only the changed weeks, over one database connection for whatever the history database already holds
+        rankings_files = find_output_files("rankings", "team_rankings-*.csv")
+        rankings_sources = {}
+        for year, week in changed_weeks:
+            source = get_rankings_source(year, week)
+            if source in rankings_files:
+                rankings_sources[(year, week - 1)] = (source, rankings_files[source])
+        results_records = query_weeks("results", {key: results_files[key] for key in changed_weeks})
+        rankings_records = query_weeks("team_rankings", rankings_sources)
+
+        for year, week in changed_weeks:
+            rows = read_calibration_rows(year, week, results_files[(year, week)][0],
+                                         results_records.get((year, week)), rankings_records.get((year, week - 1)))
+            for row in rows:
+                for field, value in zip(calibration_fields, row):
+                    columns[field].append(value)
+
+        history = {
+            "year": np.array(columns["year"], dtype=int),
+            "week": np.array(columns["week"], dtype=int),
+            "margin": np.array(columns["margin"], dtype=float),
+            "standard deviation": np.array(columns["standard deviation"], dtype=float),
+            "won": np.array(columns["won"], dtype=bool),
+            "source mtimes": source_mtimes
+        }
+        write_calibration_history(history)
+
+    return history
+
+def get_calibration_features(margins, standard_deviations, use_standard_deviation):
+
+    # Both features vanish at a margin of zero, so an even game is always a coin flip
+    # With the standard deviation the slope can flatten for teams the model is less sure of
+    if use_standard_deviation:
+        return np.column_stack([margins, margins * standard_deviations])
+
+    return margins[:, np.newaxis]
+
+def fit_logistic_regression(features, outcomes):
+
+    # Newton's method on the log likelihood, every game in one batch
+    coefficients = np.zeros(features.shape[1])
+    for _ in range(max_iterations):
+        probabilities = 1 / (1 + np.exp(-features @ coefficients))
+        weights = probabilities * (1 - probabilities)
+        hessian = features.T @ (features * weights[:, np.newaxis])
+        gradient = features.T @ (outcomes - probabilities)
+        step = np.linalg.solve(hessian, gradient)
+        coefficients += step
+        if np.max(np.abs(step)) < convergence_tolerance:
+            break
+
+    return coefficients
+
+def fit_win_probability_calibration(history, use_standard_deviation=False):
+
+    margins = history["margin"]
+    standard_deviations = history["standard deviation"]
+    outcomes = history["won"].astype(float)
+
+    # Games without the rankings they were predicted from cannot use the standard deviation
+    if use_standard_deviation:
+        has_standard_deviation = ~np.isnan(standard_deviations)
+        margins = margins[has_standard_deviation]
+        standard_deviations = standard_deviations[has_standard_deviation]
+        outcomes = outcomes[has_standard_deviation]
+
+    features = get_calibration_features(margins, standard_deviations, use_standard_deviation)
+    coefficients = fit_logistic_regression(features, outcomes)
+
+    calibration = {
+        "use standard deviation": use_standard_deviation,
+        "margin coefficient": float(coefficients[0]),
+        "margin standard deviation coefficient": 0.0
+    }
+    if use_standard_deviation:
+        calibration["margin standard deviation coefficient"] = float(coefficients[1])
+
+    # Fit quality over the same games
+    probabilities = 1 / (1 + np.exp(-features @ coefficients))
+    probabilities = np.clip(probabilities, 1e-12, 1 - 1e-12)
+    calibration["number of games"] = int(len(outcomes))
+    calibration["log loss"] = float(-np.mean(outcomes * np.log(probabilities) + (1 - outcomes) * np.log(1 - probabilities)))
+    calibration["brier score"] = float(np.mean((probabilities - outcomes)**2))
+
+    return calibration
+
+def calibrate_win_probability(use_standard_deviation=False):
+
+    global win_probability_calibration
+
+    history = update_calibration_history()
+    calibration = fit_win_probability_calibration(history, use_standard_deviation)
+
+    utils.write_json(calibration, get_calibration_filename())
+    win_probability_calibration = calibration
+
+    return calibration
+
+def read_win_probability_calibration():
+
+    global win_probability_calibration
+
+    if win_probability_calibration is None:
+        filename = get_calibration_filename()
+        if exists(filename):
+            with open(filename) as file:
+                win_probability_calibration = json.load(file)
+        else:
+            win_probability_calibration = default_calibration
+
+    return win_probability_calibration
+
+def calculate_win_probability(margins, standard_deviations, calibration=None):
+
+    if calibration is None:
+        calibration = read_win_probability_calibration()
+
+    margins = np.asarray(margins, dtype=float)
+    standard_deviations = np.asarray(standard_deviations, dtype=float)
+
+    logits = calibration["margin coefficient"] * margins
+    if calibration["use standard deviation"]:
+        logits += calibration["margin standard deviation coefficient"] * margins * standard_deviations
+
+    return 1 / (1 + np.exp(-logits))
+
+
+if __name__ == "__main__":
+    use_standard_deviation = len(sys.argv) > 1 and sys.argv[1] == "std"
+    start_time = time.perf_counter()
+    calibration = calibrate_win_probability(use_standard_deviation)
+    elapsed_time = time.perf_counter() - start_time
+    calibration_string = json.dumps(calibration, indent=2)
+    print(calibration_string)
+    print(f"Calibrated on {calibration['number of games']} games in {elapsed_time * 1000:.1f} ms")
@@ -28,6 +28,10 @@ import sys
 import the_kick_is_bad
 from the_kick_is_bad import utils
 
+# DynamiteRankings imports
+from archives.season_archive import open_output_file
+from database.history_database import query_week
+
 
 def read_predictions(year, week):
 
@@ -35,10 +39,29 @@ def read_predictions(year, week):
     num_weeks = the_kick_is_bad.read_number_of_weeks(year)
     week, _ = utils.check_week(week, num_weeks)
 
-    # Open predictions file with absolute path
-    absolute_path = utils.get_abs_path(__file__)
-    filename = f"{absolute_path}/{year}/predictions-{year}-{week:02}.csv"
-    with open(filename) as file:
+    # Read from the history database when it holds the current predictions file
+    source = f"predictions/{year}/predictions-{year}-{week:02}.csv"
+    records = query_week("predictions", year, week, source)
+    if records is not None:
+        predictions = []
+        for record in records:
+            prediction_data = {
+                "away team": record["away team"],
+                "home team": record["home team"],
+                "predicted winner": record["predicted winner"],
+                "predicted margin of victory": record["predicted margin of victory"],
+                "game interest": record["game interest"]
+            }
+
+            # Files written before the calibration have no win probability
+            if record["win probability"] is not None:
+                prediction_data["win probability"] = record["win probability"]
+
+            predictions.append(prediction_data)
+        return predictions
+
+    # Open predictions file, from the season archive if the season has been archived
+    with open_output_file(source) as file:
 
         predictions = []
 
@@ -58,13 +81,19 @@ def read_predictions(year, week):
             game_interest = prediction[4]
 
             # Pack prediction structure
-            predictions.append({
+            prediction_data = {
                 "away team": away_team,
                 "home team": home_team,
                 "predicted winner": predicted_winner,
                 "predicted margin of victory": float(predicted_margin_of_victory),
                 "game interest": float(game_interest)
-            })
+            }
+
+            # Files written before the calibration have no win probability
+            if len(prediction) > 5:
+                prediction_data["win probability"] = float(prediction[5])
+
+            predictions.append(prediction_data)
 
             prediction_line = file.readline().strip()
 
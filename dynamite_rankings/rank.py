@@ -22,44 +22,152 @@ root = dirname(dirname(realpath(__file__)))
 sys.path.append(join(root, "TheKickIsBAD"))
 
 # Standard imports
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 import statistics
 import the_kick_is_bad
 from the_kick_is_bad import utils
 
 # DynamiteRankings imports
-from models.calculate_model import calculate_model
+from models.calculate_model import calculate_model, model_configuration, write_model
+from models.ensemble_model import calculate_ensemble, write_ensemble
+from models.read_model import read_model
+from models.read_priors import read_priors
+from models.schedule_index import create_schedule_index, load_schedule_index
+from rankings.calculate_schedule_strength import calculate_schedule_strength, write_schedule_strength
+from rankings.minimum_violation import print_refinement, refine_rankings, write_refinement
 from rankings.read_rankings import read_rankings
+from stats.read_stats import read_stats
 
 
-def rank(year, week):
+# Threads used to read the inputs of a rank run
+num_prefetch_threads = 8
 
+
+def rank(year, week, sinks=None, ensemble=False, refine=False, write_caches=False):
+
+    with ThreadPoolExecutor(max_workers=num_prefetch_threads) as executor:
+
+        # Start reading every input up front, the stages below wait only on what they use
+        # The stats cache, priors and schedule index files are only written when the caller asks
+        inputs = prefetch_inputs(year, week, executor, write_caches)
+
+        # Check if the week is 'bowl' week and read stats
+        num_weeks = inputs["number of weeks"].result()
+        week, _ = utils.check_week(week, num_weeks)
+
+        stats = inputs["stats"].result()
+        teams = inputs["teams"].result()
+
+        model, strengths, standard_deviations = calculate_model(year, week, stats, teams, inputs)
+
+        if week > 0:
+            prev_rankings = inputs["previous rankings"].result()
+        else:
+            prev_rankings = None
+
+        team_rankings = calculate_team_rankings(week, stats, teams, strengths, standard_deviations, prev_rankings)
+
+        schedule_strength = calculate_schedule_strength(year, week, stats, teams, team_rankings, inputs)
+
+        # The model variants reuse the inputs already read for the production model
+        if ensemble:
+            ensemble_rankings = calculate_ensemble(year, week, stats, teams, inputs)
+
+        # Reorder the final rankings to break fewer game results, kept apart from the model rank
+        if refine:
+            if week > 0:
+                schedule = inputs["schedule"].result()
+            else:
+                schedule = create_schedule_index(teams)
+            refinement = refine_rankings(team_rankings, schedule, teams)
+
+    conference_rankings = calculate_conference_rankings(teams, team_rankings)
+
+    division_rankings = calculate_division_rankings(teams, team_rankings)
+
+    outputs = {
+        "model": model,
+        "team rankings": team_rankings,
+        "schedule strength": schedule_strength,
+        "conference rankings": conference_rankings,
+        "division rankings": division_rankings
+    }
+    if ensemble:
+        outputs["ensemble rankings"] = ensemble_rankings
+    if refine:
+        outputs["refinement"] = refinement
+
+    # Printing and saving are left to whichever sinks the caller attaches
+    if sinks is not None:
+        for sink in sinks:
+            sink(year, week, outputs)
+
+    return outputs
+
+def prefetch_inputs(year, week, executor, write_caches=False):
+
+    inputs = {}
+    inputs["number of weeks"] = executor.submit(the_kick_is_bad.read_number_of_weeks, year)
+    inputs["teams"] = executor.submit(read_teams, year)
     if week == 0:
-        stats = None
+        inputs["stats"] = get_done_future(None)
     else:
-        stats = the_kick_is_bad.read_stats(year, week)
+        inputs["stats"] = executor.submit(read_stats, year, week, write_caches)
 
-    # Check if the week is 'bowl' week and read stats
-    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    # The remaining inputs depend on the week number
+    num_weeks = inputs["number of weeks"].result()
     week, _ = utils.check_week(week, num_weeks)
 
+    # Inputs that need the teams or stats wait for them inside the pool
+    # They are submitted after what they wait on, so they never hold up its threads
+    if week < model_configuration["prior cutoff week"]:
+        inputs["priors"] = executor.submit(call_with_results, read_priors, year, inputs["teams"], write_caches)
+    if week > 0:
+        inputs["schedule"] = executor.submit(call_with_results, load_schedule_index, year, week, inputs["stats"], inputs["teams"], write_caches)
+        inputs["previous rankings"] = executor.submit(read_rankings, year, week - 1)
+
+    # Earlier weekly models for the standard deviations
+    for w in range(1, week):
+        inputs[f"model {w}"] = executor.submit(read_model, year, w)
+
+    # Published schedule of the remaining weeks for the schedule strength
+    # Weeks not published yet keep their FileNotFoundError in the future
+    for w in range(week + 1, num_weeks + 2):
+        inputs[f"scores {w}"] = executor.submit(the_kick_is_bad.read_scores, year, w)
+
+    return inputs
+
+def read_teams(year):
+
     teams, _ = the_kick_is_bad.read_teams(year)
 
-    team_rankings = calculate_team_rankings(year, week, stats, teams)
+    return teams
 
-    calculate_conference_rankings(year, week, teams, team_rankings)
+def call_with_results(function, *args):
 
-    calculate_division_rankings(year, week, teams, team_rankings)
+    # Wait for any future arguments before calling the function
+    values = []
+    for arg in args:
+        if isinstance(arg, Future):
+            values.append(arg.result())
+        else:
+            values.append(arg)
 
-def calculate_team_rankings(year, week, stats, teams):
-    
-    _, strengths, standard_deviations = calculate_model(year, week, stats, teams)
+    return function(*values)
+
+def get_done_future(value):
+
+    future = Future()
+    future.set_result(value)
+
+    return future
+
+def calculate_team_rankings(week, stats, teams, strengths, standard_deviations, prev_rankings=None):
 
     # strengths = get_model_array(model, "strength")
     normalized_strengths = strengths - min(strengths)
     # standard_deviations = get_model_array(model, "standard deviation")
-    if week > 0:
-        prev_rankings = read_rankings(year, week - 1)
 
     if week == 0:
         team_scores = normalized_strengths * 0.5
@@ -95,41 +203,9 @@ def calculate_team_rankings(year, week, stats, teams):
             }
             i += 1
 
-    # Print teamrankings
-    team_rankings_file_string = "Team,Rank,PrevRank,DeltaRank,TeamScore,Strength,StandardDeviation\n"
-    for team in rankings:
-
-        # Print to file string in csv format
-        team_rankings_file_string += "{0},{1:.0f},{2:.0f},{3:.0f},{4:.1f},{5:.1f},{6:.1f}\n".format(team,
-                                                                                                    rankings[team]["rank"],
-                                                                                                    rankings[team]["previous rank"],
-                                                                                                    rankings[team]["delta rank"],
-                                                                                                    rankings[team]["team score"],
-                                                                                                    rankings[team]["strength"],
-                                                                                                    rankings[team]["standard deviation"])
-        
-    teams_list = []
-    for team in teams:
-        teams_list.append(team)
-
-    for index in sort_indexes:
-        team = teams_list[index]
-        team_rankings_string = "{0:.0f} ({1:.0f}): {2}, Team Score: {3:.1f}, Strength: {4:.1f}, Std: {5:.1f}".format(rankings[team]["rank"],
-                                                                                                                     rankings[team]["delta rank"],
-                                                                                                                     team,
-                                                                                                                     rankings[team]["team score"],
-                                                                                                                     rankings[team]["strength"],
-                                                                                                                     rankings[team]["standard deviation"])
-        print(team_rankings_string)
-
-    # Create the predictions file with absolute path
-    absolute_path = utils.get_abs_path(__file__)
-    filename = f"{absolute_path}/rankings/{year}/team_rankings-{year}-{week:02}.csv"
-    utils.write_string(team_rankings_file_string, filename)
-
     return rankings
 
-def calculate_conference_rankings(year, week, teams, team_rankings):
+def calculate_conference_rankings(teams, team_rankings):
 
     # Make lists of all the team scores in each conference
     conference_rankings = {}
@@ -150,26 +226,9 @@ def calculate_conference_rankings(year, week, teams, team_rankings):
     # Sort conference rankings by average team score
     sorted_conference_rankings = sorted(sorted_conference_rankings, key=lambda p: p["score"], reverse=True)
 
-    # Print conference rankings
-    rank = 1
-    conference_rankings_file_string = "Conference,Score\n"
-    for conference_ranking in sorted_conference_rankings:
+    return sorted_conference_rankings
 
-        # Print to file string in csv format
-        conference = conference_ranking["conference"]
-        score = conference_ranking["score"]
-        conference_rankings_file_string += f"{conference},{score:.1f}\n"
-
-        # Print to console in pretty format
-        print(f"{rank}: {conference}, Score: {score:.1f}")
-        rank += 1
-
-    # Create the conference rankings file with absolute path
-    absolute_path = utils.get_abs_path(__file__)
-    filename = f"{absolute_path}/rankings/{year}/conference_rankings-{year}-{week:02}.csv"
-    utils.write_string(conference_rankings_file_string, filename)
-
-def calculate_division_rankings(year, week, teams, team_rankings):
+def calculate_division_rankings(teams, team_rankings):
 
     # Make lists of all the team scores in each division
     division_rankings = {}
@@ -190,20 +249,101 @@ def calculate_division_rankings(year, week, teams, team_rankings):
     # Sort division rankings by average team score
     sorted_division_rankings = sorted(sorted_division_rankings, key=lambda p: p["score"], reverse=True)
 
-    # Print division rankings
+    return sorted_division_rankings
+
+def print_rankings(year, week, outputs):
+
+    team_rankings = outputs["team rankings"]
+
+    # Print team rankings to console in pretty format
+    sorted_teams = sorted(team_rankings, key=lambda t: team_rankings[t]["rank"])
+    for team in sorted_teams:
+        team_rankings_string = "{0:.0f} ({1:.0f}): {2}, Team Score: {3:.1f}, Strength: {4:.1f}, Std: {5:.1f}".format(team_rankings[team]["rank"],
+                                                                                                                     team_rankings[team]["delta rank"],
+                                                                                                                     team,
+                                                                                                                     team_rankings[team]["team score"],
+                                                                                                                     team_rankings[team]["strength"],
+                                                                                                                     team_rankings[team]["standard deviation"])
+        print(team_rankings_string)
+
+    # Print conference and division rankings to console in pretty format
+    rank = 1
+    for conference_ranking in outputs["conference rankings"]:
+        print(f"{rank}: {conference_ranking['conference']}, Score: {conference_ranking['score']:.1f}")
+        rank += 1
+
     rank = 1
+    for division_ranking in outputs["division rankings"]:
+        print(f"{rank}: {division_ranking['division']}, Score: {division_ranking['score']:.1f}")
+        rank += 1
+
+def write_rankings(year, week, outputs):
+
+    write_model(year, week, outputs["model"])
+    write_team_rankings(year, week, outputs["team rankings"])
+    write_schedule_strength(year, week, outputs["schedule strength"])
+    write_conference_rankings(year, week, outputs["conference rankings"])
+    write_division_rankings(year, week, outputs["division rankings"])
+
+def write_ensemble_rankings(year, week, outputs):
+
+    write_ensemble(year, week, outputs["ensemble rankings"])
+
+def print_refined_rankings(year, week, outputs):
+
+    print_refinement(outputs["refinement"])
+
+def write_refined_rankings(year, week, outputs):
+
+    write_refinement(year, week, outputs["refinement"])
+
+def write_team_rankings(year, week, team_rankings):
+
+    # Print team rankings
+    team_rankings_file_string = "Team,Rank,PrevRank,DeltaRank,TeamScore,Strength,StandardDeviation\n"
+    for team in team_rankings:
+
+        # Print to file string in csv format
+        team_rankings_file_string += "{0},{1:.0f},{2:.0f},{3:.0f},{4:.1f},{5:.1f},{6:.1f}\n".format(team,
+                                                                                                    team_rankings[team]["rank"],
+                                                                                                    team_rankings[team]["previous rank"],
+                                                                                                    team_rankings[team]["delta rank"],
+                                                                                                    team_rankings[team]["team score"],
+                                                                                                    team_rankings[team]["strength"],
+                                                                                                    team_rankings[team]["standard deviation"])
+
+    # Create the team rankings file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/rankings/{year}/team_rankings-{year}-{week:02}.csv"
+    utils.write_string(team_rankings_file_string, filename)
+
+def write_conference_rankings(year, week, conference_rankings):
+
+    # Print conference rankings
+    conference_rankings_file_string = "Conference,Score\n"
+    for conference_ranking in conference_rankings:
+
+        # Print to file string in csv format
+        conference = conference_ranking["conference"]
+        score = conference_ranking["score"]
+        conference_rankings_file_string += f"{conference},{score:.1f}\n"
+
+    # Create the conference rankings file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/rankings/{year}/conference_rankings-{year}-{week:02}.csv"
+    utils.write_string(conference_rankings_file_string, filename)
+
+def write_division_rankings(year, week, division_rankings):
+
+    # Print division rankings
     division_rankings_file_string = "Division,Score\n"
-    for division_ranking in sorted_division_rankings:
+    for division_ranking in division_rankings:
 
         # Print to file string in csv format
         division = division_ranking["division"]
         score = division_ranking["score"]
         division_rankings_file_string += f"{division},{score:.1f}\n"
 
-        # Print to console in pretty format
-        print(f"{rank}: {division}, Score: {score:.1f}")
-        rank += 1
-
     # Create the division rankings file with absolute path
     absolute_path = utils.get_abs_path(__file__)
     filename = f"{absolute_path}/rankings/{year}/division_rankings-{year}-{week:02}.csv"
@@ -237,4 +377,12 @@ if __name__ == "__main__":
     week = sys.argv[2]
     if week != "bowl":
         week = int(week)
-    rank(year, week)
+    # Optional modes after the week, in any order: ensemble, refine
+    ensemble = "ensemble" in sys.argv[3:]
+    refine = "refine" in sys.argv[3:]
+    sinks = [print_rankings, write_rankings]
+    if ensemble:
+        sinks.append(write_ensemble_rankings)
+    if refine:
+        sinks += [print_refined_rankings, write_refined_rankings]
+    rank(year, week, sinks=sinks, ensemble=ensemble, refine=refine, write_caches=True)
@@ -0,0 +1,213 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.calculate_model import get_input
+from models.schedule_index import load_schedule_index
+from predictions.calibrate_win_probability import calculate_win_probability, read_win_probability_calibration
+from rankings.read_rankings import read_rankings
+from stats.read_stats import read_stats
+
+
+home_field_advantage = 4
+num_top_teams = 25
+
+
+def calculate_schedule_strength(year, week, stats, teams, team_rankings, inputs=None):
+
+    num_teams = len(teams)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+
+    strengths = np.zeros(num_teams)
+    standard_deviations = np.zeros(num_teams)
+    team_scores = np.zeros(num_teams)
+    i = 0
+    for team in teams:
+        strengths[i] = team_rankings[team]["strength"]
+        standard_deviations[i] = team_rankings[team]["standard deviation"]
+        team_scores[i] = team_rankings[team]["team score"]
+        i += 1
+
+    # Games already played come from the schedule index
+    if week > 0:
+        schedule = get_input(inputs, "schedule", load_schedule_index, year, week, stats, teams, False)
+        past_games = {
+            "team": schedule["team"],
+            "opponent": schedule["opponent"],
+            "location": get_locations(schedule["home"], schedule["neutral"])
+        }
+    else:
+        past_games = get_empty_games()
+
+    # Games still to be played come from the published schedule
+    remaining_games = read_remaining_games(year, week, num_weeks, teams, inputs)
+
+    # An average top team is the mean strength of the top teams by team score
+    top_teams = np.argsort(-team_scores)[:num_top_teams]
+    top_team_strength = np.mean(strengths[top_teams])
+    top_team_standard_deviation = np.mean(standard_deviations[top_teams])
+
+    # Expected wins use the same fitted win probability as the game predictions
+    calibration = read_win_probability_calibration()
+
+    past_strength_of_schedule = calculate_average_opponent_strength(past_games, strengths, num_teams)
+    remaining_strength_of_schedule = calculate_average_opponent_strength(remaining_games, strengths, num_teams)
+    past_expected_wins = calculate_expected_wins(past_games, top_team_strength, top_team_standard_deviation, strengths, standard_deviations, num_teams, calibration)
+    remaining_expected_wins = calculate_expected_wins(remaining_games, top_team_strength, top_team_standard_deviation, strengths, standard_deviations, num_teams, calibration)
+
+    schedule_strength = {}
+    i = 0
+    for team in teams:
+        schedule_strength[team] = {
+            "past strength of schedule": past_strength_of_schedule[i],
+            "remaining strength of schedule": remaining_strength_of_schedule[i],
+            "top team expected wins": past_expected_wins[i] + remaining_expected_wins[i],
+            "top team remaining expected wins": remaining_expected_wins[i]
+        }
+        i += 1
+
+    return schedule_strength
+
+def write_schedule_strength(year, week, schedule_strength):
+
+    # Print schedule strength
+    schedule_strength_file_string = "Team,PastSOS,RemainingSOS,Top25ExpectedWins,Top25RemainingExpectedWins\n"
+    for team in schedule_strength:
+
+        # Print to file string in csv format
+        schedule_strength_file_string += "{0},{1:.1f},{2:.1f},{3:.2f},{4:.2f}\n".format(team,
+                                                                                       schedule_strength[team]["past strength of schedule"],
+                                                                                       schedule_strength[team]["remaining strength of schedule"],
+                                                                                       schedule_strength[team]["top team expected wins"],
+                                                                                       schedule_strength[team]["top team remaining expected wins"])
+
+    # Create the schedule strength file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/schedule_strength-{year}-{week:02}.csv"
+    utils.write_string(schedule_strength_file_string, filename)
+
+def get_empty_games():
+
+    return {
+        "team": np.zeros(0, dtype=int),
+        "opponent": np.zeros(0, dtype=int),
+        "location": np.zeros(0, dtype=int)
+    }
+
+def get_locations(home, neutral):
+
+    # Location is +1 at home, -1 on the road and 0 at a neutral site
+    locations = np.where(home == 1, 1, -1)
+    locations[neutral == 1] = 0
+
+    return locations
+
+def read_remaining_games(year, week, num_weeks, teams, inputs=None):
+
+    team_to_index = {}
+    i = 0
+    for team in teams:
+        team_to_index[team] = i
+        i += 1
+
+    away_teams = []
+    home_teams = []
+    is_bowl = []
+    for w in range(week + 1, num_weeks + 2):
+
+        # Skip weeks whose schedule has not been published yet
+        try:
+            scores = get_input(inputs, f"scores {w}", the_kick_is_bad.read_scores, year, w)
+        except FileNotFoundError:
+            continue
+
+        for game in scores["games"]:
+            if game["game"]["gameState"] == "final":
+                continue
+            away_teams.append(team_to_index[game["game"]["away"]["names"]["standard"]])
+            home_teams.append(team_to_index[game["game"]["home"]["names"]["standard"]])
+            is_bowl.append(w > num_weeks)
+
+    away_teams = np.array(away_teams, dtype=int)
+    home_teams = np.array(home_teams, dtype=int)
+    is_bowl = np.array(is_bowl, dtype=bool)
+
+    # Store each game from the point of view of both teams
+    # Assume all bowl games are neutral site
+    home_locations = np.where(is_bowl, 0, 1)
+    games = {
+        "team": np.concatenate([home_teams, away_teams]),
+        "opponent": np.concatenate([away_teams, home_teams]),
+        "location": np.concatenate([home_locations, -home_locations])
+    }
+
+    return games
+
+def calculate_average_opponent_strength(games, strengths, num_teams):
+
+    num_games = np.bincount(games["team"], minlength=num_teams)
+    total_opponent_strength = np.bincount(games["team"], weights=strengths[games["opponent"]], minlength=num_teams)
+
+    return total_opponent_strength / np.maximum(1, num_games)
+
+def calculate_expected_wins(games, top_team_strength, top_team_standard_deviation, strengths, standard_deviations, num_teams, calibration=None):
+
+    # Put an average top team in place of every team on its own schedule
+    margins = top_team_strength + home_field_advantage * games["location"] - strengths[games["opponent"]]
+    margin_standard_deviations = np.sqrt(top_team_standard_deviation ** 2 + standard_deviations[games["opponent"]] ** 2)
+    win_probabilities = calculate_win_probability(margins, margin_standard_deviations, calibration)
+
+    return np.bincount(games["team"], weights=win_probabilities, minlength=num_teams)
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    if week == 0:
+        stats = None
+    else:
+        stats = read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    team_rankings = read_rankings(year, week)
+    schedule_strength = calculate_schedule_strength(year, week, stats, teams, team_rankings)
+    write_schedule_strength(year, week, schedule_strength)
+    sorted_teams = sorted(schedule_strength, key=lambda t: schedule_strength[t]["top team expected wins"])
+    rank = 1
+    for team in sorted_teams:
+        print("{0}: {1}, Past SOS: {2:.1f}, Remaining SOS: {3:.1f}, Top 25 Expected Wins: {4:.2f} ({5:.2f} remaining)".format(rank,
+                                                                                                                               team,
+                                                                                                                               schedule_strength[team]["past strength of schedule"],
+                                                                                                                               schedule_strength[team]["remaining strength of schedule"],
+                                                                                                                               schedule_strength[team]["top team expected wins"],
+                                                                                                                               schedule_strength[team]["top team remaining expected wins"]))
+        rank += 1
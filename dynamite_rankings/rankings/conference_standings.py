@@ -0,0 +1,356 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import the_kick_is_bad
+import time
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from predictions.calibrate_win_probability import calculate_win_probability, read_win_probability_calibration
+from rankings.read_rankings import read_rankings
+
+
+# Conferences that do not play a championship game
+no_championship_conferences = ["Independents", "FCS"]
+
+# Conference championship games are played in the second to last regular season week, as in models/evaluate_model.py
+# Standings count the conference games of every week before it
+championship_week_offset = 1
+
+home_field_advantage = 4
+
+# Scenarios evaluated at once, each holds a teams by teams array of results, so chunks stay in cache
+scenario_chunk_size = 10000
+
+
+def read_conference_games(year, week, teams):
+
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    championship_week = num_weeks - championship_week_offset
+
+    # Conference games of the regular season, finished or not
+    # Only games through the given week count as decided, so a past week never sees the results after it
+    conference_games = {}
+    for game_week in range(1, championship_week):
+        try:
+            scores = the_kick_is_bad.read_scores(year, game_week)
+        except FileNotFoundError:
+            continue
+
+        for game in scores["games"]:
+            away_team = game["game"]["away"]["names"]["standard"]
+            home_team = game["game"]["home"]["names"]["standard"]
+            conference = teams[away_team]["conference"]
+            if conference != teams[home_team]["conference"] or conference in no_championship_conferences:
+                continue
+
+            if game_week <= week and game["game"]["gameState"] == "final":
+                home_won = int(game["game"]["home"]["score"]) > int(game["game"]["away"]["score"])
+                is_final = True
+            else:
+                home_won = False
+                is_final = False
+
+            conference_games.setdefault(conference, []).append((away_team, home_team, is_final, home_won))
+
+    return conference_games
+
+def create_conference_arrays(conference, games, teams, strengths):
+
+    # Teams sorted by division, so each division is one contiguous block
+    conference_teams = sorted((team for team in teams if teams[team]["conference"] == conference), key=lambda team: (teams[team]["division"], team))
+    team_to_index = {}
+    i = 0
+    for team in conference_teams:
+        team_to_index[team] = i
+        i += 1
+
+    divisions = []
+    for team in conference_teams:
+        if teams[team]["division"] not in divisions:
+            divisions.append(teams[team]["division"])
+    division_ids = np.array([divisions.index(teams[team]["division"]) for team in conference_teams], dtype=int)
+    division_starts = np.searchsorted(division_ids, np.arange(len(divisions)))
+
+    conference_arrays = {
+        "conference": conference,
+        "teams": conference_teams,
+        "divisions": divisions,
+        "division ids": division_ids,
+        "division starts": division_starts,
+        "away": np.array([team_to_index[game[0]] for game in games], dtype=int),
+        "home": np.array([team_to_index[game[1]] for game in games], dtype=int),
+        "is final": np.array([game[2] for game in games], dtype=bool),
+        "home won": np.array([game[3] for game in games], dtype=bool),
+        "strengths": np.array([strengths[team] for team in conference_teams])
+    }
+
+    return conference_arrays
+
+def calculate_standings(conference_arrays, home_won, played):
+
+    # home_won is games by scenarios, played says which games count toward the standings
+    # Every array keeps the scenarios on its last axis, so each operation runs over contiguous memory
+    num_scenarios = home_won.shape[1]
+    num_teams = len(conference_arrays["teams"])
+    away = conference_arrays["away"]
+    home = conference_arrays["home"]
+    division_ids = conference_arrays["division ids"]
+
+    # Games with the same result in every scenario are counted once and shared by all of them
+    is_fixed = np.all(home_won == home_won[:, :1], axis=1)
+    fixed_head_to_head = np.zeros((num_teams, num_teams), dtype=np.float32)
+    games_against = np.zeros((num_teams, num_teams), dtype=np.float32)
+    for g in np.flatnonzero(played & is_fixed):
+        fixed_head_to_head[home[g], away[g]] += home_won[g, 0]
+        fixed_head_to_head[away[g], home[g]] += ~home_won[g, 0]
+        games_against[home[g], away[g]] += 1
+        games_against[away[g], home[g]] += 1
+
+    # Wins of each team over each other team, one vector operation per remaining game
+    head_to_head = np.empty((num_teams, num_teams, num_scenarios), dtype=np.float32)
+    head_to_head[:] = fixed_head_to_head[:, :, np.newaxis]
+    for g in np.flatnonzero(played & ~is_fixed):
+        head_to_head[home[g], away[g]] += home_won[g]
+        head_to_head[away[g], home[g]] += ~home_won[g]
+        games_against[home[g], away[g]] += 1
+        games_against[away[g], home[g]] += 1
+
+    wins = head_to_head.sum(axis=1)
+    games_played = games_against.sum(axis=1)[:, np.newaxis]
+    win_percentage = wins / np.maximum(1, games_played)
+
+    # Division record
+    same_division = division_ids[:, np.newaxis] == division_ids[np.newaxis, :]
+    division_wins = np.matmul(same_division[:, np.newaxis, :].astype(np.float32), head_to_head)[:, 0]
+    division_games = (games_against * same_division).sum(axis=1)[:, np.newaxis]
+    division_percentage = division_wins / np.maximum(1, division_games)
+
+    # Teams tied on conference record in the same division are broken as one group
+    # Each tiebreaker is taken over the whole tied group, rather than restarting as teams drop out of a multi-team tie
+    is_tied = (win_percentage[:, np.newaxis, :] == win_percentage[np.newaxis, :, :]) & same_division[:, :, np.newaxis]
+
+    # Head-to-head record against the rest of the tied group, as net wins per game
+    # Teams never play themselves and ties are symmetric, so the losses are the column sums of the same products
+    group_results = head_to_head * is_tied
+    group_wins = group_results.sum(axis=1)
+    group_losses = group_results.sum(axis=0)
+    head_to_head_record = (group_wins - group_losses) / np.maximum(1, group_wins + group_losses)
+
+    # Record against the opponents every team in the tied group played, not counting the group itself
+    not_played = (games_against == 0).astype(np.float32)
+    num_group_teams_missing = np.matmul(not_played.T, is_tied.astype(np.float32))
+    is_common_opponent = (num_group_teams_missing == 0) & ~is_tied
+    common_wins = (head_to_head * is_common_opponent).sum(axis=1)
+    common_losses = (head_to_head.transpose(1, 0, 2) * is_common_opponent).sum(axis=1)
+    common_opponent_record = (common_wins - common_losses) / np.maximum(1, common_wins + common_losses)
+
+    # The model strength breaks any tie left
+    strengths = np.broadcast_to(conference_arrays["strengths"][:, np.newaxis], (num_teams, num_scenarios))
+
+    standings = {
+        "wins": wins,
+        "losses": games_played - wins,
+        "division wins": division_wins,
+        "division losses": division_games - division_wins,
+        "tiebreakers": [win_percentage, head_to_head_record, division_percentage, common_opponent_record, strengths]
+    }
+
+    return standings
+
+def sort_standings(conference_arrays, standings):
+
+    # Sort each scenario by division, then by every tiebreaker in turn, best team first
+    division_keys = np.broadcast_to(conference_arrays["division ids"][:, np.newaxis], standings["wins"].shape)
+    keys = [-tiebreaker for tiebreaker in reversed(standings["tiebreakers"])] + [division_keys]
+    order = np.lexsort(keys, axis=0)
+
+    return order
+
+def get_division_leaders(conference_arrays, standings, is_eligible):
+
+    division_ids = conference_arrays["division ids"]
+    division_starts = conference_arrays["division starts"]
+
+    # Keep the teams level with the best in their division on each tiebreaker in turn
+    # Only the leaders are needed, so this is much cheaper than sorting the whole division
+    is_candidate = is_eligible.copy()
+    for tiebreaker in standings["tiebreakers"]:
+        candidate_values = np.where(is_candidate, tiebreaker, -np.inf)
+        best_values = np.maximum.reduceat(candidate_values, division_starts, axis=0)
+        is_candidate &= candidate_values == best_values[division_ids]
+
+    # Teams equal on every tiebreaker go to the first one listed
+    num_teams = len(division_ids)
+    team_indexes = np.where(is_candidate, np.arange(num_teams)[:, np.newaxis], num_teams)
+    leaders = np.minimum.reduceat(team_indexes, division_starts, axis=0)
+
+    return leaders
+
+def get_championship_participants(conference_arrays, standings):
+
+    is_eligible = np.ones(standings["wins"].shape, dtype=bool)
+    leaders = get_division_leaders(conference_arrays, standings, is_eligible)
+
+    # Division winners meet, a conference without divisions sends its top two teams
+    if len(conference_arrays["divisions"]) > 1:
+        return leaders
+
+    num_scenarios = is_eligible.shape[1]
+    is_eligible[leaders[0], np.arange(num_scenarios)] = False
+    runners_up = get_division_leaders(conference_arrays, standings, is_eligible)
+
+    return np.concatenate((leaders, runners_up))
+
+def get_current_outcomes(conference_arrays):
+
+    home_won = conference_arrays["home won"][:, np.newaxis]
+
+    return home_won, conference_arrays["is final"]
+
+def simulate_outcomes(conference_arrays, rankings, num_scenarios, rng, calibration=None):
+
+    # Finished games keep their result, the rest are drawn from the predicted win probabilities
+    teams_list = conference_arrays["teams"]
+    strengths = np.array([rankings[team]["strength"] for team in teams_list])
+    standard_deviations = np.array([rankings[team]["standard deviation"] for team in teams_list])
+    away = conference_arrays["away"]
+    home = conference_arrays["home"]
+
+    margins = strengths[home] + home_field_advantage - strengths[away]
+    margin_standard_deviations = np.sqrt(standard_deviations[home]**2 + standard_deviations[away]**2)
+    win_probabilities = calculate_win_probability(np.abs(margins), margin_standard_deviations, calibration)
+    home_win_probabilities = np.where(margins >= 0, win_probabilities, 1 - win_probabilities)
+
+    draws = rng.random((len(home), num_scenarios)) < home_win_probabilities[:, np.newaxis]
+    home_won = np.where(conference_arrays["is final"][:, np.newaxis], conference_arrays["home won"][:, np.newaxis], draws)
+
+    return home_won
+
+def calculate_championship_odds(year, week, num_scenarios=1000000, seed=0):
+
+    teams, _ = the_kick_is_bad.read_teams(year)
+    rankings = read_rankings(year, week)
+    calibration = read_win_probability_calibration()
+    strengths = {team: rankings[team]["strength"] for team in rankings}
+
+    conference_games = read_conference_games(year, week, teams)
+    rng = np.random.default_rng(seed)
+
+    championship_odds = {}
+    for conference in sorted(conference_games):
+        conference_arrays = create_conference_arrays(conference, conference_games[conference], teams, strengths)
+        num_teams = len(conference_arrays["teams"])
+        every_game = np.ones(len(conference_arrays["home"]), dtype=bool)
+
+        # Count how often each team reaches the championship game, a chunk of scenarios at a time
+        appearances = np.zeros(num_teams)
+        remaining = num_scenarios
+        while remaining > 0:
+            chunk_size = min(scenario_chunk_size, remaining)
+            home_won = simulate_outcomes(conference_arrays, rankings, chunk_size, rng, calibration)
+            standings = calculate_standings(conference_arrays, home_won, every_game)
+            participants = get_championship_participants(conference_arrays, standings)
+            appearances += np.bincount(participants.ravel(), minlength=num_teams)
+            remaining -= chunk_size
+
+        i = 0
+        for team in conference_arrays["teams"]:
+            championship_odds[team] = {
+                "conference": conference,
+                "division": teams[team]["division"],
+                "championship odds": appearances[i] / num_scenarios
+            }
+            i += 1
+
+    return championship_odds
+
+def calculate_current_standings(year, week):
+
+    teams, _ = the_kick_is_bad.read_teams(year)
+    rankings = read_rankings(year, week)
+    strengths = {team: rankings[team]["strength"] for team in rankings}
+
+    conference_games = read_conference_games(year, week, teams)
+
+    # Only finished games count, as one scenario
+    current_standings = {}
+    for conference in sorted(conference_games):
+        conference_arrays = create_conference_arrays(conference, conference_games[conference], teams, strengths)
+        home_won, played = get_current_outcomes(conference_arrays)
+        standings = calculate_standings(conference_arrays, home_won, played)
+        order = sort_standings(conference_arrays, standings)
+
+        division_starts = conference_arrays["division starts"]
+        position = 0
+        for i in order[:, 0]:
+            team = conference_arrays["teams"][i]
+            division_rank = position - division_starts[conference_arrays["division ids"][i]] + 1
+            current_standings[team] = {
+                "conference": conference,
+                "division": teams[team]["division"],
+                "division rank": int(division_rank),
+                "wins": int(standings["wins"][i, 0]),
+                "losses": int(standings["losses"][i, 0]),
+                "division wins": int(standings["division wins"][i, 0]),
+                "division losses": int(standings["division losses"][i, 0])
+            }
+            position += 1
+
+    return current_standings
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    week, _ = utils.check_week(week, num_weeks)
+    if len(sys.argv) > 3:
+        num_scenarios = int(sys.argv[3])
+        start_time = time.perf_counter()
+        championship_odds = calculate_championship_odds(year, week, num_scenarios)
+        elapsed_time = time.perf_counter() - start_time
+        sorted_teams = sorted(championship_odds, key=lambda team: (championship_odds[team]["conference"], -championship_odds[team]["championship odds"]))
+        for team in sorted_teams:
+            if championship_odds[team]["championship odds"] > 0:
+                print("{0} ({1}): {2}, Championship Game: {3:.1%}".format(championship_odds[team]["conference"],
+                                                                          championship_odds[team]["division"],
+                                                                          team,
+                                                                          championship_odds[team]["championship odds"]))
+        print(f"Simulated {num_scenarios} seasons in {elapsed_time:.1f} s")
+    else:
+        current_standings = calculate_current_standings(year, week)
+        for team in current_standings:
+            print("{0} ({1}): {2}. {3}, Conference: {4}-{5}, Division: {6}-{7}".format(current_standings[team]["conference"],
+                                                                                      current_standings[team]["division"],
+                                                                                      current_standings[team]["division rank"],
+                                                                                      team,
+                                                                                      current_standings[team]["wins"],
+                                                                                      current_standings[team]["losses"],
+                                                                                      current_standings[team]["division wins"],
+                                                                                      current_standings[team]["division losses"]))
@@ -0,0 +1,268 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import the_kick_is_bad
+import time
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from models.schedule_index import load_schedule_index
+from rankings.read_rankings import read_rankings
+from stats.read_stats import read_stats
+
+
+# Each win counts this much, plus up to the margin weight for a win by the margin cap or more
+# A blowout loss ranked above the winner is a worse violation than a one point loss
+margin_weight = 1
+margin_cap = 28
+
+# Stop after this many passes even if moves are still improving, each pass is one sweep over the teams
+max_passes = 100
+
+# Moves must improve the weighted violations by more than this, so rounding never makes moves cycle
+move_tolerance = 1e-9
+
+
+def refine_rankings(team_rankings, schedule, teams):
+
+    teams_list = list(teams)
+
+    # Start from the current ranking, best team first
+    order = np.array(sorted(range(len(teams_list)), key=lambda i: team_rankings[teams_list[i]]["rank"]), dtype=int)
+
+    games = get_game_graph(schedule, len(teams_list))
+    refinement = refine_order(order, games)
+
+    refined_rankings = {}
+    for position, i in enumerate(refinement["order"]):
+        team = teams_list[i]
+        refined_rankings[team] = dict(team_rankings[team])
+        refined_rankings[team]["refined rank"] = position + 1
+
+    refinement["rankings"] = refined_rankings
+
+    return refinement
+
+def get_game_graph(schedule, num_teams):
+
+    # Every game is stored twice, keep it once from the winner's side and skip ties
+    is_win = schedule["points gained"] > schedule["points allowed"]
+    winners = schedule["team"][is_win]
+    losers = schedule["opponent"][is_win]
+    margins = (schedule["points gained"] - schedule["points allowed"])[is_win]
+    weights = 1 + margin_weight * np.minimum(margins, margin_cap) / margin_cap
+
+    # For each team, its opponents and the net weight of the results between them
+    # Positive when the team beat the opponent more than it lost to it
+    net_weights = [{} for _ in range(num_teams)]
+    for winner, loser, weight in zip(winners.tolist(), losers.tolist(), weights.tolist()):
+        net_weights[winner][loser] = net_weights[winner].get(loser, 0) + weight
+        net_weights[loser][winner] = net_weights[loser].get(winner, 0) - weight
+
+    neighbors = []
+    neighbor_weights = []
+    for t in range(num_teams):
+        neighbors.append(np.array(list(net_weights[t].keys()), dtype=int))
+        neighbor_weights.append(np.array(list(net_weights[t].values())))
+
+    games = {
+        "winners": winners,
+        "losers": losers,
+        "weights": weights,
+        "neighbors": neighbors,
+        "neighbor weights": neighbor_weights,
+        "net weights": net_weights
+    }
+
+    return games
+
+def calculate_violations(positions, games):
+
+    is_violation = positions[games["winners"]] > positions[games["losers"]]
+
+    return float(np.sum(games["weights"][is_violation])), int(np.sum(is_violation))
+
+def refine_order(order, games):
+
+    start_time = time.perf_counter()
+
+    order = order.copy()
+    positions = np.empty(len(order), dtype=int)
+    positions[order] = np.arange(len(order))
+
+    initial_cost, initial_violations = calculate_violations(positions, games)
+
+    num_moves = 0
+    for _ in range(max_passes):
+        improvement = 0.0
+
+        # Adjacent swaps only change the order of the two teams swapped
+        for p in range(len(order) - 1):
+            delta = get_swap_delta(order[p], order[p + 1], games)
+            if delta < -move_tolerance:
+                order[p], order[p + 1] = order[p + 1], order[p]
+                positions[order[p]] = p
+                positions[order[p + 1]] = p + 1
+                improvement -= delta
+                num_moves += 1
+
+        # Block moves lift or drop one team past a run of others, only its own games change
+        for t in order.tolist():
+            delta, target = get_best_insertion(t, positions, games)
+            if delta < -move_tolerance:
+                move_team(order, positions, positions[t], target)
+                improvement -= delta
+                num_moves += 1
+
+        if improvement == 0:
+            break
+
+    final_cost, final_violations = calculate_violations(positions, games)
+
+    num_games = len(games["winners"])
+    refinement = {
+        "order": order,
+        "initial violations": initial_violations,
+        "final violations": final_violations,
+        "initial weighted violations": initial_cost,
+        "final weighted violations": final_cost,
+        "initial accuracy": 1 - initial_violations / max(1, num_games),
+        "final accuracy": 1 - final_violations / max(1, num_games),
+        "number of games": num_games,
+        "number of moves": num_moves,
+        "time": time.perf_counter() - start_time
+    }
+
+    return refinement
+
+def get_swap_delta(upper_team, lower_team, games):
+
+    # After the swap the lower team is above, so its wins over the upper team stop being violations
+    net_weight = games["net weights"][lower_team].get(upper_team, 0)
+
+    return -net_weight
+
+def get_best_insertion(t, positions, games):
+
+    neighbors = games["neighbors"][t]
+    if len(neighbors) == 0:
+        return 0.0, positions[t]
+
+    current = positions[t]
+    neighbor_positions = positions[neighbors]
+    net_weights = games["neighbor weights"][t]
+
+    best_delta = 0.0
+    best_target = current
+
+    # Dropping t below a run of teams turns its wins over them into violations and fixes its losses to them
+    below = neighbor_positions > current
+    if np.any(below):
+        order = np.argsort(neighbor_positions[below], kind="stable")
+        deltas = np.cumsum(net_weights[below][order])
+        k = np.argmin(deltas)
+        if deltas[k] < best_delta - move_tolerance:
+            best_delta = deltas[k]
+            best_target = neighbor_positions[below][order][k]
+
+    # Lifting t above a run of teams does the opposite, nearest teams first
+    above = neighbor_positions < current
+    if np.any(above):
+        order = np.argsort(-neighbor_positions[above], kind="stable")
+        deltas = np.cumsum(-net_weights[above][order])
+        k = np.argmin(deltas)
+        if deltas[k] < best_delta - move_tolerance:
+            best_delta = deltas[k]
+            best_target = neighbor_positions[above][order][k]
+
+    return best_delta, best_target
+
+def move_team(order, positions, source, target):
+
+    t = order[source]
+
+    # Shift the teams in between by one place toward where t was
+    if target > source:
+        order[source:target] = order[source + 1:target + 1].copy()
+    else:
+        order[target + 1:source + 1] = order[target:source].copy()
+    order[target] = t
+
+    start = min(source, target)
+    end = max(source, target) + 1
+    positions[order[start:end]] = np.arange(start, end)
+
+def write_refinement(year, week, refinement):
+
+    # Print refined rankings
+    refined_rankings = refinement["rankings"]
+    refined_rankings_file_string = "Team,RefinedRank,Rank,TeamScore\n"
+    sorted_teams = sorted(refined_rankings, key=lambda team: refined_rankings[team]["refined rank"])
+    for team in sorted_teams:
+
+        # Print to file string in csv format
+        refined_rankings_file_string += "{0},{1},{2:.0f},{3:.1f}\n".format(team,
+                                                                          refined_rankings[team]["refined rank"],
+                                                                          refined_rankings[team]["rank"],
+                                                                          refined_rankings[team]["team score"])
+
+    # Create the refined rankings file with absolute path
+    absolute_path = utils.get_abs_path(__file__)
+    filename = f"{absolute_path}/{year}/refined_rankings-{year}-{week:02}.csv"
+    utils.write_string(refined_rankings_file_string, filename)
+
+def print_refinement(refinement):
+
+    sorted_teams = sorted(refinement["rankings"], key=lambda team: refinement["rankings"][team]["refined rank"])
+    for team in sorted_teams:
+        ranking = refinement["rankings"][team]
+        print("{0}: {1}, Rank: {2}, Change: {3:+d}".format(ranking["refined rank"],
+                                                         team,
+                                                         ranking["rank"],
+                                                         int(ranking["rank"] - ranking["refined rank"])))
+    print("Retrodictive accuracy: {0:.1%} ({1} violations) before, {2:.1%} ({3} violations) after".format(refinement["initial accuracy"],
+                                                                                                        refinement["initial violations"],
+                                                                                                        refinement["final accuracy"],
+                                                                                                        refinement["final violations"]))
+    print("Weighted violations: {0:.1f} before, {1:.1f} after, {2} moves in {3:.1f} ms".format(refinement["initial weighted violations"],
+                                                                                               refinement["final weighted violations"],
+                                                                                               refinement["number of moves"],
+                                                                                               refinement["time"] * 1000))
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    stats = read_stats(year, week)
+    week, _ = utils.check_week(week, num_weeks)
+    teams, _ = the_kick_is_bad.read_teams(year)
+    team_rankings = read_rankings(year, week)
+    schedule = load_schedule_index(year, week, stats, teams)
+    refinement = refine_rankings(team_rankings, schedule, teams)
+    print_refinement(refinement)
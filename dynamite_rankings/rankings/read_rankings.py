@@ -28,6 +28,10 @@ import sys
 import the_kick_is_bad
 from the_kick_is_bad import utils
 
+# DynamiteRankings imports
+from archives.season_archive import open_output_file
+from database.history_database import query_week
+
 
 def read_rankings(year, week):
 
@@ -35,10 +39,24 @@ def read_rankings(year, week):
     num_weeks = the_kick_is_bad.read_number_of_weeks(year)
     week, _ = utils.check_week(week, num_weeks)
 
-    # Open rankings file with absolute path
-    absolute_path = utils.get_abs_path(__file__)
-    filename = f"{absolute_path}/{year}/team_rankings-{year}-{week:02}.csv"
-    with open(filename) as file:
+    # Read from the history database when it holds the current rankings file
+    source = f"rankings/{year}/team_rankings-{year}-{week:02}.csv"
+    records = query_week("team_rankings", year, week, source)
+    if records is not None:
+        rankings = {}
+        for record in records:
+            rankings[record["team"]] = {
+                "rank": record["rank"],
+                "previous rank": record["previous rank"],
+                "delta rank": record["delta rank"],
+                "team score": record["team score"],
+                "strength": record["strength"],
+                "standard deviation": record["standard deviation"]
+            }
+        return rankings
+
+    # Open rankings file, from the season archive if the season has been archived
+    with open_output_file(source) as file:
 
         rankings = {}
 
@@ -0,0 +1,291 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import basename, dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+import numpy as np
+import re
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from archives.season_archive import find_output_files, open_output_file
+from database.history_database import query_weeks
+from models.compact_arrays import get_dtypes
+
+
+history_fields = ["year", "week", "rank", "strength", "standard deviation", "team score"]
+
+# Loaded index, kept for the life of the process so queries do not touch disk
+team_history_index = None
+
+
+def get_team_history_filename():
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/team_history.npz"
+
+def find_history_sources():
+
+    # Map each (year, week) to its rankings and model sources, with the mtime of whatever holds each
+    sources = {}
+    rankings_files = find_output_files("rankings", "team_rankings-*.csv")
+    for source in rankings_files:
+        year, week = parse_year_week(source)
+        sources.setdefault((year, week), {})["rankings"] = (source, rankings_files[source])
+    model_files = find_output_files("models", "model-*.csv")
+    for source in model_files:
+        year, week = parse_year_week(source)
+        sources.setdefault((year, week), {})["model"] = (source, model_files[source])
+
+    return sources
+
+def parse_year_week(filename):
+
+    match = re.search(r"-(\d{4})-(\d{2})\.csv$", basename(filename))
+
+    return int(match.group(1)), int(match.group(2))
+
+def read_history_rows(year, week, source, rankings_records=None, model_records=None):
+
+    rows = {}
+
+    # Rankings give the rank and team score, from the history database when it holds the current file
+    if rankings_records is not None:
+        for record in rankings_records:
+            rows[record["team"]] = [year, week, record["rank"], record["strength"], record["standard deviation"], record["team score"]]
+    elif "rankings" in source:
+        with open_output_file(source["rankings"][0]) as file:
+            _ = file.readline()
+            for line in file:
+                ranking = line.strip().split(",")
+                if len(ranking) < 7:
+                    continue
+                rows[ranking[0]] = [year, week, int(ranking[1]), float(ranking[5]), float(ranking[6]), float(ranking[4])]
+
+    # Models give the full precision strength and standard deviation
+    model_rows = []
+    if model_records is not None:
+        model_rows = [(record["team"], record["strength"], record["standard deviation"]) for record in model_records]
+    elif "model" in source:
+        with open_output_file(source["model"][0]) as file:
+            _ = file.readline()
+            for line in file:
+                model_data = line.strip().split(",")
+                if len(model_data) < 3:
+                    continue
+                model_rows.append((model_data[0], float(model_data[1]), float(model_data[2])))
+
+    for team, strength, standard_deviation in model_rows:
+        if team not in rows:
+            rows[team] = [year, week, 0, 0.0, 0.0, np.nan]
+        rows[team][3] = strength
+        rows[team][4] = standard_deviation
+
+    return rows
+
+def create_team_history_index():
+
+    return {
+        "teams": [],
+        "offsets": np.zeros(1, dtype=int),
+        "year": np.zeros(0, dtype=int),
+        "week": np.zeros(0, dtype=int),
+        "rank": np.zeros(0, dtype=int),
+        "strength": np.zeros(0),
+        "standard deviation": np.zeros(0),
+        "team score": np.zeros(0),
+        "source mtimes": {}
+    }
+
+def read_team_history_index():
+
+    filename = get_team_history_filename()
+    if not exists(filename):
+        return create_team_history_index()
+
+    with np.load(filename) as history_data:
+        index = {
+            "teams": history_data["teams"].tolist(),
+            "offsets": history_data["offsets"],
+            "source mtimes": {}
+        }
+        for field in history_fields:
+            index[field] = history_data[field.replace(" ", "_")]
+        for source_key, mtime in zip(history_data["source_keys"].tolist(), history_data["source_mtimes"].tolist()):
+            index["source mtimes"][tuple(source_key)] = mtime
+
+    return index
+
+def write_team_history_index(index):
+
+    source_keys = list(index["source mtimes"].keys())
+    history_data = {
+        "teams": np.array(index["teams"]),
+        "offsets": index["offsets"],
+        "source_keys": np.array(source_keys, dtype=int).reshape(-1, 2),
+        "source_mtimes": np.array([index["source mtimes"][key] for key in source_keys])
+    }
+    for field in history_fields:
+        history_data[field.replace(" ", "_")] = index[field]
+    np.savez(get_team_history_filename(), **history_data)
+
+def update_team_history_index(compact=False, index=None):
+
+    global team_history_index
+
+    if index is None:
+        index = read_team_history_index()
+    sources = find_history_sources()
+
+    # Switching between compact and full precision rebuilds every week
+    is_index_compact = index["strength"].dtype == get_dtypes(True)["float"]
+
+    # Find the weeks whose files are new or changed since the last update
+    changed_weeks = []
+    source_mtimes = {}
+    for key in sources:
+        source_mtimes[key] = max(mtime for _, mtime in sources[key].values())
+        if index["source mtimes"].get(key) != source_mtimes[key] or is_index_compact != compact:
+            changed_weeks.append(key)
+    removed_weeks = [key for key in index["source mtimes"] if key not in sources]
+
+    if changed_weeks or removed_weeks:
+
+        # Flatten the index back into one row per team and week
+        team_ids = np.repeat(np.arange(len(index["teams"])), np.diff(index["offsets"]))
+        keep = np.ones(len(team_ids), dtype=bool)
+        for year, week in changed_weeks + removed_weeks:
+            keep &= ~((index["year"] == year) & (index["week"] == week))
+        columns = {"team": [index["teams"][i] for i in team_ids[keep]]}
+        for field in history_fields:
+            columns[field] = index[field][keep].tolist()
+
+        # Read only the changed weeks, over one database connection for whatever the history database already holds
+        rankings_records = query_weeks("team_rankings", {key: sources[key]["rankings"] for key in changed_weeks if "rankings" in sources[key]})
+        model_records = query_weeks("models", {key: sources[key]["model"] for key in changed_weeks if "model" in sources[key]})
+        for year, week in changed_weeks:
+            rows = read_history_rows(year, week, sources[(year, week)], rankings_records.get((year, week)), model_records.get((year, week)))
+            for team in rows:
+                columns["team"].append(team)
+                for field, value in zip(history_fields, rows[team]):
+                    columns[field].append(value)
+
+        index = build_team_history_index(columns, compact)
+        index["source mtimes"] = source_mtimes
+        write_team_history_index(index)
+
+    team_history_index = index
+
+    return index
+
+def build_team_history_index(columns, compact=False):
+
+    # Compact indexes store counts as int16 and values as float32
+    dtypes = get_dtypes(compact)
+
+    teams = sorted(set(columns["team"]))
+    team_to_index = {}
+    i = 0
+    for team in teams:
+        team_to_index[team] = i
+        i += 1
+    team_ids = np.array([team_to_index[team] for team in columns["team"]], dtype=int)
+    years = np.array(columns["year"], dtype=int)
+    weeks = np.array(columns["week"], dtype=int)
+
+    # Sort rows by team, then year and week, so each team is one contiguous slice
+    order = np.lexsort((weeks, years, team_ids))
+    index = {
+        "teams": teams,
+        "offsets": np.concatenate([[0], np.cumsum(np.bincount(team_ids, minlength=len(teams)))]),
+        "year": years[order].astype(dtypes["int"]),
+        "week": weeks[order].astype(dtypes["int"]),
+        "rank": np.array(columns["rank"], dtype=dtypes["int"])[order],
+        "strength": np.array(columns["strength"], dtype=dtypes["float"])[order],
+        "standard deviation": np.array(columns["standard deviation"], dtype=dtypes["float"])[order],
+        "team score": np.array(columns["team score"], dtype=dtypes["float"])[order]
+    }
+
+    return index
+
+def load_team_history_index():
+
+    global team_history_index
+
+    # Bring the saved index up to date with the rankings and models changed since it was written, keeping its precision
+    if team_history_index is None:
+        index = read_team_history_index()
+        is_index_compact = index["strength"].dtype == get_dtypes(True)["float"]
+        team_history_index = update_team_history_index(is_index_compact, index)
+
+    return team_history_index
+
+def read_team_history(team, start_year=None, end_year=None):
+
+    index = load_team_history_index()
+
+    # Return views into the team's contiguous slice
+    team_history = {}
+    if team not in index["teams"]:
+        for field in history_fields:
+            team_history[field] = index[field][0:0]
+        return team_history
+
+    i = index["teams"].index(team)
+    start = index["offsets"][i]
+    end = index["offsets"][i + 1]
+
+    # Narrow to the requested seasons with a binary search on the sorted years
+    if start_year is not None:
+        start += np.searchsorted(index["year"][start:end], start_year, side="left")
+    if end_year is not None:
+        end = start + np.searchsorted(index["year"][start:end], end_year, side="right")
+
+    for field in history_fields:
+        team_history[field] = index[field][start:end]
+
+    return team_history
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "update":
+        compact = len(sys.argv) > 2 and sys.argv[2] == "compact"
+        index = update_team_history_index(compact)
+        print(f"Indexed {len(index['year'])} weekly rankings for {len(index['teams'])} teams")
+    else:
+        team = sys.argv[1]
+        start_year = None
+        end_year = None
+        if len(sys.argv) > 2:
+            start_year = int(sys.argv[2])
+        if len(sys.argv) > 3:
+            end_year = int(sys.argv[3])
+        team_history = read_team_history(team, start_year, end_year)
+        for i in range(len(team_history["year"])):
+            print("{0} week {1:02}: Rank: {2}, Strength: {3:.1f}, Std: {4:.1f}, Team Score: {5:.1f}".format(team_history["year"][i],
+                                                                                                           team_history["week"][i],
+                                                                                                           team_history["rank"][i],
+                                                                                                           team_history["strength"][i],
+                                                                                                           team_history["standard deviation"][i],
+                                                                                                           team_history["team score"][i]))
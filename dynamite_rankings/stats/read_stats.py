@@ -0,0 +1,360 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, exists, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(root)
+sys.path.append(join(dirname(root), "TheKickIsBAD"))
+
+# Standard imports
+from collections.abc import Mapping
+import hashlib
+import json
+import numpy as np
+import os
+import the_kick_is_bad
+from the_kick_is_bad import utils
+
+
+# Caches written in an older layout are rebuilt
+cache_version = 2
+
+# Codes for the type of each cached number, for paths that mix them
+value_type_codes = {"float": 0, "int": 1, "bool": 2}
+value_type_names = {code: name for name, code in value_type_codes.items()}
+
+# Hashes of source files by filename, with the modification time and size they were taken at
+source_hashes = {}
+
+
+def read_stats(year, week, write=True):
+
+    # Check if the week is 'bowl' week
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    week, _ = utils.check_week(week, num_weeks)
+
+    # Without a source file there is nothing to key the cache on
+    source_filename = get_source_filename(year, week)
+    if not exists(source_filename):
+        return the_kick_is_bad.read_stats(year, week)
+
+    source_hash = get_source_hash(source_filename)
+    cache_path = get_cache_path(year, week)
+
+    # Use the cache only if it was built from the same source file
+    manifest_filename = f"{cache_path}/manifest.json"
+    if exists(manifest_filename):
+        with open(manifest_filename) as file:
+            manifest = json.load(file)
+        if manifest.get("version") == cache_version and manifest["source hash"] == source_hash:
+            return load_stats_cache(cache_path, manifest)
+
+    stats = the_kick_is_bad.read_stats(year, week)
+    if write:
+        write_stats_cache(stats, cache_path, source_hash)
+
+    return stats
+
+def get_source_filename(year, week):
+
+    # Stats files as laid out in TheKickIsBAD
+    kick_is_bad_path = dirname(realpath(the_kick_is_bad.__file__))
+
+    return f"{kick_is_bad_path}/stats/{year}/stats-{year}-{week:02}.json"
+
+def get_cache_path(year, week):
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/cache/{year}/stats-{year}-{week:02}"
+
+def get_file_hash(filename):
+
+    with open(filename, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def get_source_hash(filename):
+
+    # A file is hashed again only once its modification time or size changes, so repeated calls read it once
+    status = os.stat(filename)
+    signature = (status.st_mtime_ns, status.st_size)
+    if filename not in source_hashes or source_hashes[filename][0] != signature:
+        source_hashes[filename] = (signature, get_file_hash(filename))
+
+    return source_hashes[filename][1]
+
+def flatten_stats(value, path, leaves):
+
+    # Empty dicts are kept as leaves so their keys still exist when read back
+    if isinstance(value, dict) and value:
+        for key in value:
+            flatten_stats(value[key], path + [key], leaves)
+    else:
+        leaves[tuple(path)] = value
+
+def get_leaf_kind(value):
+
+    # Numbers and lists of numbers go in the binary values, everything else stays as JSON
+    if isinstance(value, (bool, int, float)):
+        return "scalar"
+    if isinstance(value, list):
+        if all(isinstance(item, (bool, int, float)) for item in value):
+            return "list"
+        if all(isinstance(item, str) for item in value):
+            return "strings"
+    return "json"
+
+def get_value_type(value):
+
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    return "float"
+
+def get_leaf_dtype(values):
+
+    # Paths with only empty lists hold no values, so any dtype reads back the same
+    # Paths mixing types read each value back by its own type
+    value_types = set(get_value_type(value) for value in values)
+    if not value_types:
+        return "float"
+    if len(value_types) == 1:
+        return value_types.pop()
+    return "mixed"
+def write_stats_cache(stats, cache_path, source_hash):
+
+    teams = list(stats)
+
+    # Collect every leaf path used by any team
+    team_leaves = []
+    paths = {}
+    for team in teams:
+        leaves = {}
+        flatten_stats(stats[team], [], leaves)
+        team_leaves.append(leaves)
+        for path in leaves:
+            paths.setdefault(path, [])
+            paths[path].append(leaves[path])
+
+    # Pick one kind and dtype per path across all teams
+    path_list = list(paths)
+    kinds = []
+    dtypes = []
+    for path in path_list:
+        path_kinds = set(get_leaf_kind(value) for value in paths[path])
+        non_empty_kinds = set(get_leaf_kind(value) for value in paths[path] if value != [])
+        if len(path_kinds) == 1:
+            kind = path_kinds.pop()
+        elif len(non_empty_kinds) == 1 and non_empty_kinds <= {"list", "strings"}:
+            kind = non_empty_kinds.pop()
+        else:
+            kind = "json"
+        kinds.append(kind)
+        flat_values = []
+        if kind == "scalar":
+            flat_values = paths[path]
+        elif kind == "list":
+            for value in paths[path]:
+                flat_values += value
+        dtypes.append(get_leaf_dtype(flat_values))
+
+    # Pack the numbers into one array, with an (offset, length) segment per path and team
+    # A length of -1 marks a scalar and an offset of -1 marks a missing leaf
+    strings = []
+    string_to_index = {}
+    values = []
+    segments = np.full((len(path_list), len(teams), 2), -1, dtype=np.int64)
+    json_leaves = {}
+    for p in range(len(path_list)):
+        path = path_list[p]
+        for t in range(len(teams)):
+            if path not in team_leaves[t]:
+                continue
+            value = team_leaves[t][path]
+            if kinds[p] == "scalar":
+                segments[p, t] = [len(values), -1]
+                values.append(value)
+            elif kinds[p] == "list":
+                segments[p, t] = [len(values), len(value)]
+                values += value
+            elif kinds[p] == "strings":
+                segments[p, t] = [len(values), len(value)]
+                for item in value:
+                    if item not in string_to_index:
+                        string_to_index[item] = len(strings)
+                        strings.append(item)
+                    values.append(string_to_index[item])
+            else:
+                json_leaves.setdefault(teams[t], {})[json.dumps(list(path))] = value
+
+    value_types = [value_type_codes[get_value_type(value)] for value in values]
+
+    os.makedirs(cache_path, exist_ok=True)
+    np.save(f"{cache_path}/values.npy", np.array(values, dtype=np.float64))
+    np.save(f"{cache_path}/value_types.npy", np.array(value_types, dtype=np.int8))
+    np.save(f"{cache_path}/segments.npy", segments)
+
+    # The manifest is written last so a partly written cache is never used
+    manifest = {
+        "version": cache_version,
+        "source hash": source_hash,
+        "teams": teams,
+        "paths": [list(path) for path in path_list],
+        "kinds": kinds,
+        "dtypes": dtypes,
+        "strings": strings,
+        "json leaves": json_leaves
+    }
+    utils.write_json(manifest, f"{cache_path}/manifest.json")
+
+def load_stats_cache(cache_path, manifest):
+
+    values = np.load(f"{cache_path}/values.npy", mmap_mode="r")
+    value_types = np.load(f"{cache_path}/value_types.npy", mmap_mode="r")
+    segments = np.load(f"{cache_path}/segments.npy", mmap_mode="r")
+
+    return CachedStats(values, value_types, segments, manifest)
+
+
+class CachedStats(Mapping):
+
+    # Read only view of a stats file that builds each leaf only when it is accessed
+    # Leaves come back as the same Python types the stats file holds, so it stands in for read_stats
+
+    def __init__(self, values, value_types, segments, manifest):
+        self.values = values
+        self.value_types = value_types
+        self.segments = segments
+        self.manifest = manifest
+        self.teams = manifest["teams"]
+        self.team_to_index = {team: t for t, team in enumerate(self.teams)}
+
+        # Index the leaf paths by prefix for the nested lookups
+        self.leaf_indexes = {}
+        self.children = {}
+        for p in range(len(manifest["paths"])):
+            path = tuple(manifest["paths"][p])
+            self.leaf_indexes[path] = p
+            for i in range(len(path)):
+                self.children.setdefault(path[:i], [])
+                if path[i] not in self.children[path[:i]]:
+                    self.children[path[:i]].append(path[i])
+
+    def __getitem__(self, team):
+        if team not in self.team_to_index:
+            raise KeyError(team)
+        return CachedStatsNode(self, self.team_to_index[team], ())
+
+    def __iter__(self):
+        return iter(self.teams)
+
+    def __len__(self):
+        return len(self.teams)
+
+    def get_node_keys(self, t, prefix):
+        return [key for key in self.children.get(prefix, []) if self.has_path(t, prefix + (key,))]
+
+    def has_leaf(self, t, path):
+        if path not in self.leaf_indexes:
+            return False
+        p = self.leaf_indexes[path]
+        if self.manifest["kinds"][p] == "json":
+            return json.dumps(list(path)) in self.manifest["json leaves"].get(self.teams[t], {})
+        return self.segments[p, t, 0] >= 0
+
+    def has_path(self, t, path):
+        # A path can be an empty dict leaf for one team and a nested dict for another
+        if self.has_leaf(t, path):
+            return True
+        return any(self.has_path(t, path + (key,)) for key in self.children.get(path, []))
+
+    def convert_values(self, values, value_types, dtype):
+        converted = []
+        for i in range(len(values)):
+            value_dtype = dtype
+            if dtype == "mixed":
+                value_dtype = value_type_names[int(value_types[i])]
+            if value_dtype == "bool":
+                converted.append(bool(values[i]))
+            elif value_dtype == "int":
+                converted.append(int(values[i]))
+            else:
+                converted.append(float(values[i]))
+        return converted
+
+    def get_leaf(self, t, path):
+        p = self.leaf_indexes[path]
+        kind = self.manifest["kinds"][p]
+        dtype = self.manifest["dtypes"][p]
+        if kind == "json":
+            return self.manifest["json leaves"][self.teams[t]][json.dumps(list(path))]
+
+        offset, length = self.segments[p, t]
+        if offset < 0:
+            raise KeyError(path[-1])
+        if kind == "scalar":
+            return self.convert_values(self.values[offset:offset + 1], self.value_types[offset:offset + 1], dtype)[0]
+        if kind == "strings":
+            return [self.manifest["strings"][int(i)] for i in self.values[offset:offset + length]]
+
+        # Numeric lists are copied out of the memory map as lists, like the stats file
+        segment = self.values[offset:offset + length]
+        if dtype == "mixed":
+            return self.convert_values(segment, self.value_types[offset:offset + length], dtype)
+        if dtype == "bool":
+            return segment.astype(bool).tolist()
+        if dtype == "int":
+            return segment.astype(np.int64).tolist()
+        return segment.tolist()
+
+
+class CachedStatsNode(Mapping):
+
+    def __init__(self, cache, t, prefix):
+        self.cache = cache
+        self.t = t
+        self.prefix = prefix
+
+    def __getitem__(self, key):
+        path = self.prefix + (key,)
+        if self.cache.has_leaf(self.t, path):
+            return self.cache.get_leaf(self.t, path)
+        if path in self.cache.children and self.cache.has_path(self.t, path):
+            return CachedStatsNode(self.cache, self.t, path)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.cache.get_node_keys(self.t, self.prefix))
+
+    def __len__(self):
+        return len(self.cache.get_node_keys(self.t, self.prefix))
+
+
+if __name__ == "__main__":
+    year = int(sys.argv[1])
+    week = sys.argv[2]
+    if week != "bowl":
+        week = int(week)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    source_filename = get_source_filename(year, utils.check_week(week, num_weeks)[0])
+    if not exists(source_filename):
+        print(f"No stats file at {source_filename}, reading without the stats cache", file=sys.stderr)
+    stats = read_stats(year, week)
+    print(f"Read stats for {len(stats)} teams")
@@ -0,0 +1,96 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import numpy as np
+import pytest
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from models.bootstrap_strengths import bootstrap_replicates, replicate_block_size
+
+
+def create_season_arrays(num_teams=10, seed=0):
+
+    # Every team plays every other team once, with edges grouped by team
+    rng = np.random.default_rng(seed)
+    team = []
+    opponent = []
+    for t in range(num_teams):
+        for o in range(num_teams):
+            if o != t:
+                team.append(t)
+                opponent.append(o)
+    team = np.array(team, dtype=int)
+    opponent = np.array(opponent, dtype=int)
+    num_games = len(team)
+
+    season_arrays = {
+        "team": team,
+        "opponent": opponent,
+        "points margin": rng.normal(0, 14, num_games),
+        "rushing yards margin": rng.normal(0, 80, num_games),
+        "home field correction": rng.choice([-1.0, 1.0], num_games),
+        "games played": np.full(num_teams, num_teams - 1),
+        "prior points margin": np.zeros(num_teams),
+        "prior rushing yards margin": np.zeros(num_teams),
+        "prior home field correction": np.zeros(num_teams),
+        "prior average opponent strength": np.zeros(num_teams)
+    }
+
+    return season_arrays
+
+def create_blocks(num_replicates, seed=0):
+
+    block_sizes = [replicate_block_size] * (num_replicates // replicate_block_size)
+    if num_replicates % replicate_block_size:
+        block_sizes.append(num_replicates % replicate_block_size)
+
+    return list(zip(np.random.SeedSequence(seed).spawn(len(block_sizes)), block_sizes))
+
+def test_compact_matches_full_on_the_same_resamples():
+
+    season_arrays = create_season_arrays()
+    blocks = create_blocks(100)
+
+    full = bootstrap_replicates(season_arrays, blocks, np.float64)
+    compact = bootstrap_replicates(season_arrays, blocks, np.float32)
+
+    assert full.shape == (100, 10)
+    assert compact.dtype == np.float32
+    np.testing.assert_allclose(compact, full, rtol=1e-4, atol=1e-3)
+
+def test_replicates_do_not_depend_on_chunking():
+
+    season_arrays = create_season_arrays()
+    blocks = create_blocks(3 * replicate_block_size)
+
+    together = bootstrap_replicates(season_arrays, blocks)
+    chunked = np.concatenate([bootstrap_replicates(season_arrays, [block]) for block in blocks])
+
+    np.testing.assert_array_equal(chunked, together)
+
+def test_replicates_depend_on_the_seed():
+
+    season_arrays = create_season_arrays()
+
+    first = bootstrap_replicates(season_arrays, create_blocks(16, seed=0))
+    again = bootstrap_replicates(season_arrays, create_blocks(16, seed=0))
+    other = bootstrap_replicates(season_arrays, create_blocks(16, seed=1))
+
+    np.testing.assert_array_equal(first, again)
+    assert not np.array_equal(first, other)
@@ -0,0 +1,83 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import os
+import pytest
+import types
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from checkpoints import checkpoint
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_path(tmp_path, monkeypatch):
+
+    # Keep the checkpoints out of the package
+    monkeypatch.setattr(checkpoint, "utils", types.SimpleNamespace(get_abs_path=lambda filename: str(tmp_path)))
+
+    return tmp_path
+
+def test_new_checkpoint_is_empty():
+
+    state = checkpoint.load_checkpoint("backtest", {"years": [2020, 2021]})
+
+    assert state["completed"] == []
+    assert state["state"] is None
+    assert not checkpoint.is_partition_completed(state, [2020])
+
+def test_completed_partitions_are_resumed():
+
+    parameters = {"years": (2020, 2021), "configuration": {"prior cutoff week": 9}}
+    state = checkpoint.load_checkpoint("backtest", parameters)
+    checkpoint.complete_partition(state, [2020], {"counts": [3, 4]})
+
+    # Tuples come back as lists, so the parameters still match
+    resumed = checkpoint.load_checkpoint("backtest", parameters)
+
+    assert checkpoint.is_partition_completed(resumed, [2020])
+    assert not checkpoint.is_partition_completed(resumed, [2021])
+    assert resumed["state"] == {"counts": [3, 4]}
+
+def test_other_parameters_start_over():
+
+    state = checkpoint.load_checkpoint("backtest", {"years": [2020]})
+    checkpoint.complete_partition(state, [2020])
+
+    assert checkpoint.load_checkpoint("backtest", {"years": [2021]})["completed"] == []
+    assert checkpoint.load_checkpoint("evaluate", {"years": [2020]})["completed"] == []
+
+def test_other_versions_start_over(monkeypatch):
+
+    state = checkpoint.load_checkpoint("backtest", {"years": [2020]})
+    checkpoint.complete_partition(state, [2020])
+
+    monkeypatch.setattr(checkpoint, "checkpoint_version", checkpoint.checkpoint_version + 1)
+
+    assert checkpoint.load_checkpoint("backtest", {"years": [2020]})["completed"] == []
+
+def test_remove_checkpoint(checkpoint_path):
+
+    state = checkpoint.load_checkpoint("backtest", {"years": [2020]})
+    checkpoint.complete_partition(state, [2020])
+    assert len(os.listdir(checkpoint_path)) == 1
+
+    checkpoint.remove_checkpoint(state)
+
+    assert os.listdir(checkpoint_path) == []
+    assert checkpoint.load_checkpoint("backtest", {"years": [2020]})["completed"] == []
@@ -0,0 +1,113 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import numpy as np
+import pytest
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from rankings.conference_standings import calculate_standings, create_conference_arrays, get_championship_participants, get_current_outcomes, sort_standings
+
+
+def get_standings_order(teams, games, strengths):
+
+    conference_arrays = create_conference_arrays("East", games, teams, strengths)
+    home_won, played = get_current_outcomes(conference_arrays)
+    standings = calculate_standings(conference_arrays, home_won, played)
+    order = sort_standings(conference_arrays, standings)
+
+    return [conference_arrays["teams"][i] for i in order[:, 0]], conference_arrays, standings
+
+def test_head_to_head_breaks_a_two_team_tie():
+
+    teams = {team: {"conference": "East", "division": "East"} for team in ["Alpha", "Beta", "Gamma", "Delta"]}
+
+    # Alpha and Beta finish 2-1 and Alpha won their game, though Beta is the stronger team
+    # Gamma and Delta finish 1-2 and Gamma won their game
+    games = [
+        ("Alpha", "Beta", True, False),
+        ("Gamma", "Alpha", True, True),
+        ("Alpha", "Delta", True, True),
+        ("Gamma", "Beta", True, True),
+        ("Delta", "Beta", True, True),
+        ("Delta", "Gamma", True, True)
+    ]
+    strengths = {"Alpha": 1.0, "Beta": 10.0, "Gamma": 0.0, "Delta": 5.0}
+
+    order, conference_arrays, standings = get_standings_order(teams, games, strengths)
+
+    assert order == ["Alpha", "Beta", "Gamma", "Delta"]
+    np.testing.assert_array_equal(standings["wins"][:, 0], [2, 2, 1, 1])
+
+    # A conference without divisions sends its top two teams
+    participants = get_championship_participants(conference_arrays, standings)
+    assert [conference_arrays["teams"][i] for i in participants[:, 0]] == ["Alpha", "Beta"]
+
+def test_strength_breaks_a_tie_left_by_every_other_tiebreaker():
+
+    teams = {team: {"conference": "East", "division": "East"} for team in ["Alpha", "Beta", "Gamma"]}
+
+    # Every team beats one and loses to one
+    games = [
+        ("Alpha", "Beta", True, False),
+        ("Beta", "Gamma", True, False),
+        ("Gamma", "Alpha", True, False)
+    ]
+    strengths = {"Alpha": 2.0, "Beta": 3.0, "Gamma": 1.0}
+
+    order, _, _ = get_standings_order(teams, games, strengths)
+
+    assert order == ["Beta", "Alpha", "Gamma"]
+
+def test_division_leaders_meet_in_the_championship():
+
+    teams = {
+        "Alpha": {"conference": "East", "division": "North"},
+        "Beta": {"conference": "East", "division": "North"},
+        "Gamma": {"conference": "East", "division": "South"},
+        "Delta": {"conference": "East", "division": "South"}
+    }
+
+    # Beta has the better record, but Gamma leads the South
+    games = [
+        ("Alpha", "Beta", True, True),
+        ("Gamma", "Beta", True, True),
+        ("Delta", "Gamma", True, True),
+        ("Alpha", "Delta", True, True)
+    ]
+    strengths = {team: 0.0 for team in teams}
+
+    order, conference_arrays, standings = get_standings_order(teams, games, strengths)
+    participants = get_championship_participants(conference_arrays, standings)
+
+    assert order == ["Beta", "Alpha", "Gamma", "Delta"]
+    assert sorted(conference_arrays["teams"][i] for i in participants[:, 0]) == ["Beta", "Gamma"]
+
+def test_unplayed_games_do_not_count():
+
+    teams = {team: {"conference": "East", "division": "East"} for team in ["Alpha", "Beta"]}
+    games = [
+        ("Alpha", "Beta", True, False),
+        ("Beta", "Alpha", False, False)
+    ]
+    strengths = {"Alpha": 0.0, "Beta": 0.0}
+
+    _, _, standings = get_standings_order(teams, games, strengths)
+
+    np.testing.assert_array_equal(standings["wins"][:, 0], [1, 0])
+    np.testing.assert_array_equal(standings["losses"][:, 0], [0, 1])
@@ -0,0 +1,107 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import itertools
+import numpy as np
+import pytest
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from rankings.minimum_violation import calculate_violations, get_game_graph, refine_order, refine_rankings
+
+
+def create_schedule(results):
+
+    # Each (winner, loser, margin) is stored from both teams' side, like the schedule index
+    schedule = {"team": [], "opponent": [], "points gained": [], "points allowed": []}
+    for winner, loser, margin in results:
+        for team, opponent, points, opponent_points in [(winner, loser, 20 + margin, 20), (loser, winner, 20, 20 + margin)]:
+            schedule["team"].append(team)
+            schedule["opponent"].append(opponent)
+            schedule["points gained"].append(points)
+            schedule["points allowed"].append(opponent_points)
+
+    return {field: np.array(values) for field, values in schedule.items()}
+
+def get_weighted_violations(order, games):
+
+    positions = np.empty(len(order), dtype=int)
+    positions[order] = np.arange(len(order))
+
+    return calculate_violations(positions, games)[0]
+
+def test_consistent_results_are_fully_resolved():
+
+    # Team 0 beat 1, 1 beat 2 and so on, starting from a model order with a few of them out of place
+    results = [(t, t + 1, 7) for t in range(5)] + [(0, 3, 10)]
+    games = get_game_graph(create_schedule(results), 6)
+
+    refinement = refine_order(np.array([1, 0, 3, 2, 5, 4]), games)
+
+    assert refinement["order"].tolist() == [0, 1, 2, 3, 4, 5]
+    assert refinement["initial violations"] == 3
+    assert refinement["final violations"] == 0
+    assert refinement["final accuracy"] == 1
+
+def test_refinement_never_adds_violations():
+
+    # The search is local, so from a poor start it may stop short of the best order but never does worse
+    results = [(t, t + 1, 7) for t in range(5)] + [(0, 3, 10)]
+    games = get_game_graph(create_schedule(results), 6)
+
+    refinement = refine_order(np.arange(6)[::-1].copy(), games)
+
+    assert sorted(refinement["order"].tolist()) == list(range(6))
+    assert refinement["final weighted violations"] < refinement["initial weighted violations"]
+
+def test_refinement_reaches_the_minimum_for_a_small_schedule():
+
+    # A cycle means some game is always broken, the cheapest to break is the one point win
+    results = [(0, 1, 14), (1, 2, 21), (2, 0, 1), (3, 2, 3), (0, 3, 7)]
+    games = get_game_graph(create_schedule(results), 4)
+
+    refinement = refine_order(np.array([3, 2, 1, 0]), games)
+    best_cost = min(get_weighted_violations(np.array(order), games) for order in itertools.permutations(range(4)))
+
+    assert refinement["final weighted violations"] == pytest.approx(best_cost)
+    assert refinement["final weighted violations"] <= refinement["initial weighted violations"]
+    assert get_weighted_violations(refinement["order"], games) == pytest.approx(refinement["final weighted violations"])
+
+def test_blowouts_weigh_more_than_close_games():
+
+    games = get_game_graph(create_schedule([(0, 1, 1), (1, 0, 40)]), 2)
+
+    # The teams split their games, so the blowout winner goes first
+    refinement = refine_order(np.array([0, 1]), games)
+
+    assert refinement["order"].tolist() == [1, 0]
+
+def test_refine_rankings_keeps_the_model_ranks():
+
+    teams = ["Alpha", "Beta", "Gamma"]
+    team_rankings = {
+        "Alpha": {"rank": 1, "team score": 30.0},
+        "Beta": {"rank": 2, "team score": 20.0},
+        "Gamma": {"rank": 3, "team score": 10.0}
+    }
+
+    # Gamma beat both teams ranked above it
+    refinement = refine_rankings(team_rankings, create_schedule([(2, 0, 10), (2, 1, 10), (0, 1, 10)]), teams)
+
+    assert [refinement["rankings"][team]["refined rank"] for team in teams] == [2, 3, 1]
+    assert [refinement["rankings"][team]["rank"] for team in teams] == [1, 2, 3]
@@ -0,0 +1,107 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import json
+import pytest
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from stats.read_stats import cache_version, load_stats_cache, write_stats_cache
+
+
+def to_dict(value):
+
+    # Copy the lazy cached nodes out into plain dicts
+    if hasattr(value, "keys"):
+        return {key: to_dict(value[key]) for key in value}
+    return value
+
+def write_and_load(stats, cache_path):
+
+    write_stats_cache(stats, str(cache_path), "source hash")
+    with open(f"{cache_path}/manifest.json") as file:
+        manifest = json.load(file)
+
+    return load_stats_cache(str(cache_path), manifest), manifest
+
+def test_stats_cache_round_trip(tmp_path):
+
+    stats = {
+        "Alpha": {
+            "schedule": {"opponents": ["Beta", "Gamma"], "home": [True, False]},
+            "points": {"total": {"gained": [21, 14], "allowed": [7, 28]}},
+            "rushing": {"average": 4.5, "games": 2},
+            "conference": "East"
+        },
+        "Beta": {
+            "schedule": {"opponents": ["Alpha"], "home": [False]},
+            "points": {"total": {"gained": [7], "allowed": [21]}},
+            "rushing": {"average": 3.0, "games": 1},
+            "conference": "West"
+        }
+    }
+
+    cached_stats, manifest = write_and_load(stats, tmp_path)
+
+    assert manifest["version"] == cache_version
+    assert manifest["source hash"] == "source hash"
+    assert to_dict(cached_stats) == stats
+    assert type(cached_stats["Alpha"]["points"]["total"]["gained"][0]) is int
+    assert type(cached_stats["Alpha"]["rushing"]["average"]) is float
+    assert type(cached_stats["Alpha"]["schedule"]["home"][0]) is bool
+
+def test_stats_cache_keeps_empty_dicts(tmp_path):
+
+    # One team's empty dict sits where another team has nested values
+    stats = {
+        "Alpha": {"bowls": {}, "rushing": {"yards": [100]}},
+        "Beta": {"bowls": {"name": "Rose"}, "rushing": {}}
+    }
+
+    cached_stats, _ = write_and_load(stats, tmp_path)
+
+    assert dict(cached_stats["Alpha"]["bowls"]) == {}
+    assert dict(cached_stats["Beta"]["rushing"]) == {}
+    assert to_dict(cached_stats) == stats
+
+def test_stats_cache_keeps_mixed_number_types(tmp_path):
+
+    stats = {
+        "Alpha": {"values": [1, 2.5, True], "value": 3},
+        "Beta": {"values": [4], "value": 4.5}
+    }
+
+    cached_stats, _ = write_and_load(stats, tmp_path)
+
+    assert [type(value) for value in cached_stats["Alpha"]["values"]] == [int, float, bool]
+    assert type(cached_stats["Alpha"]["value"]) is int
+    assert type(cached_stats["Beta"]["value"]) is float
+    assert to_dict(cached_stats) == stats
+
+def test_stats_cache_missing_leaf_raises_key_error(tmp_path):
+
+    stats = {
+        "Alpha": {"rushing": {"yards": [100]}},
+        "Beta": {"passing": {"yards": [200]}}
+    }
+
+    cached_stats, _ = write_and_load(stats, tmp_path)
+
+    assert "rushing" not in cached_stats["Beta"]
+    with pytest.raises(KeyError):
+        cached_stats["Beta"]["rushing"]
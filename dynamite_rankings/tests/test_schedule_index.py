@@ -0,0 +1,137 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import copy
+import numpy as np
+import pytest
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from models.schedule_index import create_schedule_index, get_schedule_through_week, get_team_totals, is_schedule_index_current, update_schedule_index
+
+
+teams = ["Alpha", "Beta", "Gamma", "Delta"]
+
+# Each week's games as (away, home, away points, home points, away rushing yards, home rushing yards)
+weekly_games = [
+    [("Alpha", "Beta", 21, 14, 120, 90), ("Gamma", "Delta", 10, 17, 80, 150)],
+    [("Beta", "Gamma", 28, 24, 200, 60), ("Delta", "Alpha", 3, 35, 40, 210)],
+    [("Alpha", "Gamma", 14, 20, 100, 130), ("Beta", "Delta", 31, 30, 170, 110)]
+]
+
+
+def create_stats(num_weeks):
+
+    # Cumulative stats through the given week, in the layout of the stats files
+    stats = {}
+    for team in teams:
+        stats[team] = {
+            "schedule": {"opponents": [], "home": [], "neutral": []},
+            "points": {"total": {"gained": [], "allowed": []}},
+            "rushing": {"yards": {"gained": [], "allowed": []}}
+        }
+    for games in weekly_games[:num_weeks]:
+        for away, home, away_points, home_points, away_yards, home_yards in games:
+            for team, opponent, is_home, points, opponent_points, yards, opponent_yards in [(away, home, False, away_points, home_points, away_yards, home_yards),
+                                                                                           (home, away, True, home_points, away_points, home_yards, away_yards)]:
+                stats[team]["schedule"]["opponents"].append(opponent)
+                stats[team]["schedule"]["home"].append(is_home)
+                stats[team]["schedule"]["neutral"].append(False)
+                stats[team]["points"]["total"]["gained"].append(points)
+                stats[team]["points"]["total"]["allowed"].append(opponent_points)
+                stats[team]["rushing"]["yards"]["gained"].append(yards)
+                stats[team]["rushing"]["yards"]["allowed"].append(opponent_yards)
+
+    return stats
+
+def build_index(weeks):
+
+    schedule_index = create_schedule_index(teams)
+    for week in weeks:
+        schedule_index = update_schedule_index(schedule_index, week, create_stats(week), teams, f"hash {week}")
+
+    return schedule_index
+
+def assert_same_schedule(schedule, expected):
+
+    for field in ["team", "opponent", "home", "points gained", "points allowed", "rushing yards gained", "rushing yards allowed"]:
+        np.testing.assert_array_equal(schedule[field], expected[field])
+    for field, totals in get_team_totals(expected).items():
+        np.testing.assert_array_equal(get_team_totals(schedule)[field], totals)
+
+def test_incremental_index_matches_fresh_build():
+
+    incremental = build_index([1, 2, 3])
+    fresh = update_schedule_index(create_schedule_index(teams), 3, create_stats(3), teams, "hash 3")
+
+    assert_same_schedule(get_schedule_through_week(incremental, 3), fresh)
+
+def test_team_totals():
+
+    schedule = get_schedule_through_week(build_index([1, 2, 3]), 3)
+    totals = get_team_totals(schedule)
+
+    np.testing.assert_array_equal(totals["games played"], [3, 3, 3, 3])
+    np.testing.assert_array_equal(totals["points margin"], [7 + 32 - 6, -7 + 4 + 1, -7 - 4 + 6, 7 - 32 - 1])
+    np.testing.assert_array_equal(totals["home field correction"], [1 - 1 + 1, -1 + 1 + 1, 1 - 1 - 1, -1 + 1 - 1])
+
+def test_schedule_through_earlier_week():
+
+    schedule_index = build_index([1, 2, 3])
+
+    week_one = get_schedule_through_week(schedule_index, 1)
+
+    assert len(week_one["team"]) == 4
+    np.testing.assert_array_equal(get_team_totals(week_one)["games played"], [1, 1, 1, 1])
+    assert week_one["stats hashes"].tolist() == ["", "hash 1"]
+
+def test_index_is_current_only_for_the_same_stats_file():
+
+    schedule_index = build_index([1, 2])
+
+    assert is_schedule_index_current(schedule_index, 2, create_stats(2), teams, "hash 2")
+    assert not is_schedule_index_current(schedule_index, 2, create_stats(2), teams, "changed hash")
+    assert not is_schedule_index_current(schedule_index, 3, create_stats(3), teams, "hash 3")
+
+def test_corrected_score_restarts_the_index():
+
+    schedule_index = build_index([1, 2])
+
+    # A week one score is corrected in the week three stats
+    stats = create_stats(3)
+    corrected_stats = copy.deepcopy(stats)
+    corrected_stats["Alpha"]["points"]["total"]["gained"][0] = 24
+    corrected_stats["Beta"]["points"]["total"]["allowed"][0] = 24
+
+    updated = update_schedule_index(schedule_index, 3, corrected_stats, teams, "hash 3")
+    fresh = update_schedule_index(create_schedule_index(teams), 3, corrected_stats, teams, "hash 3")
+
+    assert_same_schedule(get_schedule_through_week(updated, 3), fresh)
+    assert get_team_totals(get_schedule_through_week(updated, 3))["points margin"][0] == 10 + 32 - 6
+
+def test_skipped_weeks_are_rebuilt_when_asked_for():
+
+    # Weeks two and three are appended together at week three
+    schedule_index = build_index([1, 3])
+
+    assert not is_schedule_index_current(schedule_index, 2, create_stats(2), teams, "hash 2")
+
+    updated = update_schedule_index(schedule_index, 2, create_stats(2), teams, "hash 2")
+    fresh = update_schedule_index(create_schedule_index(teams), 2, create_stats(2), teams, "hash 2")
+
+    assert_same_schedule(get_schedule_through_week(updated, 2), fresh)
@@ -0,0 +1,110 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import pytest
+import types
+
+pytest.importorskip("the_kick_is_bad")
+
+# DynamiteRankings imports
+from archives import season_archive
+
+
+@pytest.fixture
+def package_path(tmp_path, monkeypatch):
+
+    # Point the archives and output directories at a temporary package
+    archive_path = tmp_path / "archives"
+    archive_path.mkdir()
+    monkeypatch.setattr(season_archive, "utils", types.SimpleNamespace(get_abs_path=lambda filename: str(archive_path)))
+    yield tmp_path
+    for year in list(season_archive.season_archives):
+        season_archive.close_season_archive(year)
+
+def write_output(package_path, source, contents):
+
+    filename = package_path / source
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_text(contents)
+
+def read_output(source):
+
+    with season_archive.open_output_file(source) as file:
+        return file.read()
+
+def create_seasons(package_path):
+
+    write_output(package_path, "models/2020/model-2020-01.csv", "Team,Strength\nAlpha,1.5\n")
+    write_output(package_path, "rankings/2020/team_rankings-2020-01.csv", "Team,Rank\nAlpha,1\n")
+    write_output(package_path, "predictions/2020/results-2020-01.txt", "Outcome\nRIGHT\n")
+    write_output(package_path, "models/2020/inverse-2020-01.npy", "not archived")
+
+    # A later season closes 2020
+    write_output(package_path, "rankings/2021/team_rankings-2021-01.csv", "Team,Rank\nBeta,1\n")
+
+def test_open_season_is_not_archived(package_path):
+
+    create_seasons(package_path)
+
+    assert season_archive.is_season_closed(2020)
+    assert not season_archive.is_season_closed(2021)
+    with pytest.raises(ValueError):
+        season_archive.archive_season(2021)
+
+def test_archived_files_read_back_the_same(package_path):
+
+    create_seasons(package_path)
+
+    num_files = season_archive.archive_season(2020, remove_files=True)
+
+    assert num_files == 3
+    assert season_archive.is_season_archived(2020)
+    assert not (package_path / "models/2020/model-2020-01.csv").exists()
+    assert (package_path / "models/2020/inverse-2020-01.npy").exists()
+    assert read_output("models/2020/model-2020-01.csv") == "Team,Strength\nAlpha,1.5\n"
+    assert season_archive.output_file_exists("predictions/2020/results-2020-01.txt")
+    assert season_archive.has_output("results", 2020, 1)
+    assert "rankings/2020/team_rankings-2020-01.csv" in season_archive.find_output_files("rankings", "team_rankings-*.csv")
+
+def test_loose_file_wins_over_the_archived_copy(package_path):
+
+    create_seasons(package_path)
+    season_archive.archive_season(2020, remove_files=True)
+
+    write_output(package_path, "models/2020/model-2020-01.csv", "Team,Strength\nAlpha,2.5\n")
+    assert read_output("models/2020/model-2020-01.csv") == "Team,Strength\nAlpha,2.5\n"
+
+    # Archiving again folds the patch into the archive
+    season_archive.archive_season(2020, remove_files=True)
+    assert read_output("models/2020/model-2020-01.csv") == "Team,Strength\nAlpha,2.5\n"
+    assert read_output("rankings/2020/team_rankings-2020-01.csv") == "Team,Rank\nAlpha,1\n"
+
+def test_extract_season(package_path):
+
+    create_seasons(package_path)
+    season_archive.archive_season(2020, remove_files=True)
+
+    assert season_archive.extract_season(2020) == 3
+    assert (package_path / "rankings/2020/team_rankings-2020-01.csv").read_text() == "Team,Rank\nAlpha,1\n"
+
+def test_missing_output_raises(package_path):
+
+    create_seasons(package_path)
+
+    assert not season_archive.output_file_exists("models/2020/model-2020-02.csv")
+    with pytest.raises(FileNotFoundError):
+        season_archive.open_output_file("models/2020/model-2020-02.csv")
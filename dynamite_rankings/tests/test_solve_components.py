@@ -0,0 +1,70 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Standard imports
+import numpy as np
+
+# DynamiteRankings imports
+from models import solve_components
+from models.solve_components import find_connected_components, solve_by_components
+
+
+def create_block_system(block_sizes, seed=0):
+
+    # Diagonally dominant blocks like I - games_played_normalization, with no games between blocks
+    rng = np.random.default_rng(seed)
+    num_teams = sum(block_sizes)
+    A = np.eye(num_teams)
+    start = 0
+    for size in block_sizes:
+        block = slice(start, start + size)
+        A[block, block] -= rng.random((size, size)) / (2 * size)
+        start += size
+
+    # Shuffle the teams so the components are not contiguous
+    order = rng.permutation(num_teams)
+    A = A[np.ix_(order, order)]
+    B = rng.normal(size=num_teams)
+
+    return A, B
+
+def test_find_connected_components():
+
+    A, _ = create_block_system([3, 5, 1, 4])
+    components = find_connected_components(A)
+
+    assert sorted(len(component) for component in components) == [1, 3, 4, 5]
+    assert sorted(np.concatenate(components).tolist()) == list(range(13))
+
+def test_solve_by_components_matches_dense_solve():
+
+    A, B = create_block_system([3, 5, 1, 4])
+
+    np.testing.assert_allclose(solve_by_components(A, B), np.linalg.solve(A, B), rtol=1e-12, atol=1e-12)
+
+def test_solve_by_components_single_component():
+
+    A, B = create_block_system([8])
+
+    np.testing.assert_allclose(solve_by_components(A, B), np.linalg.solve(A, B), rtol=1e-12, atol=1e-12)
+
+def test_solve_by_components_in_worker_processes(monkeypatch):
+
+    # Make every block large enough to be solved in the process pool
+    monkeypatch.setattr(solve_components, "parallel_block_size", 2)
+    A, B = create_block_system([3, 4, 2])
+
+    np.testing.assert_allclose(solve_by_components(A, B, max_workers=2), np.linalg.solve(A, B), rtol=1e-12, atol=1e-12)
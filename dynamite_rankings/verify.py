@@ -0,0 +1,338 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import dirname, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(join(root, "TheKickIsBAD"))
+
+# Standard imports
+from concurrent.futures import ProcessPoolExecutor
+import the_kick_is_bad
+
+# DynamiteRankings imports
+from archives.season_archive import open_output_file, output_file_exists
+from models.calculate_model import calculate_model, model_configuration
+from models.read_priors import read_priors
+from models.schedule_index import create_schedule_index, get_schedule_through_week, load_schedule_index, update_schedule_index
+from predict import predict_games
+from rank import calculate_conference_rankings, calculate_division_rankings, calculate_team_rankings
+from rankings.read_rankings import read_rankings
+from stats.read_stats import read_stats
+
+
+# Ways of recomputing the outputs, each swaps in a different implementation of one stage
+engines = {
+    # Cached stats, the schedule index file and a solve per connected component, as rank.py runs
+    "production": {"stats": "cached", "schedule": "file", "solver": "components"},
+    # One dense solve of the full system
+    "dense": {"stats": "cached", "schedule": "file", "solver": "dense"},
+    # Stats parsed by TheKickIsBAD without the binary cache
+    "uncached": {"stats": "direct", "schedule": "file", "solver": "components"},
+    # Schedule index kept in memory and grown one week at a time
+    "incremental": {"stats": "cached", "schedule": "incremental", "solver": "components"}
+}
+
+# Committed outputs with the columns to compare and the largest difference allowed in each
+# Values written with one decimal are allowed half of their last digit, None compares text exactly
+outputs = {
+    "model": {
+        "filename": "models/{year}/model-{year}-{week:02}.csv",
+        "key": ["Team"],
+        "columns": [
+            ("Strength", "strength", 1e-6),
+            ("StandardDeviation", "standard deviation", 1e-6),
+            ("PointsMargin", "points margin", 1e-9),
+            ("AverageOpponentStrength", "average opponent strength", 1e-6),
+            ("RushingYardsMargin", "rushing yards margin", 1e-9),
+            ("HomeFieldCorrection", "home field correction", 1e-9),
+            ("GamesPlayed", "games played", 0)
+        ]
+    },
+    "team rankings": {
+        "filename": "rankings/{year}/team_rankings-{year}-{week:02}.csv",
+        "key": ["Team"],
+        "columns": [
+            ("Rank", "rank", 0),
+            ("PrevRank", "previous rank", 0),
+            ("DeltaRank", "delta rank", 0),
+            ("TeamScore", "team score", 0.05),
+            ("Strength", "strength", 0.05),
+            ("StandardDeviation", "standard deviation", 0.05)
+        ]
+    },
+    "conference rankings": {
+        "filename": "rankings/{year}/conference_rankings-{year}-{week:02}.csv",
+        "key": ["Conference"],
+        "columns": [
+            ("Score", "score", 0.05)
+        ]
+    },
+    "division rankings": {
+        "filename": "rankings/{year}/division_rankings-{year}-{week:02}.csv",
+        "key": ["Division"],
+        "columns": [
+            ("Score", "score", 0.05)
+        ]
+    },
+    "predictions": {
+        "filename": "predictions/{year}/predictions-{year}-{week:02}.csv",
+        "key": ["AwayTeam", "HomeTeam"],
+        "columns": [
+            ("PredictedWinner", "predicted winner", None),
+            ("PredictedMoV", "predicted margin of victory", 0.05),
+            ("GameInterest", "game interest", 0.05)
+        ]
+    }
+}
+
+# Allowance for the rounding of the tolerances themselves
+rounding_slack = 1e-9
+
+
+def verify(engine, start_year, end_year, start_week=0, end_week=None, max_workers=None):
+
+    # Seasons run in parallel, weeks of one season run in order so they can share the schedule index
+    tasks = [(engine, year, start_week, end_week) for year in range(start_year, end_year + 1)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        season_reports = list(executor.map(verify_season, tasks))
+
+    reports = []
+    for season_report in season_reports:
+        reports += season_report
+
+    return reports
+
+def verify_season(task):
+
+    engine, year, start_week, end_week = task
+    engine_options = engines[engine]
+
+    configuration = dict(model_configuration)
+    configuration["solver"] = engine_options["solver"]
+
+    teams, _ = the_kick_is_bad.read_teams(year)
+    num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+    if end_week is None or end_week > num_weeks + 1:
+        end_week = num_weeks + 1
+
+    # Priors are only read, a missing artifact is calculated without being saved
+    # Weeks that need them are reported as errors if they cannot be calculated
+    inputs = {}
+    if start_week < configuration["prior cutoff week"]:
+        try:
+            inputs["priors"] = read_priors(year, teams, write=False)
+        except (FileNotFoundError, KeyError) as error:
+            inputs["priors"] = error
+
+    schedule_index = create_schedule_index(teams)
+
+    reports = []
+    for week in range(0, end_week + 1):
+
+        # The incremental index has to see every week before the first one checked
+        if week < start_week and engine_options["schedule"] != "incremental":
+            continue
+
+        if week == 0:
+            stats = None
+        elif engine_options["stats"] == "direct":
+            stats = the_kick_is_bad.read_stats(year, week)
+        else:
+            stats = read_stats(year, week, write=False)
+
+        # Verifying only reads, so the stats cache and schedule index files are never written
+        if engine_options["schedule"] == "incremental" and week > 0:
+            schedule_index = update_schedule_index(schedule_index, week, stats, teams)
+            inputs["schedule"] = get_schedule_through_week(schedule_index, week)
+        elif week > 0:
+            inputs["schedule"] = load_schedule_index(year, week, stats, teams, write=False)
+
+        if week < start_week:
+            continue
+
+        print(f"Verifying year {year}, week {week:02} with the {engine} engine...")
+
+        report = {"year": year, "week": week, "outputs": {}}
+        try:
+            if isinstance(inputs.get("priors"), Exception) and week < configuration["prior cutoff week"]:
+                raise inputs["priors"]
+            recomputed = recompute_week(year, week, num_weeks, stats, teams, inputs, configuration)
+        except (FileNotFoundError, KeyError) as error:
+            report["error"] = f"{type(error).__name__}: {error}"
+            reports.append(report)
+            continue
+
+        for name in recomputed:
+            output_week = recomputed[name]["week"]
+            source = outputs[name]["filename"].format(year=year, week=output_week)
+            if output_file_exists(source):
+                report["outputs"][name] = compare_output(name, read_committed_rows(name, source), recomputed[name]["rows"])
+            else:
+                report["outputs"][name] = {"status": "missing"}
+        reports.append(report)
+
+    return reports
+
+def recompute_week(year, week, num_weeks, stats, teams, inputs, configuration):
+
+    model, strengths, standard_deviations = calculate_model(year, week, stats, teams, inputs, configuration)
+
+    if week > 0:
+        prev_rankings = read_rankings(year, week - 1)
+    else:
+        prev_rankings = None
+    team_rankings = calculate_team_rankings(week, stats, teams, strengths, standard_deviations, prev_rankings)
+
+    conference_rankings = calculate_conference_rankings(teams, team_rankings)
+    division_rankings = calculate_division_rankings(teams, team_rankings)
+
+    # Rows keyed the same way as the committed files
+    recomputed = {
+        "model": {"week": week, "rows": {(team,): model[team] for team in model}},
+        "team rankings": {"week": week, "rows": {(team,): team_rankings[team] for team in team_rankings}},
+        "conference rankings": {"week": week, "rows": {(c["conference"],): c for c in conference_rankings}},
+        "division rankings": {"week": week, "rows": {(d["division"],): d for d in division_rankings}}
+    }
+
+    # These rankings predict the next week, as predict.py would after reading them back from the file
+    if week <= num_weeks:
+        try:
+            scores = the_kick_is_bad.read_scores(year, week + 1)
+        except FileNotFoundError:
+            scores = None
+        if scores is not None:
+            written_rankings = {}
+            for team in team_rankings:
+                written_rankings[team] = {
+                    "strength": float(f"{team_rankings[team]['strength']:.1f}"),
+                    "team score": float(f"{team_rankings[team]['team score']:.1f}"),
+                    "standard deviation": float(f"{team_rankings[team]['standard deviation']:.1f}")
+                }
+            predictions = predict_games(week + 1, num_weeks, scores, written_rankings)
+            recomputed["predictions"] = {
+                "week": week + 1,
+                "rows": {(p["away team"], p["home team"]): p for p in predictions}
+            }
+
+    return recomputed
+
+def read_committed_rows(name, source):
+
+    rows = {}
+    with open_output_file(source) as file:
+
+        header = file.readline().strip().split(",")
+
+        line = file.readline().strip()
+        while line:
+            row = dict(zip(header, line.split(",")))
+            key = tuple(row[column] for column in outputs[name]["key"])
+            rows[key] = row
+            line = file.readline().strip()
+
+    return rows
+
+def compare_output(name, committed_rows, recomputed_rows):
+
+    columns = outputs[name]["columns"]
+
+    comparison = {
+        "status": "match",
+        "rows": len(committed_rows),
+        "first difference": None,
+        "max differences": {}
+    }
+    for csv_column, _, tolerance in columns:
+        if tolerance is not None:
+            comparison["max differences"][csv_column] = 0.0
+
+    # Walk the committed file in order so the first difference is the first one in the file
+    for key in committed_rows:
+        if key not in recomputed_rows:
+            record_difference(comparison, key, "row", "present", "missing")
+            continue
+        for csv_column, field, tolerance in columns:
+            committed_value = committed_rows[key][csv_column]
+            recomputed_value = recomputed_rows[key][field]
+            if tolerance is None:
+                if committed_value != str(recomputed_value):
+                    record_difference(comparison, key, csv_column, committed_value, recomputed_value)
+                continue
+            difference = abs(float(committed_value) - float(recomputed_value))
+            comparison["max differences"][csv_column] = max(comparison["max differences"][csv_column], difference)
+            if difference > tolerance + rounding_slack:
+                record_difference(comparison, key, csv_column, committed_value, float(recomputed_value))
+
+    for key in recomputed_rows:
+        if key not in committed_rows:
+            record_difference(comparison, key, "row", "missing", "present")
+
+    return comparison
+
+def record_difference(comparison, key, column, committed_value, recomputed_value):
+
+    comparison["status"] = "differs"
+
+    # Only the first difference is kept, the max differences cover the rest
+    if comparison["first difference"] is None:
+        comparison["first difference"] = {
+            "row": " @ ".join(key),
+            "column": column,
+            "committed": committed_value,
+            "recomputed": recomputed_value
+        }
+
+def print_reports(reports):
+
+    num_checked = 0
+    num_differ = 0
+    for report in reports:
+        if "error" in report:
+            print("{0} week {1:02}: could not recompute, {2}".format(report["year"], report["week"], report["error"]))
+            continue
+        for name in report["outputs"]:
+            comparison = report["outputs"][name]
+            if comparison["status"] == "missing":
+                continue
+            num_checked += 1
+            if comparison["status"] == "differs":
+                num_differ += 1
+                difference = comparison["first difference"]
+                print("{0} week {1:02} {2}: first difference at {3}, {4}: committed {5}, recomputed {6}".format(report["year"],
+                                                                                                              report["week"],
+                                                                                                              name,
+                                                                                                              difference["row"],
+                                                                                                              difference["column"],
+                                                                                                              difference["committed"],
+                                                                                                              difference["recomputed"]))
+
+    print(f"({num_checked - num_differ}/{num_checked}) committed outputs match")
+
+
+if __name__ == "__main__":
+    engine = sys.argv[1]
+    start_year = int(sys.argv[2])
+    end_year = int(sys.argv[3])
+    start_week = 0
+    end_week = None
+    if len(sys.argv) > 5:
+        start_week = int(sys.argv[4])
+        end_week = int(sys.argv[5])
+    reports = verify(engine, start_year, end_year, start_week, end_week)
+    print_reports(reports)
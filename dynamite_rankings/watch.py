@@ -0,0 +1,280 @@
+# DynamiteRankings: An open-source NCAA football ranking and prediction program.
+# Copyright (C) 2019  Bryan VanDuinen and Arthur Rajala
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Add the root package directory to path for importing
+# This is so user does not need to run setup.py or modify PYTHONPATH
+from os.path import basename, dirname, exists, getmtime, join, realpath
+import sys
+root = dirname(dirname(realpath(__file__)))
+sys.path.append(join(root, "TheKickIsBAD"))
+
+# Standard imports
+import glob
+import json
+import re
+import the_kick_is_bad
+import time
+import traceback
+from the_kick_is_bad import utils
+
+# DynamiteRankings imports
+from archives.season_archive import has_output, is_season_closed
+from database.history_database import update_database
+from evaluate import evaluate, has_final_games, write_results
+from export import export
+from predict import predict, write_predictions
+from predictions.calibrate_win_probability import calibrate_win_probability, read_win_probability_calibration
+from rank import rank, write_rankings
+from rankings.team_history import update_team_history_index
+from stats.read_stats import get_file_hash
+
+
+# How often to look for new or changed files, in seconds
+poll_interval = 2
+
+# Quiet time after the last change before running, so a pull that lands many files runs once
+debounce_interval = 5
+
+
+def watch(poll_interval=poll_interval, debounce_interval=debounce_interval, run_once=False):
+
+    # Start with anything that landed while the watcher was not running
+    # Pending files map to the hash they had when found, which is what gets recorded once they run
+    # A file that changes during the run keeps its old hash on record, so the next poll runs it again
+    state = read_watch_state()
+    snapshot = scan_data_files()
+    pending = find_unprocessed_files(snapshot, state)
+    write_watch_state(state)
+    last_change_time = time.time() - debounce_interval
+
+    while True:
+
+        if pending and time.time() - last_change_time >= debounce_interval:
+            failed_years = run_pipeline(get_pending_weeks(pending), snapshot)
+
+            # Inputs of a season that failed stay unrecorded, so the next start runs them again
+            for filename in pending:
+                _, year, _ = parse_data_file(filename)
+                if year not in failed_years:
+                    state["input hashes"][get_data_key(filename)] = pending[filename]
+            write_watch_state(state)
+            pending = {}
+
+        if run_once:
+            return
+
+        time.sleep(poll_interval)
+
+        # Modification times only say where to look, a file is rerun only if its contents changed
+        new_snapshot = scan_data_files()
+        changed_files = [filename for filename in new_snapshot if snapshot.get(filename) != new_snapshot[filename]]
+        changed_hashes = {filename: get_file_hash(filename) for filename in changed_files}
+        changed_hashes = {filename: file_hash for filename, file_hash in changed_hashes.items() if state["input hashes"].get(get_data_key(filename)) != file_hash}
+        if changed_hashes:
+            pending.update(changed_hashes)
+            last_change_time = time.time()
+        snapshot = new_snapshot
+
+def get_watch_state_filename():
+
+    absolute_path = utils.get_abs_path(__file__)
+
+    return f"{absolute_path}/watch_state.json"
+
+def read_watch_state():
+
+    filename = get_watch_state_filename()
+    if not exists(filename):
+        return {"input hashes": {}}
+
+    with open(filename) as file:
+        return json.load(file)
+
+def write_watch_state(state):
+
+    utils.write_json(state, get_watch_state_filename())
+
+def get_data_key(filename):
+
+    # Keyed relative to TheKickIsBAD, so the record holds across clones
+    kind, year, _ = parse_data_file(filename)
+
+    return f"{kind}/{year}/{basename(filename)}"
+
+def get_data_paths():
+
+    # Stats and scores files as laid out in TheKickIsBAD
+    kick_is_bad_path = dirname(realpath(the_kick_is_bad.__file__))
+
+    return {
+        "stats": f"{kick_is_bad_path}/stats/*/stats-*.json",
+        "scores": f"{kick_is_bad_path}/scores/*/scores-*.json"
+    }
+
+def scan_data_files():
+
+    snapshot = {}
+    data_paths = get_data_paths()
+    for kind in data_paths:
+        for filename in glob.glob(data_paths[kind]):
+            snapshot[filename] = getmtime(filename)
+
+    return snapshot
+
+def parse_data_file(filename):
+
+    match = re.search(r"^(stats|scores)-(\d{4})-(\d{2})\.json$", basename(filename))
+
+    return match.group(1), int(match.group(2)), int(match.group(3))
+
+def find_unprocessed_files(snapshot, state):
+
+    # Stats without rankings and scores without results have not been run yet,
+    # nor has any input whose contents changed since it was last run
+    # Modification times are not compared, git does not keep them so a fresh clone would rerun every week
+    # Closed seasons are never rerun, their outputs may only be in the season archive
+    unprocessed = {}
+    closed_years = {}
+    for filename in snapshot:
+        kind, year, week = parse_data_file(filename)
+        if year not in closed_years:
+            closed_years[year] = is_season_closed(year)
+        if closed_years[year]:
+            continue
+        if kind == "stats":
+            output_kind = "rankings"
+        else:
+            output_kind = "results"
+
+        key = get_data_key(filename)
+        file_hash = get_file_hash(filename)
+        if not has_output(output_kind, year, week):
+            unprocessed[filename] = file_hash
+        elif key not in state["input hashes"]:
+            # Outputs made before the watcher kept a record are taken as up to date
+            state["input hashes"][key] = file_hash
+        elif state["input hashes"][key] != file_hash:
+            unprocessed[filename] = file_hash
+
+    return unprocessed
+
+def get_pending_weeks(pending):
+
+    pending_weeks = {}
+    for filename in pending:
+        kind, year, week = parse_data_file(filename)
+        pending_weeks.setdefault(year, {"stats": set(), "scores": set()})
+        pending_weeks[year][kind].add(week)
+
+    return pending_weeks
+
+def run_pipeline(pending_weeks, snapshot):
+
+    failed_years = set()
+    for year in sorted(pending_weeks):
+
+        # Changes to a closed season's data are not rerun, new loose outputs would shadow its archive
+        if is_season_closed(year):
+            print(f"Skipping closed season {year}")
+            continue
+
+        num_weeks = the_kick_is_bad.read_number_of_weeks(year)
+
+        stats_weeks = set()
+        scores_weeks = set()
+        for filename in snapshot:
+            kind, file_year, week = parse_data_file(filename)
+            if file_year == year and kind == "stats":
+                stats_weeks.add(week)
+            elif file_year == year:
+                scores_weeks.add(week)
+
+        # Later weeks depend on the earlier rankings and models, so rank from the first changed week on
+        rank_weeks = set()
+        if pending_weeks[year]["stats"]:
+            first_week = min(pending_weeks[year]["stats"])
+            rank_weeks = {week for week in stats_weeks if week >= first_week}
+
+        # The preseason rankings need no stats, only the season to have started
+        if not has_output("rankings", year, 0):
+            rank_weeks.add(0)
+
+        # Predict the week after each new ranking, and any scheduled week not predicted yet
+        predict_weeks = {week + 1 for week in rank_weeks}
+        for week in pending_weeks[year]["scores"]:
+            if not has_output("predictions", year, week):
+                predict_weeks.add(week)
+        predict_weeks = {week for week in predict_weeks if week in scores_weeks and week <= num_weeks + 1}
+
+        # Only weeks with finished games have results
+        evaluate_weeks = {week for week in pending_weeks[year]["scores"] if has_final_games(year, week)}
+
+        for week in sorted(rank_weeks | predict_weeks | evaluate_weeks):
+
+            # Weeks that were never predicted are predicted from the existing rankings
+            if week in predict_weeks and week - 1 not in rank_weeks:
+                if not run_step(f"Predicting year {year}, week {week:02}...", predict, year, week, [write_predictions]):
+                    failed_years.add(year)
+
+            # Results use the predictions made before the games, so evaluate before ranking this week
+            # The new results refit the win probabilities used by the next predictions
+            if week in evaluate_weeks and has_output("predictions", year, week):
+                if not run_step(f"Evaluating year {year}, week {week:02}...", evaluate, year, week, [write_results]):
+                    failed_years.add(year)
+                use_standard_deviation = read_win_probability_calibration()["use standard deviation"]
+                run_step("Calibrating win probabilities...", calibrate_win_probability, use_standard_deviation)
+
+            if week in rank_weeks:
+
+                # Later weeks are built on this week's rankings and model, so the season stops here
+                if not run_step(f"Ranking year {year}, week {week:02}...", rank, year, week, [write_rankings], write_caches=True):
+                    print(f"Stopping year {year} after the failed ranking of week {week:02}")
+                    failed_years.add(year)
+                    break
+                if week + 1 in predict_weeks:
+                    if not run_step(f"Predicting year {year}, week {week + 1:02}...", predict, year, week + 1, [write_predictions]):
+                        failed_years.add(year)
+
+    # Bring the history indexes up to date with the new outputs
+    run_step("Updating team history index...", update_team_history_index)
+    run_step("Updating history database...", update_database)
+    run_step("Exporting static shards...", export)
+
+    return failed_years
+
+def run_step(message, function, *args, **kwargs):
+
+    print(message)
+
+    # A failed step is reported and skipped so the watcher keeps running
+    try:
+        function(*args, **kwargs)
+    except Exception:
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "once":
+        watch(run_once=True)
+    else:
+        if len(sys.argv) > 1:
+            poll_interval = float(sys.argv[1])
+        if len(sys.argv) > 2:
+            debounce_interval = float(sys.argv[2])
+        watch(poll_interval, debounce_interval)